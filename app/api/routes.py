@@ -1,20 +1,53 @@
-from fastapi import HTTPException, Depends
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from fastapi import HTTPException, Depends, BackgroundTasks
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session, undefer_group, selectinload
 from typing import Optional, List
 from datetime import datetime, timezone
 
-from ..database.connection import get_db
-from ..database.models import HU, HUStatus, User, Project
-from ..schemas.hu_schemas import HUCreate, HUStatusUpdate, HUResponse, TestGenerationRequest
+from ..database.connection import get_db, SessionLocal, engine, get_pool_stats
+from ..database.models import HU, HUStatus, JobStatus, User, Project, ProjectPurge, TestGenerationJob, RefinementContent
+from ..schemas.hu_schemas import HUCreate, HUStatusUpdate, HUResponse, TestGenerationRequest, FeatureCatalogItem, FeatureCatalogUpdate
 from ..auth.schemas import ProjectCreate, ProjectResponse, ProjectListResponse, ProjectUpdate
 from ..auth.jwt import get_current_active_user, verify_password
 from ..services.azure_service import AzureService
 from ..services.deepseek_service import DeepSeekService
 from ..services.xray_service import XRayService
+from ..services.xray_import_scheduler import xray_import_scheduler
+from ..services.test_generation_jobs import (
+    StageRecorder, create_job, mark_running, mark_finished, job_to_dict, is_stale, INTERRUPTED_JOB_ERROR
+)
+from ..services.generated_tests import build_stored_tests, get_reusable_tests, with_import_result
+from ..services.test_fingerprints import load_imported_fingerprints, record_imported_fingerprints
+from ..services.hu_search import apply_search
+from ..services.project_stats import load_project_stats
+from ..services.hu_revisions import record_revision, record_baseline_revision, list_revisions
+from ..services.hu_export import EXPORT_FORMATS, export_project_hus, export_content_disposition
+from ..services.project_purge import create_purge, retry_purge, run_project_purge, purge_to_dict
+from ..services.azure_service import invalidate_work_item, mark_webhook_project
+from ..services.azure_webhook_service import (
+    SUPPORTED_EVENTS,
+    get_webhook_secret,
+    verify_webhook_authorization,
+    get_auto_refine_area_paths,
+    get_auto_refine_work_item_types,
+    area_path_matches,
+    work_item_type_matches,
+    parse_work_item_event
+)
+from ..services.feature_catalog_service import (
+    FeatureCatalogError,
+    list_catalog,
+    replace_catalog,
+    upsert_feature,
+    delete_feature
+)
+from ..utils.feature_mapping import default_catalog_features
+from ..utils.pagination import paginate, count_total, InvalidCursorError
+from ..utils.azure_ids import parse_azure_number
+from ..utils.language_detector import detect_refinement_language
 
 # Helper function
-def hu_to_dict(hu: HU) -> dict:
+def _hu_status_value(hu: HU) -> str:
     # Mapear el estado correctamente desde el enum
     status_mapping = {
         'ACCEPTED': 'accepted',
@@ -24,13 +57,15 @@ def hu_to_dict(hu: HU) -> dict:
     
     # Obtener el valor del enum
     status_value = hu.status.value if hasattr(hu.status, 'value') else str(hu.status)
-    
+    return status_mapping.get(status_value, status_value.lower())
+
+def hu_to_dict(hu: HU) -> dict:
     return {
         "id": str(hu.id),
         "azure_id": hu.azure_id,
         "name": hu.name,
         "description": hu.description,
-        "status": status_mapping.get(status_value, status_value.lower()),
+        "status": _hu_status_value(hu),
         "refined_response": hu.refined_response,  # Campo requerido por el schema
         "markdown_response": hu.markdown_response,  # Campo requerido por el schema
         "feature": hu.feature,
@@ -40,30 +75,85 @@ def hu_to_dict(hu: HU) -> dict:
         "updated_at": hu.updated_at.isoformat() if hu.updated_at else None
     }
 
-def get_azure_service_for_user(current_user: User, db: Session) -> AzureService:
-    """
-    Obtiene el AzureService configurado con las credenciales del proyecto activo del usuario
-    """
-    
-    # Buscar el proyecto activo del usuario
-    active_project = db.query(Project).filter(
+def hu_to_summary_dict(hu: HU) -> dict:
+    """Representación de listados: no toca las columnas diferidas (descripción y refinamiento)"""
+    return {
+        "id": str(hu.id),
+        "azure_id": hu.azure_id,
+        "name": hu.name,
+        "status": _hu_status_value(hu),
+        "feature": hu.feature,
+        "module": hu.module,
+        "language": hu.language or 'es',
+        "created_at": hu.created_at.isoformat() if hu.created_at else None,
+        "updated_at": hu.updated_at.isoformat() if hu.updated_at else None
+    }
+
+def hu_list_query(db: Session, view: str = "summary"):
+    """Query de HUs para listados; con view=full carga también los textos diferidos en la misma consulta"""
+    query = db.query(HU)
+    if view == "full":
+        query = query.options(*hu_full_options())
+    return query, (hu_to_dict if view == "full" else hu_to_summary_dict)
+
+def find_project_hu(db: Session, project_id: Optional[str], azure_id) -> Optional[HU]:
+    """HU de un proyecto por número de work item ("HU-129" o "129"): una consulta sobre ux_hus_project_azure_number"""
+    azure_number = parse_azure_number(azure_id)
+    if project_id is None or azure_number is None:
+        return None
+    return db.query(HU).filter(HU.project_id == project_id, HU.azure_number == azure_number).first()
+
+def find_hu_owner_project(db: Session, user_id: str, azure_id, exclude_project_id: Optional[str]) -> Optional[Project]:
+    """Otro proyecto (no eliminado) del usuario que tiene guardada la HU, si existe"""
+    azure_number = parse_azure_number(azure_id)
+    if azure_number is None:
+        return None
+    query = db.query(Project).join(HU, HU.project_id == Project.id).filter(
+        Project.user_id == user_id,
+        Project.deleted_at.is_(None),
+        HU.azure_number == azure_number
+    )
+    if exclude_project_id:
+        query = query.filter(Project.id != exclude_project_id)
+    return query.first()
+
+def hu_full_options() -> tuple:
+    """Opciones para cargar la HU completa: columnas diferidas y textos del almacén de refinamientos"""
+    return (undefer_group("refinement"), selectinload(HU.refined_content), selectinload(HU.markdown_content))
+
+def get_active_project(current_user: User, db: Session) -> Optional[Project]:
+    """Proyecto activo del usuario (None si no tiene)"""
+    return db.query(Project).filter(
         Project.user_id == current_user.id,
-        Project.is_active == True
+        Project.is_active == True,
+        Project.deleted_at.is_(None)
     ).first()
-    
+
+def require_active_project(active_project: Optional[Project]) -> Project:
     if not active_project:
         raise HTTPException(
             status_code=400, 
             detail="No hay proyecto activo. Por favor, crea o selecciona un proyecto primero."
         )
-    
-    # Crear AzureService con las credenciales del proyecto activo
+    return active_project
+
+def get_azure_service_for_user(current_user: User, db: Session) -> AzureService:
+    """
+    Obtiene el AzureService configurado con las credenciales del proyecto activo del usuario
+    """
+    return get_azure_service_for_project(require_active_project(get_active_project(current_user, db)))
+
+def get_azure_service_for_project(project: Project) -> AzureService:
+    """
+    Obtiene el AzureService configurado con las credenciales de un proyecto concreto
+    """
     azure_service = AzureService()
-    azure_service.token = active_project.azure_devops_token
-    azure_service.org = active_project.azure_org
-    azure_service.project = active_project.azure_project
+    azure_service.token = project.azure_devops_token
+    azure_service.org = project.azure_org
+    azure_service.project = project.azure_project
+    azure_service.feature_catalog_project_id = project.id
     azure_service.headers = {
-        "Authorization": f"Bearer {active_project.azure_devops_token}",
+        "Authorization": f"Bearer {project.azure_devops_token}",
         "Accept": "application/json",
         "Content-Type": "application/json"
     }
@@ -74,22 +164,15 @@ def get_xray_service_for_user(current_user: User, db: Session) -> XRayService:
     """
     Obtiene el XRayService configurado con las credenciales del proyecto activo del usuario
     """
-    # Buscar el proyecto activo del usuario
-    active_project = db.query(Project).filter(
-        Project.user_id == current_user.id,
-        Project.is_active == True
-    ).first()
-    
-    if not active_project:
-        raise HTTPException(
-            status_code=400, 
-            detail="No hay proyecto activo. Por favor, crea o selecciona un proyecto primero."
-        )
-    
-    # Crear XRayService con las credenciales del proyecto activo
+    return get_xray_service_for_project(require_active_project(get_active_project(current_user, db)))
+
+def get_xray_service_for_project(project: Project) -> XRayService:
+    """
+    Obtiene el XRayService configurado con las credenciales de XRay de un proyecto concreto
+    """
     xray_service = XRayService()
-    xray_service.client_id = active_project.client_id
-    xray_service.client_secret = active_project.client_secret
+    xray_service.client_id = project.client_id
+    xray_service.client_secret = project.client_secret
     
     return xray_service
 
@@ -111,16 +194,17 @@ def create_hu_endpoint(
             raise HTTPException(status_code=400, detail=f"HU {hu_data.azure_id} already exists")
         
         # ✅ Obtener proyecto activo del usuario
-        active_project = db.query(Project).filter(
-            Project.user_id == current_user.id,
-            Project.is_active == True
-        ).first()
+        active_project = get_active_project(current_user, db)
         
         if not active_project:
             raise HTTPException(status_code=400, detail="No hay proyecto activo. Por favor, crea o selecciona un proyecto primero.")
         
+        # El mismo work item con otro formato ("129" / "HU-129") ya está en el proyecto
+        if find_project_hu(db, active_project.id, hu_data.azure_id):
+            raise HTTPException(status_code=400, detail=f"HU {hu_data.azure_id} already exists")
+        
         # ✅ MEJORADO: Obtener AzureService con credenciales del proyecto activo
-        azure_service = get_azure_service_for_user(current_user, db)
+        azure_service = get_azure_service_for_project(active_project)
         
         # ✅ MEJORADO: Fetch con información más completa
         azure_data = azure_service.fetch_hu(hu_data.azure_id)
@@ -162,6 +246,8 @@ def create_hu_endpoint(
             # Update with refined content
             new_hu.refined_response = refined_text
             new_hu.markdown_response = markdown_text
+            record_revision(db, new_hu, "create", refined_text, markdown_text, gemma_service.last_call,
+                            user_id=current_user.id)
             db.commit()
             db.refresh(new_hu)
             
@@ -191,21 +277,24 @@ def get_hus_endpoint(
     azure_id: Optional[str] = None,
     feature: Optional[str] = None,  # Nuevo filtro
     module: Optional[str] = None,  # Nuevo filtro
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_active_user),
+    q: Optional[str] = None,  # Búsqueda libre (incluye el texto refinado)
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    include_total: bool = False,
+    view: str = "summary"  # "summary" (por defecto) o "full" con los textos de refinamiento
 ):
     """Obtener HUs con filtros opcionales y filtrar por proyecto activo"""
     try:
         # Obtener el proyecto activo del usuario
-        active_project = db.query(Project).filter(
-            Project.user_id == current_user.id,
-            Project.is_active == True
-        ).first()
+        active_project = get_active_project(current_user, db)
         
         if not active_project:
-            return {"data": [], "message": "No hay proyecto activo"}
+            return {"data": [], "message": "No hay proyecto activo", "next_cursor": None, "total": 0 if include_total else None}
         
         # Construir query base filtrando por proyecto activo
-        query = db.query(HU).filter(HU.project_id == active_project.id)
+        query, serialize = hu_list_query(db, view)
+        query = query.filter(HU.project_id == active_project.id)
         
         # Aplicar filtros adicionales
         if status:
@@ -217,93 +306,89 @@ def get_hus_endpoint(
             except ValueError:
                 # Si el status no es válido, no filtrar
                 pass
-        if name:
-            query = query.filter(HU.name.ilike(f"%{name}%"))
-        if azure_id:
-            query = query.filter(HU.azure_id.ilike(f"%{azure_id}%"))
-        if feature:
-            query = query.filter(HU.feature.ilike(f"%{feature}%"))
-        if module:
-            query = query.filter(HU.module.ilike(f"%{module}%"))
-        
-        # Obtener HUs del proyecto activo
-        hus = query.order_by(HU.created_at.desc()).all()
+        # Filtros de texto a través del índice de búsqueda (FTS5 / pg_trgm), ordenados por relevancia
+        query, rank = apply_search(db, query, {
+            "name": name, "azure_id": azure_id, "feature": feature, "module": module
+        }, q)
+        
+        # Obtener una página de HUs del proyecto activo
+        hus, next_cursor = paginate(query, HU, limit, cursor, rank)
+        total = count_total(query) if include_total else None
         
         # Convertir a formato de respuesta
         result = []
         for hu in hus:
-            result.append(hu_to_dict(hu))
+            result.append(serialize(hu))
         
-        return {"data": result, "message": f"Se encontraron {len(result)} HUs del proyecto {active_project.name}"}
+        return {
+            "data": result,
+            "message": f"Se encontraron {total if total is not None else len(result)} HUs del proyecto {active_project.name}",
+            "next_cursor": next_cursor,
+            "total": total
+        }
         
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         print(f"❌ Error obteniendo HUs: {str(e)}")
         raise HTTPException(status_code=500, detail="Error interno al obtener HUs")
 
 def get_hu_endpoint(hu_id: str, db: Session = Depends(get_db)):
-    hu = db.query(HU).filter(HU.id == hu_id).first()
+    hu = db.query(HU).options(*hu_full_options()).filter(HU.id == hu_id).first()
     if not hu:
         raise HTTPException(status_code=404, detail="HU not found")
     return hu_to_dict(hu)
 
+def get_hu_revisions_endpoint(hu_id: str, current_user: User, db: Session, include_bodies: bool = False):
+    """Historial de refinamientos de una HU de un proyecto del usuario"""
+    hu = db.query(HU).join(Project).filter(
+        HU.id == hu_id,
+        Project.user_id == current_user.id
+    ).first()
+    if not hu:
+        raise HTTPException(status_code=404, detail="HU no encontrada")
+    return list_revisions(db, hu, include_bodies)
+
 def generate_and_send_tests_endpoint(
     request: TestGenerationRequest, 
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    recorder: StageRecorder = None
 ):
+    recorder = recorder or StageRecorder()
     try:
+        recorder.begin("extract")
         print(f"🧪 Iniciando generación de tests para HU: {request.azure_id}")
         print(f"   📂 Ruta XRay: {request.xray_path}")
         
-        # 🔍 LOGS MEJORADOS: Verificar qué HUs existen en la base de datos
-        print(f"🔍 DEBUG: Buscando HU en la base de datos...")
-        print(f"   🔍 Azure ID solicitado: '{request.azure_id}'")
-        
-        # Buscar todas las HUs para ver qué hay disponible
-        all_hus = db.query(HU).all()
-        print(f"   📊 Total HUs en la base de datos: {len(all_hus)}")
-        
-        if all_hus:
-            print(f"   📋 HUs disponibles:")
-            for hu in all_hus[:10]:  # Mostrar solo las primeras 10
-                print(f"      - ID: {hu.azure_id} | Nombre: {hu.name[:50]}...")
-        else:
-            print(f"   ⚠️ La base de datos está vacía!")
-        
-        # 1. Búsqueda flexible de la HU en la base de datos
-        print(f"🔍 Ejecutando búsqueda flexible para azure_id = '{request.azure_id}'...")
-        
-        # Extraer el número de la HU para búsquedas flexibles
-        azure_number = request.azure_id.replace('HU-', '') if 'HU-' in request.azure_id else request.azure_id
-        print(f"   🔢 Número extraído: '{azure_number}'")
-        
-        # Intentar múltiples patrones de búsqueda
-        hu = None
-        search_patterns = [
-            request.azure_id,  # Búsqueda exacta (ej: "HU-129")
-            azure_number,      # Solo el número (ej: "129")
-            f"HU-{azure_number}",  # Con prefijo (ej: "HU-129")
-        ]
-        
-        print(f"   🔍 Patrones de búsqueda: {search_patterns}")
-        
-        for pattern in search_patterns:
-            print(f"   🔍 Buscando con patrón: '{pattern}'")
-            hu = db.query(HU).filter(HU.azure_id == pattern).first()
-            if hu:
-                print(f"   ✅ HU encontrada con patrón: '{pattern}'")
-                break
+        print(f"🔍 Buscando HU en la base de datos: '{request.azure_id}'")
+        # 1. Búsqueda de la HU en el proyecto activo por número de work item ("HU-129" o "129")
+        # El proyecto activo se consulta una vez y se reutiliza en las etapas de Azure DevOps y XRay
+        active_project = get_active_project(current_user, db)
+        hu = find_project_hu(db, active_project.id if active_project else None, request.azure_id)
         
         # 2. Si no se encuentra en la DB, buscar en Azure DevOps
         if not hu:
+            # Guardada en otro proyecto del usuario: se genera desde su refinamiento activando ese proyecto,
+            # no desde la descripción de Azure DevOps
+            owner = find_hu_owner_project(db, current_user.id, request.azure_id,
+                                          active_project.id if active_project else None)
+            if owner:
+                print(f"⚠️ La HU {request.azure_id} pertenece al proyecto '{owner.name}', no al proyecto activo")
+                raise HTTPException(
+                    status_code=409,
+                    detail=f"La HU {request.azure_id} pertenece al proyecto '{owner.name}' ({owner.id}). "
+                           f"Activa ese proyecto para generar sus tests."
+                )
             print(f"❌ HU no encontrada en la base de datos")
             print(f"🔄 Buscando directamente en Azure DevOps...")
             
             try:
                 # Obtener AzureService con credenciales del proyecto activo
-                azure_service = get_azure_service_for_user(current_user, db)
+                azure_service = get_azure_service_for_project(require_active_project(active_project))
                 
                 # Buscar la HU directamente en Azure DevOps
+                azure_number = str(parse_azure_number(request.azure_id) or request.azure_id)
                 print(f"🔍 Fetching HU {azure_number} from Azure DevOps...")
                 azure_data = azure_service.fetch_hu(azure_number)
                 
@@ -350,17 +435,31 @@ def generate_and_send_tests_endpoint(
         
         print(f"✅ HU tiene contenido válido, procediendo con generación de tests...")
         
-        # 4. Generar tests con IA
-        print(f"🤖 Generando tests with IA...")
+        # 4. Generar tests con IA (o reutilizar los guardados si el refinamiento y la ruta no cambiaron)
+        recorder.begin("generate")
+        is_db_hu = isinstance(hu, HU)
+        stored_tests = hu.tests_generated if is_db_hu else None
+        reusable = None if request.force_regenerate else get_reusable_tests(stored_tests, hu.refined_response, request.xray_path)
         try:
-            gemma_service = DeepSeekService()
-            test_result = gemma_service.generate_xray_tests(
-                hu.refined_response,
-                request.xray_path,
-                hu.azure_id  # Agregar el parámetro azure_id
-            )
-            
-            print(f"✅ Tests generados exitosamente")
+            if reusable:
+                print(f"♻️ Reutilizando tests guardados (refinamiento y ruta XRay sin cambios)")
+                test_result = reusable
+            else:
+                print(f"🤖 Generando tests with IA...")
+                gemma_service = DeepSeekService()
+                test_result = gemma_service.generate_xray_tests(
+                    hu.refined_response,
+                    request.xray_path,
+                    hu.azure_id  # Agregar el parámetro azure_id
+                )
+                
+                print(f"✅ Tests generados exitosamente")
+                
+                # Guardar los tests antes del envío para poder reenviarlos si XRay falla
+                if is_db_hu:
+                    stored_tests = build_stored_tests(hu.refined_response, request.xray_path, test_result)
+                    hu.tests_generated = stored_tests
+                    db.commit()
             
             # Extraer los tests clasificados del resultado
             classified_tests = test_result.get('classified_tests', {})
@@ -401,11 +500,30 @@ def generate_and_send_tests_endpoint(
             classified_tests = {"General": []}
         
         # 6. Enviar tests a XRay
+        recorder.begin("import")
         print(f"🚀 Enviando tests a XRay...")
         try:
             print(f"🔐 Obteniendo token de XRay...")
-            xray_service = get_xray_service_for_user(current_user, db)
-            xray_results = xray_service.send_tests_to_xray_by_category(classified_tests)
+            xray_service = get_xray_service_for_project(require_active_project(active_project))
+            # Omitir los tests que ya se importaron con éxito para esta HU y ruta
+            imported = load_imported_fingerprints(db, xray_service.client_id, hu.azure_id, request.xray_path)
+            xray_results = xray_service.send_classified_tests(classified_tests, imported)
+            record_imported_fingerprints(db, xray_service.client_id, hu.azure_id, request.xray_path,
+                                         xray_results.pop('imported_fingerprints', []), imported)
+            recorder.end()
+            
+            if is_db_hu and stored_tests:
+                hu.tests_generated = with_import_result(stored_tests, xray_results)
+                db.commit()
+            
+            # Tiempos por categoría (modo by_category) o por job (modo consolidado)
+            for category in ['criticos', 'importantes', 'opcionales']:
+                if 'elapsed_seconds' in xray_results.get(category, {}):
+                    recorder.add(f"import:{category}", xray_results[category]['elapsed_seconds'],
+                                 "ok" if xray_results[category].get('success') else "failed")
+            for job_index, job_result in enumerate(xray_results.get('jobs', []), start=1):
+                recorder.add(f"import:job_{job_index}", job_result.get('elapsed_seconds', 0),
+                             "ok" if job_result.get('success') else "failed")
             
             print(f"✅ Tests enviados a XRay exitosamente")
             
@@ -442,10 +560,11 @@ def generate_and_send_tests_endpoint(
         
         # 7. Actualizar HU en Azure DevOps (solo si la HU está en la DB y está aprobada)
         if hasattr(hu, 'id') and hasattr(hu, 'status') and hu.status == HUStatus.ACCEPTED:
+            recorder.begin("azure_update")
             print(f"🔄 Actualizando HU en Azure DevOps...")
             try:
                 # Actualizar en Azure DevOps con los criterios refinados
-                azure_service = get_azure_service_for_user(current_user, db)
+                azure_service = get_azure_service_for_project(require_active_project(active_project))
                 azure_update_success = azure_service.update_hu_in_azure(
                     hu.azure_id, 
                     hu.refined_response, 
@@ -462,6 +581,7 @@ def generate_and_send_tests_endpoint(
                 # No fallar el proceso completo por este error
         
         # 8. Retornar resultados
+        recorder.end()
         # Calcular el total de tests generados correctamente
         total_tests_generated = 0
         tests_details = []
@@ -487,35 +607,56 @@ def generate_and_send_tests_endpoint(
             "azure_id": hu.azure_id,
             "hu_name": hu.name if hasattr(hu, 'name') else f"HU-{hu.azure_id}",
             "tests_generated": total_tests_generated,
+            "tests_reused": bool(reusable),
             "tests_sent": total_success,
+            "tests_skipped": xray_results.get('summary', {}).get('total_skipped', 0),
             "xray_path": request.xray_path,
             "tests": tests_details,
-            "xray_results": xray_results
+            "xray_results": xray_results,
+            "timings": recorder.timings()
         }
         
     except HTTPException:
+        recorder.end("failed")
         raise
     except Exception as e:
+        recorder.end("failed")
         print(f"❌ Error general en generación de tests: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
-def debug_list_hus_endpoint(db: Session = Depends(get_db)):
-    """Endpoint de debug para ver todas las HUs en la base de datos"""
+def debug_list_hus_endpoint(
+    db: Session = Depends(get_db),
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    include_total: bool = False
+):
+    """Endpoint de debug para ver las HUs en la base de datos (paginado)"""
     try:
-        all_hus = db.query(HU).all()
+        query = db.query(HU)
+        hus, next_cursor = paginate(query, HU, limit, cursor)
         
         result = {
-            "total_hus": len(all_hus),
-            "hus": []
+            # Campo anterior a la paginación: solo en la primera página o con include_total
+            "total_hus": count_total(query) if include_total or not cursor else None,
+            "hus": [],
+            "next_cursor": next_cursor
         }
         
-        for hu in all_hus:
+        # Longitud del refinamiento guardada en refinement_contents, sin descomprimir el texto
+        refined_lengths = dict(
+            db.query(HU.id, RefinementContent.length)
+            .join(RefinementContent, RefinementContent.hash == HU.refined_hash)
+            .filter(HU.id.in_([hu.id for hu in hus])).all()
+        ) if hus else {}
+        
+        for hu in hus:
+            length = refined_lengths.get(hu.id) or 0
             result["hus"].append({
                 "azure_id": hu.azure_id,
                 "name": hu.name,
                 "status": hu.status.value,
-                "has_refined_response": bool(hu.refined_response and hu.refined_response.strip()),
-                "refined_length": len(hu.refined_response) if hu.refined_response else 0,
+                "has_refined_response": length > 0,
+                "refined_length": length,
                 "created_at": hu.created_at.isoformat() if hu.created_at else None
             })
         
@@ -524,29 +665,28 @@ def debug_list_hus_endpoint(db: Session = Depends(get_db)):
     except Exception as e:
         return {"error": str(e)}
 
-def debug_find_hu_endpoint(azure_id: str, db: Session = Depends(get_db)):
-    """Endpoint de debug para buscar una HU específica"""
+def debug_find_hu_endpoint(azure_id: str, current_user: User, db: Session = Depends(get_db)):
+    """Endpoint de debug para buscar una HU específica en los proyectos del usuario"""
     try:
         print(f"🔍 DEBUG: Buscando HU con azure_id = '{azure_id}'")
         
-        # Búsqueda exacta
-        exact_match = db.query(HU).filter(HU.azure_id == azure_id).first()
+        user_projects = db.query(Project.id).filter(Project.user_id == current_user.id, Project.deleted_at.is_(None))
         
-        # Búsquedas similares
-        similar_matches = db.query(HU).filter(HU.azure_id.like(f"%{azure_id}%")).all()
+        # Búsqueda exacta (índice único de azure_id)
+        exact_match = db.query(HU).filter(HU.azure_id == azure_id, HU.project_id.in_(user_projects)).first()
         
-        # Buscar por número solamente
-        azure_number = azure_id.replace('HU-', '') if 'HU-' in azure_id else azure_id
-        number_matches = db.query(HU).filter(
-            or_(
-                HU.azure_id == azure_number,
-                HU.azure_id == f"HU-{azure_number}",
-                HU.azure_id.like(f"%{azure_number}%")
-            )
-        ).all()
+        # Buscar por número de work item ("129" y "HU-129"): una consulta por índice por proyecto
+        azure_number = parse_azure_number(azure_id)
+        number_matches = []
+        if azure_number is not None:
+            number_matches = db.query(HU).filter(
+                HU.project_id.in_(user_projects),
+                HU.azure_number == azure_number
+            ).all()
         
         result = {
             "search_term": azure_id,
+            "azure_number": azure_number,
             "exact_match": None,
             "similar_matches": [],
             "number_matches": []
@@ -561,25 +701,27 @@ def debug_find_hu_endpoint(azure_id: str, db: Session = Depends(get_db)):
                 "refined_preview": exact_match.refined_response[:200] + "..." if exact_match.refined_response else None
             }
         
-        for match in similar_matches:
-            result["similar_matches"].append({
-                "azure_id": match.azure_id,
-                "name": match.name,
-                "status": match.status.value
-            })
-        
         for match in number_matches:
-            result["number_matches"].append({
+            entry = {
                 "azure_id": match.azure_id,
                 "name": match.name,
-                "status": match.status.value
-            })
+                "status": match.status.value,
+                "project_id": match.project_id
+            }
+            result["number_matches"].append(entry)
+            # Variantes del mismo número con otro formato de azure_id
+            if match.azure_id != azure_id:
+                result["similar_matches"].append(entry)
         
         return result
         
     except Exception as e:
         return {"error": str(e)}
 
+def debug_db_pool_endpoint():
+    """Endpoint de debug con el estado de los pools de conexiones (motor síncrono y asíncrono)"""
+    return {"backend": engine.dialect.name, "pools": get_pool_stats()}
+
 def update_hu_status_endpoint(
     hu_id: str, 
     status_update: HUStatusUpdate, 
@@ -640,7 +782,6 @@ def update_hu_status_endpoint(
                 azure_update_success = False
             
             # Actualizar estado local
-            from datetime import datetime, timezone
             hu.status = HUStatus.ACCEPTED
             hu.updated_at = datetime.now(timezone.utc)
             
@@ -662,6 +803,11 @@ def update_hu_status_endpoint(
                 original_response
             )
             
+            # Historial: la versión rechazada (si la HU es anterior a hu_revisions) y la nueva
+            record_baseline_revision(db, hu)
+            record_revision(db, hu, "rejection", refined_text, markdown_text, gemma_service.last_call,
+                            feedback=status_update.feedback, user_id=current_user.id)
+            
             # Actualizar con las nuevas versiones
             hu.refined_response = refined_text
             hu.markdown_response = markdown_text
@@ -724,10 +870,14 @@ def delete_hu_endpoint(
 
 def delete_project_endpoint(
     project_id: str,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: User,
+    background_tasks: BackgroundTasks,
+    db: Session
 ):
-    """Eliminar un proyecto del usuario"""
+    """
+    Eliminar un proyecto del usuario: se marca como eliminado y responde de inmediato; sus HUs se
+    borran por lotes en segundo plano (services/project_purge.py)
+    """
     print(f"🔍 DEBUG: delete_project_endpoint llamado con project_id: {project_id}")
     print(f"🔍 DEBUG: Usuario: {current_user.username}")
     
@@ -737,7 +887,8 @@ def delete_project_endpoint(
         # Verificar que el proyecto existe y pertenece al usuario
         project = db.query(Project).filter(
             Project.id == project_id,
-            Project.user_id == current_user.id
+            Project.user_id == current_user.id,
+            Project.deleted_at.is_(None)
         ).first()
         
         if not project:
@@ -757,22 +908,17 @@ def delete_project_endpoint(
                 detail="No se puede eliminar el proyecto activo. Primero establece otro proyecto como activo."
             )
         
-        # Verificar si tiene HUs asociadas
-        hus_count = db.query(HU).filter(HU.project_id == project_id).count()
-        if hus_count > 0:
-            print(f"⚠️ El proyecto tiene {hus_count} HUs asociadas")
-            raise HTTPException(
-                status_code=400, 
-                detail=f"No se puede eliminar el proyecto porque tiene {hus_count} HUs asociadas. Elimina las HUs primero."
-            )
+        # Marcar el proyecto como eliminado; las HUs se borran por lotes en segundo plano
+        purge = create_purge(db, project)
+        background_tasks.add_task(run_project_purge, engine, purge.id)
         
-        # Eliminar el proyecto
-        db.delete(project)
-        db.commit()
+        print(f"✅ Proyecto {purge.project_name} eliminado: {purge.total_hus} HUs pendientes de borrar")
         
-        print(f"✅ Proyecto {project.name} eliminado exitosamente")
-        
-        return {"message": f"Proyecto '{project.name}' eliminado exitosamente"}
+        return {
+            "message": f"Proyecto '{purge.project_name}' eliminado exitosamente",
+            **purge_to_dict(purge),
+            "status_url": f"/projects/{project_id}/deletion"
+        }
         
     except HTTPException:
         raise
@@ -781,6 +927,48 @@ def delete_project_endpoint(
         db.rollback()
         raise HTTPException(status_code=500, detail="Error interno al eliminar el proyecto.")
 
+def get_project_deletion_endpoint(
+    project_id: str,
+    current_user: User,
+    db: Session
+):
+    """Progreso del borrado en segundo plano de un proyecto eliminado"""
+    purge = db.query(ProjectPurge).filter(
+        ProjectPurge.project_id == project_id,
+        ProjectPurge.user_id == current_user.id
+    ).order_by(ProjectPurge.created_at.desc()).first()
+    
+    if not purge:
+        raise HTTPException(status_code=404, detail="Eliminación de proyecto no encontrada")
+    
+    return purge_to_dict(purge)
+
+def retry_project_deletion_endpoint(
+    project_id: str,
+    current_user: User,
+    background_tasks: BackgroundTasks,
+    db: Session
+):
+    """Reintenta en segundo plano el borrado fallido de un proyecto eliminado"""
+    purge = db.query(ProjectPurge).filter(
+        ProjectPurge.project_id == project_id,
+        ProjectPurge.user_id == current_user.id
+    ).order_by(ProjectPurge.created_at.desc()).first()
+    
+    if not purge:
+        raise HTTPException(status_code=404, detail="Eliminación de proyecto no encontrada")
+    if purge.status != JobStatus.FAILED:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Solo se puede reintentar una eliminación fallida (estado actual: {purge.status.value})"
+        )
+    
+    purge = retry_purge(db, purge)
+    background_tasks.add_task(run_project_purge, engine, purge.id)
+    print(f"🔁 Reintentando el borrado del proyecto {purge.project_name}: "
+          f"{purge.total_hus - purge.deleted_hus} HUs pendientes")
+    return {**purge_to_dict(purge), "status_url": f"/projects/{project_id}/deletion"}
+
 def update_project_endpoint(
     project_id: str,
     project_update: ProjectUpdate,
@@ -798,7 +986,8 @@ def update_project_endpoint(
         # Verificar que el proyecto existe y pertenece al usuario
         project = db.query(Project).filter(
             Project.id == project_id,
-            Project.user_id == current_user.id
+            Project.user_id == current_user.id,
+            Project.deleted_at.is_(None)
         ).first()
         
         if not project:
@@ -919,17 +1108,25 @@ def create_project_endpoint(
 
 def get_user_projects_endpoint(
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    include_total: bool = False
 ):
     """Obtener todos los proyectos del usuario autenticado"""
     try:
         print(f"📋 Obteniendo proyectos para usuario {current_user.username}")
         
-        projects = db.query(Project).filter(Project.user_id == current_user.id).all()
-        active_project = db.query(Project).filter(
-            Project.user_id == current_user.id,
-            Project.is_active == True
-        ).first()
+        query = db.query(Project).filter(Project.user_id == current_user.id, Project.deleted_at.is_(None))
+        projects, next_cursor = paginate(query, Project, limit, cursor)
+        # Normalmente el proyecto activo está en la página; solo se consulta si puede estar en otra
+        active_project_id = next((project.id for project in projects if project.is_active), None)
+        if active_project_id is None and (cursor or next_cursor):
+            active_project_id = db.query(Project.id).filter(
+                Project.user_id == current_user.id,
+                Project.is_active == True,
+                Project.deleted_at.is_(None)
+            ).limit(1).scalar()
         
         project_responses = []
         for project in projects:
@@ -946,9 +1143,13 @@ def get_user_projects_endpoint(
         
         return ProjectListResponse(
             projects=project_responses,
-            active_project_id=active_project.id if active_project else None
+            active_project_id=active_project_id,
+            next_cursor=next_cursor,
+            total=count_total(query) if include_total else None
         )
         
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         print(f"❌ Error obteniendo proyectos: {str(e)}")
         raise HTTPException(status_code=500, detail="Error interno al obtener los proyectos.")
@@ -965,7 +1166,8 @@ def set_active_project_endpoint(
         # Verificar que el proyecto existe y pertenece al usuario
         project = db.query(Project).filter(
             Project.id == project_id,
-            Project.user_id == current_user.id
+            Project.user_id == current_user.id,
+            Project.deleted_at.is_(None)
         ).first()
         
         if not project:
@@ -1017,10 +1219,7 @@ def get_active_project_endpoint(
     try:
         print(f"🔍 Obteniendo proyecto activo para usuario {current_user.username}")
         
-        active_project = db.query(Project).filter(
-            Project.user_id == current_user.id,
-            Project.is_active == True
-        ).first()
+        active_project = get_active_project(current_user, db)
         
         if not active_project:
             print(f"⚠️ No hay proyecto activo para usuario {current_user.username}")
@@ -1049,7 +1248,12 @@ def get_active_project_endpoint(
 def get_project_hus_endpoint(
     project_id: str,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    q: Optional[str] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    include_total: bool = False,
+    view: str = "summary"
 ):
     """Obtener las HUs asociadas a un proyecto específico"""
     try:
@@ -1058,20 +1262,23 @@ def get_project_hus_endpoint(
         # Verificar que el proyecto existe y pertenece al usuario
         project = db.query(Project).filter(
             Project.id == project_id,
-            Project.user_id == current_user.id
+            Project.user_id == current_user.id,
+            Project.deleted_at.is_(None)
         ).first()
         
         if not project:
             print(f"❌ Proyecto {project_id} no encontrado para usuario {current_user.username}")
             raise HTTPException(status_code=404, detail="Proyecto no encontrado")
         
-        # Obtener todas las HUs del proyecto
-        hus = db.query(HU).filter(HU.project_id == project_id).all()
+        # Obtener una página de HUs del proyecto (filtradas por búsqueda libre si se indica)
+        query, serialize = hu_list_query(db, view)
+        query, rank = apply_search(db, query.filter(HU.project_id == project_id), {}, q)
+        hus, next_cursor = paginate(query, HU, limit, cursor, rank)
         
         # Convertir a formato de respuesta
         hu_responses = []
         for hu in hus:
-            hu_responses.append(hu_to_dict(hu))
+            hu_responses.append(serialize(hu))
         
         return {
             "project": {
@@ -1080,11 +1287,16 @@ def get_project_hus_endpoint(
                 "description": project.description
             },
             "hus": hu_responses,
-            "total_count": len(hu_responses)
+            "count": len(hu_responses),
+            # Campo anterior a la paginación: solo en la primera página o con include_total
+            "total_count": count_total(query) if include_total or not cursor else None,
+            "next_cursor": next_cursor
         }
         
     except HTTPException:
         raise
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         print(f"❌ Error obteniendo HUs del proyecto: {str(e)}")
         raise HTTPException(status_code=500, detail="Error interno al obtener las HUs del proyecto.")
@@ -1112,3 +1324,402 @@ def validate_password_endpoint(
     except Exception as e:
         print(f"❌ Error validando contraseña: {str(e)}")
         raise HTTPException(status_code=500, detail="Error interno al validar la contraseña.")
+
+# ==================== SERVICE HOOKS DE AZURE DEVOPS ====================
+
+def refine_hu_in_background(hu_id: str, azure_data: dict, language: str = 'es'):
+    """Refina una HU fuera del ciclo de la petición, con su propia sesión de base de datos"""
+    db = SessionLocal()
+    try:
+        hu = db.query(HU).filter(HU.id == hu_id).first()
+        if not hu:
+            print(f"⚠️ HU {hu_id} ya no existe, se omite el refinamiento")
+            return
+        
+        print(f"🤖 Refinamiento en segundo plano para HU {hu.azure_id}...")
+        try:
+            gemma_service = DeepSeekService()
+            refined_text, markdown_text = gemma_service.refine_hu(
+                azure_data.get('title', ''),
+                azure_data.get('description', ''),
+                azure_data.get('acceptanceCriteria', ''),
+                azure_data.get('feature', ''),
+                azure_data.get('module', ''),
+                language
+            )
+            hu.refined_response = refined_text
+            hu.markdown_response = markdown_text
+            record_revision(db, hu, "auto_refine", refined_text, markdown_text, gemma_service.last_call)
+            print(f"✅ HU {hu.azure_id} refinada en segundo plano")
+        except Exception as ai_error:
+            print(f"❌ Error durante refinamiento en segundo plano: {str(ai_error)}")
+            hu.refined_response = f"❌ Error refinando: {str(ai_error)}"
+            hu.markdown_response = f"❌ Error refinando: {str(ai_error)}"
+        
+        db.commit()
+    except Exception as e:
+        print(f"❌ Error en refinamiento en segundo plano: {str(e)}")
+        db.rollback()
+    finally:
+        db.close()
+
+def azure_webhook_endpoint(
+    project_id: str,
+    payload: dict,
+    authorization: Optional[str],
+    background_tasks: BackgroundTasks,
+    db: Session
+):
+    """Recibe service hooks workitem.created / workitem.updated de Azure DevOps"""
+    if not verify_webhook_authorization(project_id, authorization):
+        raise HTTPException(status_code=401, detail="Service hook no autorizado")
+    
+    project = db.query(Project).filter(Project.id == project_id, Project.deleted_at.is_(None)).first()
+    if not project:
+        raise HTTPException(status_code=401, detail="Service hook no autorizado")
+    
+    event = parse_work_item_event(payload)
+    print(f"📨 Service hook recibido: {event['event_type']} - work item {event['work_item_id']} (proyecto {project.name})")
+    
+    if event['event_type'] not in SUPPORTED_EVENTS:
+        return {"status": "ignored", "reason": f"Evento no soportado: {event['event_type']}"}
+    
+    if event['work_item_id'] is None:
+        raise HTTPException(status_code=400, detail="El evento no contiene un id de work item válido")
+    
+    # El evento debe pertenecer al proyecto de Azure DevOps configurado
+    if event['team_project'] and event['team_project'].lower() != (project.azure_project or '').lower():
+        print(f"❌ Proyecto del evento '{event['team_project']}' no coincide con '{project.azure_project}'")
+        raise HTTPException(status_code=403, detail="El evento no pertenece a este proyecto")
+    
+    # 1. Invalidar datos cacheados del work item (y habilitar la caché para el proyecto)
+    mark_webhook_project(project.azure_org, project.azure_project)
+    cache_invalidated = invalidate_work_item(project.azure_org, project.azure_project, event['work_item_id'])
+    
+    azure_id = str(event['work_item_id'])
+    hu = find_project_hu(db, project.id, azure_id)
+    
+    result = {
+        "status": "processed",
+        "event_type": event['event_type'],
+        "work_item_id": event['work_item_id'],
+        "cache_invalidated": cache_invalidated,
+        "refinement_enqueued": False
+    }
+    
+    # Los tests guardados no se invalidan aquí: se generan desde el refinamiento guardado y
+    # get_reusable_tests ya compara su hash (la propia app actualiza el work item al generar tests)
+    
+    # 2. Importar y refinar automáticamente las historias nuevas de las áreas configuradas
+    if event['event_type'] == "workitem.created" and not hu:
+        area_paths = get_auto_refine_area_paths()
+        if area_paths and area_path_matches(event['area_path'], area_paths):
+            work_item_types = get_auto_refine_work_item_types()
+            if event['work_item_type'] and not work_item_type_matches(event['work_item_type'], work_item_types):
+                print(f"⏭️ Work item {azure_id} de tipo '{event['work_item_type']}', no se importa")
+                return result
+            if db.query(HU).filter(HU.azure_id == azure_id).first():
+                print(f"⚠️ HU {azure_id} ya existe en otro proyecto, no se importa")
+                return result
+            
+            # Un error de Azure DevOps no se responde como 500: el service hook se reintentaría sin fin
+            try:
+                azure_service = get_azure_service_for_project(project)
+                azure_data = azure_service.fetch_hu(azure_id, use_cache=False)
+            except Exception as e:
+                print(f"❌ Error obteniendo el work item {azure_id} de Azure DevOps: {str(e)}")
+                result["status"] = "failed"
+                result["error"] = f"No se pudo obtener el work item de Azure DevOps: {str(e)}"
+                return result
+            if not work_item_type_matches(azure_data.get('workItemType'), work_item_types):
+                print(f"⏭️ Work item {azure_id} de tipo '{azure_data.get('workItemType')}', no se importa")
+                return result
+            
+            language = detect_refinement_language(" ".join(
+                azure_data.get(field) or "" for field in ('title', 'description', 'acceptanceCriteria')
+            ))
+            new_hu = HU(
+                azure_id=azure_id,
+                name=azure_data['title'],
+                description=azure_data['description'],
+                refined_response="🤖 Refinando con IA... Por favor espera.",
+                markdown_response="🤖 Refinando con IA... Por favor espera.",
+                feature=azure_data.get('feature'),
+                module=azure_data.get('module'),
+                language=language,
+                project_id=project.id
+            )
+            db.add(new_hu)
+            db.commit()
+            db.refresh(new_hu)
+            
+            background_tasks.add_task(refine_hu_in_background, new_hu.id, azure_data, new_hu.language)
+            result["refinement_enqueued"] = True
+            result["hu_id"] = new_hu.id
+            print(f"📥 HU {azure_id} importada automáticamente ({language}), refinamiento encolado")
+    
+    return result
+
+def get_project_webhook_endpoint(
+    project_id: str,
+    current_user: User,
+    db: Session
+):
+    """Devuelve la configuración del service hook de Azure DevOps de un proyecto"""
+    project = db.query(Project).filter(
+        Project.id == project_id,
+        Project.user_id == current_user.id,
+        Project.deleted_at.is_(None)
+    ).first()
+    
+    if not project:
+        raise HTTPException(status_code=404, detail="Proyecto no encontrado")
+    
+    return {
+        "url": f"/webhooks/azure?project_id={project.id}",
+        "events": list(SUPPORTED_EVENTS),
+        "basic_auth_username": "azure-devops",
+        "basic_auth_password": get_webhook_secret(project.id),
+        "auto_refine_area_paths": get_auto_refine_area_paths(),
+        "auto_refine_work_item_types": get_auto_refine_work_item_types()
+    }
+
+# ==================== CATÁLOGO DE FEATURES POR PROYECTO ====================
+
+def get_user_project_or_404(project_id: str, current_user: User, db: Session) -> Project:
+    """Obtiene un proyecto del usuario o responde 404"""
+    project = db.query(Project).filter(
+        Project.id == project_id,
+        Project.user_id == current_user.id,
+        Project.deleted_at.is_(None)
+    ).first()
+    
+    if not project:
+        raise HTTPException(status_code=404, detail="Proyecto no encontrado")
+    
+    return project
+
+def export_project_hus_endpoint(
+    project_id: str,
+    current_user: User,
+    db: Session,
+    stream_engine,
+    export_format: str = "ndjson",
+    view: str = "summary",
+    compress: bool = False
+) -> StreamingResponse:
+    """
+    Exporta todas las HUs del proyecto en NDJSON o CSV como respuesta en streaming. Las filas se leen
+    con una conexión propia de stream_engine mientras se envía la respuesta
+    """
+    project = get_user_project_or_404(project_id, current_user, db)
+    print(f"📤 Exportando HUs del proyecto {project.name} ({export_format}, {view}{', gzip' if compress else ''})")
+    return StreamingResponse(
+        export_project_hus(stream_engine, project.id, export_format, view, compress),
+        media_type="application/gzip" if compress else EXPORT_FORMATS[export_format],
+        headers={"Content-Disposition": export_content_disposition(project.name, export_format, compress)}
+    )
+
+def get_feature_catalog_endpoint(
+    project_id: str,
+    current_user: User,
+    db: Session
+):
+    """Devuelve el catálogo de features de un proyecto"""
+    project = get_user_project_or_404(project_id, current_user, db)
+    return {"project_id": project.id, **list_catalog(db, project.id)}
+
+def replace_feature_catalog_endpoint(
+    project_id: str,
+    catalog: FeatureCatalogUpdate,
+    current_user: User,
+    db: Session
+):
+    """Reemplaza el catálogo completo de features de un proyecto"""
+    project = get_user_project_or_404(project_id, current_user, db)
+    try:
+        version = replace_catalog(db, project.id, [feature.model_dump() for feature in catalog.features])
+    except FeatureCatalogError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    print(f"📚 Catálogo de features del proyecto {project.name} reemplazado ({len(catalog.features)} features, versión {version})")
+    return {"project_id": project.id, **list_catalog(db, project.id)}
+
+def upsert_feature_endpoint(
+    project_id: str,
+    feature_id: str,
+    feature: FeatureCatalogItem,
+    current_user: User,
+    db: Session
+):
+    """Crea o actualiza una feature del catálogo de un proyecto"""
+    project = get_user_project_or_404(project_id, current_user, db)
+    if feature.feature_id != feature_id:
+        raise HTTPException(status_code=400, detail="El feature_id del cuerpo no coincide con el de la ruta")
+    
+    try:
+        version = upsert_feature(db, project.id, feature.model_dump())
+    except FeatureCatalogError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {"project_id": project.id, "version": version, "feature": feature.model_dump()}
+
+def delete_feature_endpoint(
+    project_id: str,
+    feature_id: str,
+    current_user: User,
+    db: Session
+):
+    """Elimina una feature del catálogo de un proyecto"""
+    project = get_user_project_or_404(project_id, current_user, db)
+    version = delete_feature(db, project.id, feature_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Feature no encontrada")
+    
+    return {"message": f"Feature '{feature_id}' eliminada del catálogo", "version": version}
+
+def import_default_feature_catalog_endpoint(
+    project_id: str,
+    current_user: User,
+    db: Session
+):
+    """Carga el mapeo estático de features (FEATURE_MAPPING) como catálogo del proyecto"""
+    project = get_user_project_or_404(project_id, current_user, db)
+    version = replace_catalog(db, project.id, default_catalog_features())
+    print(f"📚 Mapeo de features por defecto importado en el proyecto {project.name} (versión {version})")
+    return {"project_id": project.id, **list_catalog(db, project.id)}
+
+def get_project_stats_endpoint(
+    project_id: str,
+    current_user: User,
+    db: Session
+):
+    """Estadísticas de HUs y tests de un proyecto (contadores mantenidos de forma incremental)"""
+    project = get_user_project_or_404(project_id, current_user, db)
+    return load_project_stats(db, project.id)
+
+def get_xray_import_queue_endpoint(
+    current_user: User,
+    db: Session
+):
+    """Estado de la cola de importaciones a XRay del tenant del proyecto activo"""
+    xray_service = get_xray_service_for_user(current_user, db)
+    return xray_import_scheduler.status(xray_service.client_id or "")
+
+# ==================== GENERACIÓN DE TESTS ASÍNCRONA ====================
+
+def run_generate_tests_job(job_id: str):
+    """Ejecuta el pipeline de generación de tests de un job con su propia sesión de base de datos"""
+    db = SessionLocal()
+    try:
+        job = db.query(TestGenerationJob).filter(TestGenerationJob.id == job_id).first()
+        if not job:
+            print(f"❌ Job de generación {job_id} no encontrado")
+            return
+        
+        user = db.query(User).filter(User.id == job.user_id).first()
+        mark_running(db, job)
+        print(f"🧵 Job {job_id}: generando tests para HU {job.azure_id}")
+        
+        recorder = StageRecorder(db, job)
+        request = TestGenerationRequest(xray_path=job.xray_path, azure_id=job.azure_id,
+                                        force_regenerate=bool(job.force_regenerate))
+        try:
+            result = generate_and_send_tests_endpoint(request, user, db, recorder)
+            mark_finished(db, job, result=result)
+            print(f"✅ Job {job_id} completado en {result['timings']['total_seconds']}s")
+        except HTTPException as e:
+            db.rollback()
+            mark_finished(db, job, error=str(e.detail))
+            print(f"❌ Job {job_id} falló: {e.detail}")
+    except Exception as e:
+        print(f"❌ Error en job de generación {job_id}: {str(e)}")
+        db.rollback()
+        job = db.query(TestGenerationJob).filter(TestGenerationJob.id == job_id).first()
+        if job:
+            mark_finished(db, job, error=str(e))
+    finally:
+        db.close()
+
+def start_generate_tests_job_endpoint(
+    request: TestGenerationRequest,
+    current_user: User,
+    background_tasks: BackgroundTasks,
+    db: Session
+):
+    """Crea un job de generación de tests y lo ejecuta en segundo plano"""
+    job = create_job(db, current_user.id, request.azure_id, request.xray_path, request.force_regenerate)
+    background_tasks.add_task(run_generate_tests_job, job.id)
+    print(f"📥 Job de generación {job.id} encolado para HU {request.azure_id}")
+    
+    return {
+        "job_id": job.id,
+        "status": "queued",
+        "status_url": f"/generate-tests/{job.id}"
+    }
+
+def get_generate_tests_job_endpoint(
+    job_id: str,
+    current_user: User,
+    db: Session
+):
+    """Estado, tiempos por etapa y resultado de un job de generación de tests"""
+    job = db.query(TestGenerationJob).filter(
+        TestGenerationJob.id == job_id,
+        TestGenerationJob.user_id == current_user.id
+    ).first()
+    
+    if not job:
+        raise HTTPException(status_code=404, detail="Job no encontrado")
+    
+    # Job huérfano de un proceso reiniciado: se cierra para que el cliente deje de consultarlo
+    if is_stale(job):
+        mark_finished(db, job, error=INTERRUPTED_JOB_ERROR)
+    
+    return job_to_dict(job)
+
+def resend_hu_tests_endpoint(
+    hu_id: str,
+    current_user: User,
+    db: Session
+):
+    """Reenvía a XRay los tests guardados de una HU sin volver a generarlos"""
+    hu = db.query(HU).join(Project).filter(
+        HU.id == hu_id,
+        Project.user_id == current_user.id,
+        Project.deleted_at.is_(None)
+    ).first()
+    
+    if not hu:
+        raise HTTPException(status_code=404, detail="HU no encontrada")
+    
+    stored_tests = hu.tests_generated
+    if not isinstance(stored_tests, dict) or not stored_tests.get("classified_tests"):
+        raise HTTPException(status_code=400, detail="La HU no tiene tests generados guardados. Genera los tests primero.")
+    
+    print(f"🔁 Reenviando tests guardados de la HU {hu.azure_id} a XRay ({stored_tests.get('xray_path')})")
+    # Tenant de XRay del proyecto de la HU (no del proyecto activo)
+    xray_service = get_xray_service_for_project(hu.project)
+    xray_path = stored_tests.get("xray_path") or ""
+    try:
+        imported = load_imported_fingerprints(db, xray_service.client_id, hu.azure_id, xray_path)
+        xray_results = xray_service.send_classified_tests(stored_tests["classified_tests"], imported)
+        record_imported_fingerprints(db, xray_service.client_id, hu.azure_id, xray_path,
+                                     xray_results.pop("imported_fingerprints", []), imported)
+    except Exception as xray_error:
+        print(f"❌ Error reenviando tests a XRay: {str(xray_error)}")
+        raise HTTPException(status_code=500, detail="Error al reenviar tests a XRay.")
+    
+    hu.tests_generated = with_import_result(stored_tests, xray_results)
+    db.commit()
+    
+    return {
+        "success": hu.tests_generated["last_import"]["success"],
+        "hu_id": hu.id,
+        "azure_id": hu.azure_id,
+        "xray_path": stored_tests.get("xray_path"),
+        "tests_sent": xray_results.get("summary", {}).get("total_success", 0),
+        "tests_skipped": xray_results.get("summary", {}).get("total_skipped", 0),
+        "xray_results": xray_results
+    }
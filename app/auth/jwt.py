@@ -4,7 +4,7 @@ from jose import JWTError, jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from .schemas import TokenData, UserInDB, UserResponse
-from ..database.connection import get_db
+from ..database.connection import get_async_db, run_in_session
 from ..database.models import User
 from sqlalchemy.orm import Session
 import os
@@ -62,7 +62,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+async def get_current_user(token: str = Depends(oauth2_scheme), db = Depends(get_async_db)) -> User:
     """Obtiene el usuario actual a partir del token JWT"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -80,7 +80,7 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
         print(f"Error al decodificar el token: {e}")  # Debug
         raise credentials_exception
     
-    user = get_user_by_username(db, username=token_data.username)
+    user = await run_in_session(db, lambda session: get_user_by_username(session, username=token_data.username))
     if user is None:
         print(f"Usuario no encontrado en la base de datos: {token_data.username}")  # Debug
         raise credentials_exception
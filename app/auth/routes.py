@@ -21,9 +21,11 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
+# Rutas síncronas (bcrypt y sesión síncrona): FastAPI las ejecuta en el threadpool
+
 # Ruta para registrar un nuevo usuario
 @router.post("/register", response_model=UserResponse)
-async def register_user(
+def register_user(
     user_data: UserCreate,
     db: Session = Depends(get_db)
 ):
@@ -70,7 +72,7 @@ async def register_user(
 
 # Ruta para iniciar sesión y obtener token
 @router.post("/token", response_model=Token)
-async def login_for_access_token(
+def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db)
 ):
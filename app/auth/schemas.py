@@ -69,3 +69,5 @@ class ProjectResponse(BaseModel):
 class ProjectListResponse(BaseModel):
     projects: List[ProjectResponse]
     active_project_id: Optional[str] = None
+    next_cursor: Optional[str] = None  # Cursor de la página siguiente (None en la última)
+    total: Optional[int] = None  # Solo con include_total=true
@@ -1,22 +1,252 @@
 import os
-from sqlalchemy import create_engine
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, Optional
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from starlette.concurrency import run_in_threadpool
 from dotenv import load_dotenv
+from ..utils.content_codec import decode_content
+from .query_stats import instrument_engine
 
 # Load environment variables
 load_dotenv()
 
 # Database setup
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./riwi_qa.db")
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {})
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name, "")
+    return int(value) if value.strip() else default
+
+# Pragmas aplicados a cada conexión SQLite. WAL permite leer mientras otra conexión escribe y
+# busy_timeout hace que los escritores esperen el lock en lugar de fallar con "database is locked".
+# Un valor vacío deja el pragma con el valor por defecto de SQLite.
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "busy_timeout": os.getenv("SQLITE_BUSY_TIMEOUT_MS", "15000"),
+    "mmap_size": os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)),
+    "cache_size": os.getenv("SQLITE_CACHE_SIZE", "-65536"),  # Negativo = KiB (64 MB)
+}
+
+# Pool de conexiones para Postgres (y demás bases con servidor). Con DB_ASYNC cada motor tiene su
+# propio pool, así que el máximo de conexiones por proceso es el doble.
+DB_POOL_SIZE = _env_int("DB_POOL_SIZE", 10)
+DB_MAX_OVERFLOW = _env_int("DB_MAX_OVERFLOW", 20)
+DB_POOL_TIMEOUT = _env_int("DB_POOL_TIMEOUT", 30)
+DB_POOL_RECYCLE = _env_int("DB_POOL_RECYCLE", 1800)
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+# Segundos entre avisos de pool saturado (todas las conexiones en uso)
+DB_POOL_WARN_INTERVAL = _env_int("DB_POOL_WARN_INTERVAL", 60)
+
+def _register_sqlite_functions(dbapi_connection, connection_record):
+    # Usada por los triggers de búsqueda para indexar el texto de refinamiento comprimido
+    dbapi_connection.create_function("refinement_inflate", 2, decode_content, deterministic=True)
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in SQLITE_PRAGMAS.items():
+            if value.strip():
+                cursor.execute(f"PRAGMA {name}={value.strip()}")
+    finally:
+        cursor.close()
+
+class PoolStats:
+    """Contadores de uso del pool de un motor, alimentados por los eventos del pool"""
+
+    def __init__(self, name: str, pool):
+        self.name = name
+        self.pool = pool
+        self.lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.invalidated = 0
+        self.checked_out = 0
+        self.peak_checked_out = 0
+        self.saturated = 0
+        self.last_warning = 0.0
+
+    def capacity(self) -> Optional[int]:
+        if not hasattr(self.pool, "size") or not hasattr(self.pool, "_max_overflow"):
+            return None
+        if self.pool._max_overflow < 0:
+            return None
+        return self.pool.size() + self.pool._max_overflow
+
+    def on_connect(self, dbapi_connection, connection_record):
+        with self.lock:
+            self.connects += 1
+
+    def on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        capacity = self.capacity()
+        with self.lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.peak_checked_out = max(self.peak_checked_out, self.checked_out)
+            full = capacity is not None and self.checked_out >= capacity
+            if full:
+                self.saturated += 1
+            warn = full and time.monotonic() - self.last_warning >= DB_POOL_WARN_INTERVAL
+            if warn:
+                self.last_warning = time.monotonic()
+        if warn:
+            print(f"⚠️ Pool de conexiones '{self.name}' saturado: {self.checked_out}/{capacity} en uso "
+                  f"(las siguientes peticiones esperan hasta {DB_POOL_TIMEOUT}s)")
+
+    def on_checkin(self, dbapi_connection, connection_record):
+        with self.lock:
+            self.checked_out = max(0, self.checked_out - 1)
+
+    def on_invalidate(self, dbapi_connection, connection_record, exception):
+        with self.lock:
+            self.invalidated += 1
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            stats = {
+                "pool": type(self.pool).__name__,
+                "checked_out": self.checked_out,
+                "peak_checked_out": self.peak_checked_out,
+                "capacity": self.capacity(),
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "invalidated": self.invalidated,
+                "saturated_checkouts": self.saturated,
+            }
+        for key, method in (("size", "size"), ("checked_in", "checkedin"), ("overflow", "overflow")):
+            if hasattr(self.pool, method):
+                stats[key] = getattr(self.pool, method)()
+        return stats
+
+_pool_stats: Dict[str, PoolStats] = {}
+
+def create_app_engine(url: str, async_: bool = False, name: Optional[str] = None):
+    """
+    Crea un motor (síncrono o asíncrono) con la configuración por backend: pragmas en cada conexión
+    SQLite, tamaño del pool / pre-ping / reciclado en Postgres, estadísticas del pool y medición de
+    consultas (query_stats) en ambos.
+    """
+    parsed = make_url(url)
+    kwargs = {}
+    if parsed.get_backend_name() == "sqlite":
+        if not async_:
+            kwargs["connect_args"] = {"check_same_thread": False}
+        elif parsed.database and parsed.database != ":memory:":
+            # aiosqlite usa NullPool por defecto: una conexión nueva (y sus pragmas) por petición
+            kwargs["poolclass"] = AsyncAdaptedQueuePool
+    else:
+        kwargs.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=DB_POOL_PRE_PING,
+        )
+    new_engine = create_async_engine(url, **kwargs) if async_ else create_engine(url, **kwargs)
+    sync_engine = new_engine.sync_engine if async_ else new_engine
+
+    if sync_engine.dialect.name == "sqlite":
+        event.listen(sync_engine, "connect", _register_sqlite_functions)
+        if parsed.database and parsed.database != ":memory:":
+            event.listen(sync_engine, "connect", _apply_sqlite_pragmas)
+
+    instrument_engine(sync_engine)
+    stats = PoolStats(name or ("async" if async_ else "sync"), sync_engine.pool)
+    event.listen(sync_engine.pool, "connect", stats.on_connect)
+    event.listen(sync_engine.pool, "checkout", stats.on_checkout)
+    event.listen(sync_engine.pool, "checkin", stats.on_checkin)
+    event.listen(sync_engine.pool, "invalidate", stats.on_invalidate)
+    _pool_stats[stats.name] = stats
+    return new_engine
+
+def get_pool_stats() -> Dict[str, dict]:
+    """Estado de los pools de conexiones de los motores de la aplicación"""
+    return {name: stats.snapshot() for name, stats in _pool_stats.items()}
+
+engine = create_app_engine(DATABASE_URL)
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# Motor asíncrono para los endpoints (aiosqlite / asyncpg). Los scripts, las migraciones y las tareas
+# en segundo plano siguen usando el motor síncrono.
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+def get_async_database_url(url: str) -> Optional[str]:
+    """URL equivalente con driver asíncrono, o None si el dialecto no tiene uno configurado"""
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if not driver:
+        return None
+    if driver == "postgresql+asyncpg" and "sslmode" in parsed.query:
+        # asyncpg recibe el modo SSL como "ssl"
+        query = dict(parsed.query)
+        query["ssl"] = query.pop("sslmode")
+        parsed = parsed.set(query=query)
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
+def _create_async_engine(url: str, name: str):
+    if os.getenv("DB_ASYNC", "true").lower() != "true":
+        return None
+    async_url = get_async_database_url(url)
+    if not async_url:
+        return None
+    try:
+        return create_app_engine(async_url, async_=True, name=name)
+    except ImportError as e:
+        print(f"⚠️ Driver asíncrono no disponible ({str(e)}), los endpoints usarán el motor síncrono en un threadpool")
+        return None
+
+async_engine = _create_async_engine(DATABASE_URL, "async")
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False) if async_engine else None
+
+# Réplica de lectura opcional para los endpoints GET (ver app/database/replica.py). Solo se lee de
+# ella: el esquema y las migraciones se aplican en la primaria y llegan por la replicación.
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL", "").strip()
+replica_engine = create_app_engine(DATABASE_REPLICA_URL, name="replica") if DATABASE_REPLICA_URL else None
+ReplicaSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=replica_engine) if replica_engine else None
+async_replica_engine = _create_async_engine(DATABASE_REPLICA_URL, "async_replica") if DATABASE_REPLICA_URL else None
+AsyncReplicaSessionLocal = async_sessionmaker(async_replica_engine, autoflush=False) if async_replica_engine else None
+
 # Database dependency
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+@asynccontextmanager
+async def open_session(async_factory, sync_factory):
+    """Sesión de async_factory o, si no hay motor asíncrono, de sync_factory (cerrada en el threadpool)"""
+    if async_factory is None:
+        db = sync_factory()
+        try:
+            yield db
+        finally:
+            await run_in_threadpool(db.close)
+        return
+    async with async_factory() as db:
+        yield db
+
+async def get_async_db():
+    """Sesión asíncrona para los endpoints; sin motor asíncrono entrega una sesión síncrona"""
+    async with open_session(AsyncSessionLocal, SessionLocal) as db:
+        yield db
+
+async def run_in_session(db, func: Callable):
+    """
+    Ejecuta func(session) sin bloquear el event loop: sobre la sesión asíncrona con run_sync (las
+    consultas, incluidas las cargas diferidas, esperan al driver asíncrono) o, con una sesión
+    síncrona, en el threadpool.
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(func)
+    return await run_in_threadpool(func, db)
\ No newline at end of file
@@ -0,0 +1,369 @@
+"""
+Migraciones de esquema versionadas.
+
+Base.metadata.create_all crea las tablas nuevas, pero no modifica las existentes: los cambios
+sobre tablas ya creadas (índices, columnas, backfills) se registran aquí con un número de versión
+y se aplican una sola vez por base de datos, en orden, guardando el historial en schema_migrations.
+
+    python scripts/migrate.py status
+    python scripts/migrate.py upgrade
+"""
+import json
+import os
+from collections import Counter
+from typing import Callable, List, NamedTuple
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    upgrade: Callable[[Connection], None]
+
+MIGRATIONS: List[Migration] = []
+
+# Clave del advisory lock de Postgres para que dos workers no migren a la vez
+_POSTGRES_LOCK_KEY = 71_203_441
+
+def migration(version: int, description: str):
+    """Registra una migración. Las versiones deben ser únicas y crecientes"""
+    def decorator(func: Callable[[Connection], None]):
+        if any(m.version == version for m in MIGRATIONS):
+            raise ValueError(f"Migración {version} duplicada")
+        MIGRATIONS.append(Migration(version, description, func))
+        MIGRATIONS.sort(key=lambda m: m.version)
+        return func
+    return decorator
+
+def _ensure_history_table(conn: Connection):
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "version INTEGER PRIMARY KEY, "
+        "description VARCHAR(200) NOT NULL, "
+        "applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+    ))
+
+def get_applied_versions(conn: Connection) -> set:
+    _ensure_history_table(conn)
+    return {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+def pending_migrations(engine: Engine) -> List[Migration]:
+    with engine.begin() as conn:
+        applied = get_applied_versions(conn)
+    return [m for m in MIGRATIONS if m.version not in applied]
+
+def run_migrations(engine: Engine) -> List[int]:
+    """Aplica las migraciones pendientes, cada una en su propia transacción. Retorna las versiones aplicadas"""
+    applied_now = []
+    for candidate in pending_migrations(engine):
+        with engine.begin() as conn:
+            if conn.dialect.name == "postgresql":
+                conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _POSTGRES_LOCK_KEY})
+            # Otro proceso pudo aplicarla mientras esperábamos
+            if candidate.version in get_applied_versions(conn):
+                continue
+            print(f"🛠️ Aplicando migración {candidate.version}: {candidate.description}")
+            candidate.upgrade(conn)
+            conn.execute(
+                text("INSERT INTO schema_migrations (version, description) VALUES (:version, :description)"),
+                {"version": candidate.version, "description": candidate.description}
+            )
+            applied_now.append(candidate.version)
+    return applied_now
+
+def auto_migrate_enabled() -> bool:
+    return os.getenv("AUTO_MIGRATE", "true").lower() == "true"
+
+# ==================== MIGRACIONES ====================
+
+# Índices de las rutas calientes. Se declaran también en los modelos (las bases nuevas los reciben con
+# create_all), por eso se crean con IF NOT EXISTS, válido en SQLite y Postgres.
+HOT_PATH_INDEXES = [
+    ("ix_projects_user_active", "projects", "user_id, is_active"),
+    ("ix_hus_project_created", "hus", "project_id, created_at"),
+    ("ix_hus_project_status_created", "hus", "project_id, status, created_at"),
+]
+
+@migration(1, "Índices compuestos para proyectos activos y listados de HUs")
+def add_hot_path_indexes(conn: Connection):
+    for name, table, columns in HOT_PATH_INDEXES:
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})"))
+
+# Búsqueda de HUs (ver app/services/hu_search.py)
+HU_SEARCH_COLUMNS = ["name", "azure_id", "feature", "module", "refined_response"]
+
+def _create_sqlite_hu_fts(conn: Connection):
+    columns = ", ".join(HU_SEARCH_COLUMNS)
+    new_values = ", ".join(f"new.{column}" for column in HU_SEARCH_COLUMNS)
+    old_values = ", ".join(f"old.{column}" for column in HU_SEARCH_COLUMNS)
+    conn.execute(text(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS hus_fts USING fts5({columns}, "
+        "content='hus', content_rowid='rowid', tokenize='unicode61 remove_diacritics 2')"
+    ))
+    conn.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS hus_fts_ai AFTER INSERT ON hus BEGIN "
+        f"INSERT INTO hus_fts(rowid, {columns}) VALUES (new.rowid, {new_values}); END"
+    ))
+    conn.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS hus_fts_ad AFTER DELETE ON hus BEGIN "
+        f"INSERT INTO hus_fts(hus_fts, rowid, {columns}) VALUES ('delete', old.rowid, {old_values}); END"
+    ))
+    conn.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS hus_fts_au AFTER UPDATE OF {columns} ON hus BEGIN "
+        f"INSERT INTO hus_fts(hus_fts, rowid, {columns}) VALUES ('delete', old.rowid, {old_values}); "
+        f"INSERT INTO hus_fts(rowid, {columns}) VALUES (new.rowid, {new_values}); END"
+    ))
+    # Indexa las HUs existentes
+    conn.execute(text("INSERT INTO hus_fts(hus_fts) VALUES ('rebuild')"))
+
+def _create_postgres_hu_trgm(conn: Connection):
+    savepoint = conn.begin_nested()
+    try:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        savepoint.commit()
+    except Exception as e:
+        savepoint.rollback()
+        print(f"⚠️ No se pudo habilitar pg_trgm, la búsqueda de HUs usará ILIKE sin índice: {str(e)}")
+        return
+    for column in HU_SEARCH_COLUMNS:
+        conn.execute(text(
+            f"CREATE INDEX IF NOT EXISTS ix_hus_{column}_trgm ON hus USING gin ({column} gin_trgm_ops)"
+        ))
+
+@migration(2, "Índices de búsqueda de HUs (FTS5 en SQLite, pg_trgm en Postgres)")
+def add_hu_search_indexes(conn: Connection):
+    if conn.dialect.name == "sqlite":
+        try:
+            _create_sqlite_hu_fts(conn)
+        except Exception as e:
+            # SQLite compilado sin FTS5: la búsqueda sigue funcionando con LIKE
+            print(f"⚠️ FTS5 no disponible, la búsqueda de HUs usará LIKE: {str(e)}")
+    elif conn.dialect.name == "postgresql":
+        _create_postgres_hu_trgm(conn)
+
+def _sqlite_table_exists(conn: Connection, name: str) -> bool:
+    return conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = :name"), {"name": name}).first() is not None
+
+def _sqlite_hu_fts_values(alias: str) -> str:
+    # El texto refinado se indexa descomprimido desde refinement_contents (función registrada en connection.py)
+    return ", ".join(
+        f"(SELECT refinement_inflate(codec, body) FROM refinement_contents WHERE hash = {alias}.refined_hash)"
+        if column == "refined_response" else f"{alias}.{column}"
+        for column in HU_SEARCH_COLUMNS
+    )
+
+def _create_sqlite_hu_fts_contentless(conn: Connection):
+    columns = ", ".join(HU_SEARCH_COLUMNS)
+    tracked = ", ".join(column for column in HU_SEARCH_COLUMNS if column != "refined_response") + ", refined_hash"
+    conn.execute(text(
+        f"CREATE VIRTUAL TABLE hus_fts USING fts5({columns}, content='', tokenize='unicode61 remove_diacritics 2')"
+    ))
+    conn.execute(text(
+        f"CREATE TRIGGER hus_fts_ai AFTER INSERT ON hus BEGIN "
+        f"INSERT INTO hus_fts(rowid, {columns}) VALUES (new.rowid, {_sqlite_hu_fts_values('new')}); END"
+    ))
+    conn.execute(text(
+        f"CREATE TRIGGER hus_fts_ad AFTER DELETE ON hus BEGIN "
+        f"INSERT INTO hus_fts(hus_fts, rowid, {columns}) VALUES ('delete', old.rowid, {_sqlite_hu_fts_values('old')}); END"
+    ))
+    conn.execute(text(
+        f"CREATE TRIGGER hus_fts_au AFTER UPDATE OF {tracked} ON hus BEGIN "
+        f"INSERT INTO hus_fts(hus_fts, rowid, {columns}) VALUES ('delete', old.rowid, {_sqlite_hu_fts_values('old')}); "
+        f"INSERT INTO hus_fts(rowid, {columns}) VALUES (new.rowid, {_sqlite_hu_fts_values('new')}); END"
+    ))
+    conn.execute(text(f"INSERT INTO hus_fts(rowid, {columns}) SELECT hus.rowid, {_sqlite_hu_fts_values('hus')} FROM hus"))
+
+@migration(3, "Textos de refinamiento en un almacén deduplicado y comprimido (refinement_contents)")
+def move_refinements_to_content_store(conn: Connection):
+    from sqlalchemy import inspect
+    from ..utils.content_codec import content_hash, encode_content
+
+    # refinement_contents la crea create_all; aquí solo se agregan las referencias en hus
+    existing_columns = {column["name"] for column in inspect(conn).get_columns("hus")}
+    for column in ("refined_hash", "markdown_hash"):
+        if column not in existing_columns:
+            conn.execute(text(f"ALTER TABLE hus ADD COLUMN {column} VARCHAR(64) REFERENCES refinement_contents(hash)"))
+
+    # El índice de búsqueda leía las columnas de texto: se elimina antes del backfill y se recrea después
+    sqlite_fts = conn.dialect.name == "sqlite" and _sqlite_table_exists(conn, "hus_fts")
+    if sqlite_fts:
+        for trigger in ("hus_fts_ai", "hus_fts_ad", "hus_fts_au"):
+            conn.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+        conn.execute(text("DROP TABLE hus_fts"))
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("DROP INDEX IF EXISTS ix_hus_refined_response_trgm"))
+
+    known = {row[0] for row in conn.execute(text("SELECT hash FROM refinement_contents"))}
+    moved = 0
+    while True:
+        rows = conn.execute(text(
+            "SELECT id, refined_response, markdown_response FROM hus "
+            "WHERE refined_response IS NOT NULL OR markdown_response IS NOT NULL LIMIT 500"
+        )).fetchall()
+        if not rows:
+            break
+        for hu_id, refined, markdown in rows:
+            hashes = {}
+            for kind, value in (("refined", refined), ("markdown", markdown)):
+                if value is None:
+                    hashes[kind] = None
+                    continue
+                hashes[kind] = content_hash(value)
+                if hashes[kind] not in known:
+                    codec, body = encode_content(value)
+                    conn.execute(
+                        text("INSERT INTO refinement_contents (hash, codec, body, length, stored_size) "
+                             "VALUES (:hash, :codec, :body, :length, :stored_size)"),
+                        {"hash": hashes[kind], "codec": codec, "body": body, "length": len(value), "stored_size": len(body)}
+                    )
+                    known.add(hashes[kind])
+            conn.execute(
+                text("UPDATE hus SET refined_hash = COALESCE(:refined, refined_hash), "
+                     "markdown_hash = COALESCE(:markdown, markdown_hash), "
+                     "refined_response = NULL, markdown_response = NULL WHERE id = :id"),
+                {"refined": hashes["refined"], "markdown": hashes["markdown"], "id": hu_id}
+            )
+        moved += len(rows)
+    print(f"   📦 {moved} HUs movidas a refinement_contents ({len(known)} contenidos distintos)")
+
+    if sqlite_fts:
+        _create_sqlite_hu_fts_contentless(conn)
+
+def _hu_stats_entries_v4(status, feature, module, tests_generated) -> Counter:
+    # Copia congelada de utils/hu_stats.hu_stats_entries tal como estaba en la migración 4: los cambios
+    # posteriores al cálculo no deben cambiar lo que hace esta migración
+    entries = Counter()
+    entries[("hus", "total")] += 1
+    entries[("status", status or "pending")] += 1
+    entries[("feature", feature or "")] += 1
+    entries[("module", module or "")] += 1
+    if isinstance(tests_generated, str):
+        tests_generated = json.loads(tests_generated)
+    classified = tests_generated.get("classified_tests") if isinstance(tests_generated, dict) else None
+    if not classified:
+        return entries
+    entries[("tests", "hus_with_tests")] += 1
+    for category, tests in classified.items():
+        count = len(tests or [])
+        entries[("tests", "generated")] += count
+        entries[("criticality", category)] += count
+    last_import = tests_generated.get("last_import")
+    if isinstance(last_import, dict):
+        entries[("tests", "imported")] += last_import.get("tests_sent", 0) + last_import.get("tests_skipped", 0)
+        entries[("tests", "import_failed")] += last_import.get("tests_failed", 0)
+        if last_import.get("success"):
+            entries[("tests", "hus_imported")] += 1
+    return entries
+
+@migration(4, "Estadísticas de HUs por proyecto: carga inicial de project_hu_stats")
+def backfill_project_stats(conn: Connection):
+    # project_hu_stats la crea create_all; desde aquí la mantienen el flush de las HUs y la reconciliación
+    # hus.status guarda el nombre del enum ("PENDING"), las estadísticas usan el valor ("pending")
+    project_ids = [row[0] for row in conn.execute(text("SELECT id FROM projects"))]
+    for project_id in project_ids:
+        entries = Counter()
+        rows = conn.execute(
+            text("SELECT status, feature, module, tests_generated FROM hus WHERE project_id = :project_id"),
+            {"project_id": project_id}
+        )
+        for status, feature, module, tests_generated in rows:
+            entries.update(_hu_stats_entries_v4(status.lower() if status else None, feature, module, tests_generated))
+        conn.execute(text("DELETE FROM project_hu_stats WHERE project_id = :project_id"), {"project_id": project_id})
+        values = [{"project_id": project_id, "dimension": dimension, "key": key, "count": count}
+                  for (dimension, key), count in sorted(entries.items()) if count]
+        if values:
+            conn.execute(
+                text("INSERT INTO project_hu_stats (project_id, dimension, key, count, updated_at) "
+                     "VALUES (:project_id, :dimension, :key, :count, CURRENT_TIMESTAMP)"),
+                values
+            )
+    print(f"   📊 Estadísticas calculadas para {len(project_ids)} proyectos")
+
+@migration(5, "Número de work item normalizado (hus.azure_number) con índice único por proyecto")
+def add_hu_azure_number(conn: Connection):
+    from sqlalchemy import inspect
+    from ..utils.azure_ids import parse_azure_number
+
+    if "azure_number" not in {column["name"] for column in inspect(conn).get_columns("hus")}:
+        conn.execute(text("ALTER TABLE hus ADD COLUMN azure_number INTEGER"))
+
+    # "HU-129" y "129" en el mismo proyecto son la misma HU: solo la más antigua conserva el número
+    # (las demás quedan en NULL y se informan)
+    rows = conn.execute(text("SELECT id, azure_id, project_id FROM hus ORDER BY created_at, id")).fetchall()
+    seen, updates, duplicates = set(), [], []
+    for hu_id, azure_id, project_id in rows:
+        number = parse_azure_number(azure_id)
+        if number is None:
+            continue
+        if project_id is not None and (project_id, number) in seen:
+            duplicates.append(hu_id)
+            continue
+        seen.add((project_id, number))
+        updates.append({"number": number, "id": hu_id})
+    for start in range(0, len(updates), 1000):
+        conn.execute(text("UPDATE hus SET azure_number = :number WHERE id = :id"), updates[start:start + 1000])
+    filled = len(updates)
+    print(f"   🔢 {filled} HUs con azure_number")
+    if duplicates:
+        print(f"   ⚠️ {len(duplicates)} HUs repiten el número de otra HU del mismo proyecto y quedan sin azure_number: "
+              f"{', '.join(duplicates[:20])}")
+
+    conn.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_hus_project_azure_number ON hus (project_id, azure_number)"
+    ))
+
+@migration(6, "Eliminación lógica de proyectos (projects.deleted_at)")
+def add_project_deleted_at(conn: Connection):
+    # project_purges la crea create_all
+    from sqlalchemy import inspect
+
+    if "deleted_at" not in {column["name"] for column in inspect(conn).get_columns("projects")}:
+        column_type = "TIMESTAMP WITH TIME ZONE" if conn.dialect.name == "postgresql" else "DATETIME"
+        conn.execute(text(f"ALTER TABLE projects ADD COLUMN deleted_at {column_type}"))
+
+@migration(7, "Texto refinado buscable fuera de SQLite (refinement_contents.search_text con índice pg_trgm)")
+def add_refinement_search_text(conn: Connection):
+    from sqlalchemy import inspect
+    from ..utils.content_codec import decode_content
+
+    if "search_text" not in {column["name"] for column in inspect(conn).get_columns("refinement_contents")}:
+        conn.execute(text("ALTER TABLE refinement_contents ADD COLUMN search_text TEXT"))
+    # En SQLite el texto refinado lo indexa FTS5 (o se descomprime en la consulta con refinement_inflate)
+    if conn.dialect.name == "sqlite":
+        return
+
+    filled = 0
+    while True:
+        rows = conn.execute(text(
+            "SELECT hash, codec, body FROM refinement_contents WHERE search_text IS NULL LIMIT 500"
+        )).fetchall()
+        if not rows:
+            break
+        conn.execute(
+            text("UPDATE refinement_contents SET search_text = :search_text WHERE hash = :hash"),
+            [{"search_text": decode_content(codec, body), "hash": content_hash} for content_hash, codec, body in rows]
+        )
+        filled += len(rows)
+    print(f"   🔎 {filled} contenidos de refinamiento con texto de búsqueda")
+
+    if conn.dialect.name == "postgresql" and conn.execute(
+        text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+    ).first():
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_refinement_contents_search_text_trgm "
+            "ON refinement_contents USING gin (search_text gin_trgm_ops)"
+        ))
+
+@migration(8, "Índices de hus.refined_hash / markdown_hash para borrar refinement_contents sin referencias")
+def add_refinement_hash_indexes(conn: Connection):
+    for column in ("refined_hash", "markdown_hash"):
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_hus_{column} ON hus ({column})"))
+
+@migration(9, "Regeneración forzada en los jobs de generación de tests (test_generation_jobs.force_regenerate)")
+def add_job_force_regenerate(conn: Connection):
+    from sqlalchemy import inspect
+
+    if "force_regenerate" not in {column["name"] for column in inspect(conn).get_columns("test_generation_jobs")}:
+        conn.execute(text(
+            "ALTER TABLE test_generation_jobs ADD COLUMN force_regenerate BOOLEAN NOT NULL DEFAULT FALSE"
+        ))
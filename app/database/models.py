@@ -1,16 +1,31 @@
 import enum
 import uuid
-from sqlalchemy import Column, String, Text, DateTime, Enum, JSON, Boolean, ForeignKey
+from collections import Counter
+from typing import Optional
+from sqlalchemy import Column, String, Text, DateTime, Enum, JSON, Boolean, ForeignKey, Integer, UniqueConstraint, Index, LargeBinary, event
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy import inspect, select
+from sqlalchemy.orm import relationship, deferred, validates, Session, make_transient_to_detached
+from sqlalchemy.orm.util import identity_key
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
 from .connection import Base, engine
+from ..utils.content_codec import content_hash, encode_content, decode_content
+from ..utils.hu_stats import hu_stats_entries
+from ..utils.azure_ids import parse_azure_number
 
 class HUStatus(enum.Enum):
     PENDING = "pending"
     ACCEPTED = "accepted"
     REJECTED = "rejected"
 
+class JobStatus(enum.Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
 class User(Base):
     __tablename__ = "users"
     
@@ -27,6 +42,9 @@ class User(Base):
 
 class Project(Base):
     __tablename__ = "projects"
+    __table_args__ = (
+        Index("ix_projects_user_active", "user_id", "is_active"),
+    )
     
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     name = Column(String(100), nullable=False)
@@ -45,20 +63,63 @@ class Project(Base):
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now(), server_default=func.now())
+    # Eliminación lógica: el proyecto deja de verse y services/project_purge.py borra sus HUs por lotes
+    deleted_at = Column(DateTime(timezone=True), nullable=True)
     
     # Relación con usuario
     user = relationship("User", back_populates="projects")
 
+class RefinementContent(Base):
+    __tablename__ = "refinement_contents"
+    
+    # Textos de refinamiento, una fila por contenido distinto (sha256 del texto), comprimidos
+    hash = Column(String(64), primary_key=True)
+    codec = Column(String(10), nullable=False, default="zlib")
+    body = Column(LargeBinary, nullable=False)
+    length = Column(Integer, nullable=False)  # Caracteres del texto original
+    stored_size = Column(Integer, nullable=False)  # Bytes guardados (comprimidos)
+    # Copia descomprimida para la búsqueda con pg_trgm / ILIKE (fuera de SQLite, donde la indexa FTS5);
+    # Postgres ya comprime los textos grandes (TOAST)
+    search_text = deferred(Column(Text, nullable=True))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    @classmethod
+    def from_text(cls, text: str) -> "RefinementContent":
+        codec, body = encode_content(text)
+        return cls(hash=content_hash(text), codec=codec, body=body, length=len(text), stored_size=len(body))
+    
+    @property
+    def text(self) -> str:
+        # Se descomprime una sola vez por instancia
+        if "_text" not in self.__dict__:
+            self.__dict__["_text"] = decode_content(self.codec, self.body)
+        return self.__dict__["_text"]
+
 class HU(Base):
     __tablename__ = "hus"
+    __table_args__ = (
+        Index("ix_hus_project_created", "project_id", "created_at"),
+        Index("ix_hus_project_status_created", "project_id", "status", "created_at"),
+        Index("ux_hus_project_azure_number", "project_id", "azure_number", unique=True),
+        # Limpieza de refinement_contents sin referencias (services/refinement_gc.py)
+        Index("ix_hus_refined_hash", "refined_hash"),
+        Index("ix_hus_markdown_hash", "markdown_hash"),
+    )
     
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     azure_id = Column(String(50), unique=True, nullable=False)
+    azure_number = Column(Integer, nullable=True)  # Número del work item ("HU-129" -> 129), ver parse_azure_number
     name = Column(String(500), nullable=False)
-    description = Column(Text, nullable=True)
+    # Textos grandes: se cargan diferidos (grupo "refinement") para que los listados no los lean;
+    # usar undefer_group("refinement") cuando se necesiten en la misma consulta
+    description = deferred(Column(Text, nullable=True), group="refinement")
     status = Column(Enum(HUStatus), default=HUStatus.PENDING, nullable=False)
-    refined_response = Column(Text, nullable=True)  # Respuesta refinada en texto plano
-    markdown_response = Column(Text, nullable=True)  # Respuesta refinada en Markdown
+    # Columnas heredadas: hasta la migración 3 guardaban el texto completo, ahora quedan en NULL
+    _refined_response = deferred(Column("refined_response", Text, nullable=True), group="refinement")
+    _markdown_response = deferred(Column("markdown_response", Text, nullable=True), group="refinement")
+    # Respuesta refinada en texto plano y en Markdown, en el almacén deduplicado (refinement_contents)
+    refined_hash = Column(String(64), ForeignKey("refinement_contents.hash"), nullable=True)
+    markdown_hash = Column(String(64), ForeignKey("refinement_contents.hash"), nullable=True)
     feature = Column(String(200), nullable=True)  # Feature a la que pertenece la HU
     module = Column(String(200), nullable=True)  # Módulo al que pertenece la HU
     language = Column(String(10), nullable=True, default='es')  # Idioma de refinamiento ('es' o 'en')
@@ -69,6 +130,315 @@ class HU(Base):
     
     # Relación con proyecto
     project = relationship("Project", backref="hus")
+    refined_content = relationship("RefinementContent", foreign_keys=[refined_hash])
+    markdown_content = relationship("RefinementContent", foreign_keys=[markdown_hash])
+    revisions = relationship("HURevision", back_populates="hu", cascade="all, delete-orphan",
+                             order_by="HURevision.revision")
+    
+    @validates("azure_id")
+    def _sync_azure_number(self, key, value):
+        self.azure_number = parse_azure_number(value)
+        return value
+    
+    # refined_response / markdown_response se leen y escriben como texto; al hacer flush el texto
+    # se guarda (o se reutiliza si ya existe) en refinement_contents
+    @property
+    def refined_response(self) -> Optional[str]:
+        return self._get_text("refined")
+    
+    @refined_response.setter
+    def refined_response(self, value: Optional[str]):
+        self._set_text("refined", value)
+    
+    @property
+    def markdown_response(self) -> Optional[str]:
+        return self._get_text("markdown")
+    
+    @markdown_response.setter
+    def markdown_response(self, value: Optional[str]):
+        self._set_text("markdown", value)
+    
+    def _get_text(self, kind: str) -> Optional[str]:
+        pending = self.__dict__.get("_pending_texts") or {}
+        if kind in pending:
+            return pending[kind]
+        if getattr(self, f"{kind}_hash"):
+            return getattr(self, f"{kind}_content").text
+        return getattr(self, f"_{kind}_response")
+    
+    def _set_text(self, kind: str, value: Optional[str]):
+        self.__dict__.setdefault("_pending_texts", {})[kind] = value
+        setattr(self, f"_{kind}_response", None)
+        setattr(self, f"{kind}_hash", content_hash(value) if value is not None else None)
+
+class ProjectHUStat(Base):
+    """
+    Contadores de HUs por proyecto (dimensión / clave -> cantidad): estado, feature, módulo, criticidad
+    de los tests y tests generados / importados. Se actualizan en la misma transacción que las HUs
+    (ver _update_project_stats) y se reconcilian periódicamente (services/project_stats.py).
+    """
+    __tablename__ = "project_hu_stats"
+    
+    project_id = Column(String(36), ForeignKey("projects.id"), primary_key=True)
+    dimension = Column(String(20), primary_key=True)  # hus, status, feature, module, criticality, tests
+    key = Column(String(200), primary_key=True)  # "" = HU sin feature / módulo
+    count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now(), server_default=func.now())
+
+class HURevision(Base):
+    """
+    Historial de refinamientos de una HU, solo de inserción: una fila por versión generada (creación,
+    rechazo con feedback, refinamiento automático) con el modelo, los tokens y la latencia de la llamada.
+    Los textos se guardan como deltas zlib contra la revisión anterior (ver services/hu_revisions.py).
+    """
+    __tablename__ = "hu_revisions"
+    __table_args__ = (UniqueConstraint("hu_id", "revision", name="uq_hu_revisions_hu_revision"),)
+    
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    hu_id = Column(String(36), ForeignKey("hus.id", ondelete="CASCADE"), nullable=False)
+    revision = Column(Integer, nullable=False)  # 1, 2, 3... por HU
+    trigger = Column(String(20), nullable=False)  # baseline, create, rejection, auto_refine
+    feedback = Column(Text, nullable=True)  # Motivo del rechazo que originó la revisión
+    user_id = Column(String(36), ForeignKey("users.id"), nullable=True)
+    model = Column(String(100), nullable=True)
+    prompt_tokens = Column(Integer, nullable=True)
+    completion_tokens = Column(Integer, nullable=True)
+    total_tokens = Column(Integer, nullable=True)
+    latency_ms = Column(Integer, nullable=True)
+    # "zlib": textos completos (revisión clave); "zlib-delta": refined contra el refined de la revisión
+    # anterior. markdown siempre es delta contra el refined de la misma revisión
+    codec = Column(String(16), nullable=False)
+    refined_body = Column(LargeBinary, nullable=False)
+    markdown_body = Column(LargeBinary, nullable=False)
+    refined_hash = Column(String(64), nullable=False)  # sha256 de los textos, para verificar la reconstrucción
+    markdown_hash = Column(String(64), nullable=False)
+    length = Column(Integer, nullable=False)  # Caracteres de refined + markdown
+    stored_size = Column(Integer, nullable=False)  # Bytes guardados
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    hu = relationship("HU", back_populates="revisions")
+
+class FeatureCatalogEntry(Base):
+    __tablename__ = "feature_catalog"
+    __table_args__ = (UniqueConstraint("project_id", "feature_id", name="uq_feature_catalog_project_feature"),)
+    
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    project_id = Column(String(36), ForeignKey("projects.id"), nullable=False, index=True)
+    feature_id = Column(String(50), nullable=False)  # Identificador de la feature (ej: "F-102")
+    name = Column(String(200), nullable=False)
+    module = Column(String(200), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now(), server_default=func.now())
+    
+    # Índice inverso: números de HU asignados a la feature
+    hus = relationship("FeatureCatalogHU", back_populates="feature", cascade="all, delete-orphan")
+
+class FeatureCatalogHU(Base):
+    __tablename__ = "feature_catalog_hus"
+    
+    # La clave primaria (project_id, hu_number) es el índice inverso HU -> feature
+    project_id = Column(String(36), ForeignKey("projects.id"), primary_key=True)
+    hu_number = Column(Integer, primary_key=True)
+    feature_entry_id = Column(String(36), ForeignKey("feature_catalog.id"), nullable=False, index=True)
+    
+    feature = relationship("FeatureCatalogEntry", back_populates="hus")
+
+class FeatureCatalogVersion(Base):
+    __tablename__ = "feature_catalog_versions"
+    
+    # Versión del catálogo de cada proyecto; se incrementa en cada edición para invalidar cachés
+    project_id = Column(String(36), ForeignKey("projects.id"), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now(), server_default=func.now())
+
+class TestGenerationJob(Base):
+    __tablename__ = "test_generation_jobs"
+    
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = Column(String(36), ForeignKey("users.id"), nullable=False, index=True)
+    azure_id = Column(String(50), nullable=False)
+    xray_path = Column(String(500), nullable=False)
+    force_regenerate = Column(Boolean, default=False, nullable=False)  # Ignorar los tests guardados de la HU
+    status = Column(Enum(JobStatus), default=JobStatus.QUEUED, nullable=False)
+    current_stage = Column(String(50), nullable=True)  # Etapa en ejecución (extract, generate, import, azure_update)
+    stages = Column(JSON, nullable=True)  # [{stage, status, seconds}] en orden de ejecución
+    result = Column(JSON, nullable=True)  # Respuesta final del pipeline
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+class ProjectPurge(Base):
+    """
+    Borrado en segundo plano de un proyecto eliminado (ver services/project_purge.py). Sin clave foránea
+    al proyecto: la fila queda como registro cuando el proyecto ya no existe.
+    """
+    __tablename__ = "project_purges"
+    
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    project_id = Column(String(36), nullable=False, index=True)
+    project_name = Column(String(100), nullable=False)
+    user_id = Column(String(36), ForeignKey("users.id"), nullable=False, index=True)
+    status = Column(Enum(JobStatus), default=JobStatus.QUEUED, nullable=False)
+    total_hus = Column(Integer, nullable=False, default=0)  # HUs del proyecto al eliminarlo
+    deleted_hus = Column(Integer, nullable=False, default=0)
+    batches = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    updated_at = Column(DateTime(timezone=True), nullable=True)  # Último lote borrado
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+class ImportedTestFingerprint(Base):
+    __tablename__ = "imported_test_fingerprints"
+    __table_args__ = (
+        UniqueConstraint("client_id", "azure_id", "xray_path", "fingerprint", name="uq_imported_test_fingerprint"),
+        Index("ix_imported_test_fingerprints_hu_path", "client_id", "azure_id", "xray_path"),
+    )
+    
+    # Tests ya importados con éxito a XRay, por tenant, HU y ruta de XRay
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    client_id = Column(String(100), nullable=False)  # Tenant de XRay
+    azure_id = Column(String(50), nullable=False)  # Número de la HU (sin prefijo "HU-")
+    xray_path = Column(String(500), nullable=False)
+    fingerprint = Column(String(64), nullable=False)
+    imported_at = Column(DateTime(timezone=True), server_default=func.now())
+
+def _insert_content_if_missing(connection, content: "RefinementContent"):
+    """INSERT idempotente: otra sesión pudo guardar el mismo contenido al mismo tiempo"""
+    values = {"hash": content.hash, "codec": content.codec, "body": content.body,
+              "length": content.length, "stored_size": content.stored_size, "search_text": content.search_text}
+    table = RefinementContent.__table__
+    if connection.dialect.name in ("sqlite", "postgresql"):
+        dialect_insert = sqlite_insert if connection.dialect.name == "sqlite" else postgresql_insert
+        connection.execute(dialect_insert(table).values(**values).on_conflict_do_nothing(index_elements=["hash"]))
+    elif connection.execute(table.select().where(table.c.hash == content.hash)).first() is None:
+        connection.execute(table.insert().values(**values))
+
+@event.listens_for(Session, "before_flush")
+def _store_pending_refinements(session, flush_context, instances):
+    """Guarda en refinement_contents los textos asignados a HUs, una sola vez por contenido"""
+    contents = {}
+    for hu in list(session.new) + list(session.dirty):
+        pending = hu.__dict__.pop("_pending_texts", None) if isinstance(hu, HU) else None
+        if not pending:
+            continue
+        for kind, value in pending.items():
+            if value is None:
+                setattr(hu, f"{kind}_content", None)
+                continue
+            key = content_hash(value)
+            if key not in contents:
+                contents[key] = session.identity_map.get(identity_key(RefinementContent, key))
+                if contents[key] is None:
+                    # Se inserta ya (antes que la HU que lo referencia) y se registra como persistente
+                    contents[key] = RefinementContent.from_text(value)
+                    if session.get_bind().dialect.name != "sqlite":
+                        contents[key].search_text = value
+                    _insert_content_if_missing(session.connection(), contents[key])
+                    make_transient_to_detached(contents[key])
+                    session.add(contents[key])
+            setattr(hu, f"{kind}_content", contents[key])
+
+# Columnas de HU que afectan a project_hu_stats
+HU_STATS_COLUMNS = ("project_id", "status", "feature", "module", "tests_generated")
+# Fila que toda actualización de estadísticas de un proyecto toca primero: serializa las actualizaciones
+# incrementales de un proyecto con su reconciliación
+STATS_LOCK_KEY = ("hus", "total")
+
+def _status_value(status) -> Optional[str]:
+    return status.value if isinstance(status, HUStatus) else status
+
+def hu_stats_row_entries(values: dict):
+    return hu_stats_entries(_status_value(values["status"]), values["feature"], values["module"],
+                            values["tests_generated"])
+
+def apply_project_stats_deltas(connection, deltas: dict):
+    """
+    Suma {project_id: Counter{(dimensión, clave): delta}} a project_hu_stats con upserts. Cada proyecto
+    del dict toma primero el lock de su fila STATS_LOCK_KEY, aunque no tenga deltas.
+    """
+    table = ProjectHUStat.__table__
+    rows = []
+    for project_id in sorted(deltas):
+        counter = deltas[project_id]
+        keys = sorted((key for key, delta in counter.items() if delta and key != STATS_LOCK_KEY))
+        # La fila de lock va siempre primero (con delta 0 solo toma el lock)
+        keys.insert(0, STATS_LOCK_KEY)
+        rows.extend({"project_id": project_id, "dimension": dimension, "key": key, "count": counter[(dimension, key)]}
+                    for dimension, key in keys)
+    if not rows:
+        return
+    if connection.dialect.name in ("sqlite", "postgresql"):
+        dialect_insert = sqlite_insert if connection.dialect.name == "sqlite" else postgresql_insert
+        statement = dialect_insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=["project_id", "dimension", "key"],
+            set_={"count": table.c.count + statement.excluded["count"], "updated_at": func.now()}
+        )
+        connection.execute(statement, rows)
+        return
+    for row in rows:
+        updated = connection.execute(
+            table.update()
+            .where(table.c.project_id == row["project_id"], table.c.dimension == row["dimension"], table.c.key == row["key"])
+            .values(count=table.c.count + row["count"], updated_at=func.now())
+        )
+        if updated.rowcount == 0:
+            connection.execute(table.insert().values(**row))
+
+@event.listens_for(Session, "before_flush")
+def _update_project_stats(session, flush_context, instances):
+    """Aplica a project_hu_stats la diferencia que producen las HUs creadas, modificadas o eliminadas"""
+    new = [hu for hu in session.new if isinstance(hu, HU)]
+    changed = [
+        hu for hu in session.dirty
+        if isinstance(hu, HU) and any(inspect(hu).attrs[column].history.has_changes() for column in HU_STATS_COLUMNS)
+    ]
+    deleted = [hu for hu in session.deleted if isinstance(hu, HU)]
+    deleted_projects = [project.id for project in session.deleted if isinstance(project, Project)]
+    if not (new or changed or deleted or deleted_projects):
+        return
+    
+    connection = session.connection()
+    deltas = {}
+    
+    def add(values: dict, sign: int):
+        if values["project_id"]:
+            counter = deltas.setdefault(values["project_id"], Counter())
+            for key, count in hu_stats_row_entries(values).items():
+                counter[key] += sign * count
+    
+    # Valores ya guardados (antes de este flush) de las HUs modificadas o eliminadas
+    stored = {}
+    ids = [inspect(hu).identity[0] for hu in changed + deleted]
+    table = HU.__table__
+    for start in range(0, len(ids), 500):
+        rows = connection.execute(
+            select(table.c.id, *[table.c[column] for column in HU_STATS_COLUMNS]).where(table.c.id.in_(ids[start:start + 500]))
+        )
+        stored.update({row.id: dict(row._mapping) for row in rows})
+    
+    for hu_id in ids:
+        if hu_id in stored:
+            add(stored[hu_id], -1)
+    for hu in new + changed:
+        state = inspect(hu)
+        previous = stored.get(state.identity[0], {}) if state.identity else {}
+        # Las columnas no cargadas no cambiaron: se toma el valor guardado sin cargarlas
+        add({column: state.dict[column] if column in state.dict else previous.get(column) for column in HU_STATS_COLUMNS}, 1)
+    
+    for project_id in deleted_projects:
+        deltas.pop(project_id, None)
+    apply_project_stats_deltas(connection, deltas)
+    if deleted_projects:
+        stats = ProjectHUStat.__table__
+        connection.execute(stats.delete().where(stats.c.project_id.in_(deleted_projects)))
 
 # Create tables
-Base.metadata.create_all(bind=engine)
\ No newline at end of file
+Base.metadata.create_all(bind=engine)
+
+# Aplicar cambios de esquema sobre tablas existentes (ver migrations.py)
+from .migrations import run_migrations, auto_migrate_enabled
+if auto_migrate_enabled():
+    run_migrations(engine)
\ No newline at end of file
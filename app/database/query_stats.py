@@ -0,0 +1,138 @@
+"""
+Instrumentación de consultas SQL por petición.
+
+Los eventos before/after_cursor_execute de cada motor (create_app_engine) acumulan el número de consultas
+y el tiempo en la base de datos en el QueryStats activo del contexto. QueryStatsMiddleware abre uno por
+petición: con DB_QUERY_STATS_HEADERS=true lo devuelve en las cabeceras X-DB-Queries / X-DB-Time-Ms, y
+registra las peticiones que superan DB_SLOW_REQUEST_QUERIES consultas o DB_SLOW_REQUEST_MS ms. Cada
+consulta que tarda más de DB_SLOW_QUERY_MS se registra por separado.
+
+query_budget() falla (QueryBudgetExceeded) cuando un bloque ejecuta más consultas de las declaradas;
+scripts/check_query_budgets.py lo usa con los endpoints principales.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional, Tuple
+from sqlalchemy import event
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DB_QUERY_STATS_HEADERS = os.getenv("DB_QUERY_STATS_HEADERS", "false").lower() == "true"
+DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "500"))
+DB_SLOW_REQUEST_QUERIES = int(os.getenv("DB_SLOW_REQUEST_QUERIES", "50"))
+DB_SLOW_REQUEST_MS = float(os.getenv("DB_SLOW_REQUEST_MS", "1000"))
+SLOWEST_KEPT = 5
+
+class QueryStats:
+    """Consultas y tiempo en la base de datos de un bloque (petición, presupuesto...)"""
+
+    def __init__(self, label: str = "", parent: Optional["QueryStats"] = None, keep_statements: bool = False):
+        self.label = label
+        self.parent = parent
+        self.keep_statements = keep_statements
+        self.count = 0
+        self.seconds = 0.0
+        self.statements: List[str] = []
+        self.slowest: List[Tuple[float, str]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def milliseconds(self) -> float:
+        return round(self.seconds * 1000, 1)
+
+    def add(self, statement: str, seconds: float):
+        with self._lock:
+            self.count += 1
+            self.seconds += seconds
+            if self.keep_statements:
+                self.statements.append(statement)
+            self.slowest.append((seconds, statement))
+            self.slowest = sorted(self.slowest, key=lambda item: item[0], reverse=True)[:SLOWEST_KEPT]
+        if self.parent is not None:
+            self.parent.add(statement, seconds)
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+def current_query_stats() -> Optional[QueryStats]:
+    return _current_stats.get()
+
+@contextmanager
+def track_queries(label: str = "", keep_statements: bool = False):
+    """Cuenta las consultas ejecutadas dentro del bloque (también en hilos / greenlets que heredan el contexto)"""
+    stats = QueryStats(label, parent=_current_stats.get(), keep_statements=keep_statements)
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+def _short(statement: str, limit: int = 300) -> str:
+    statement = " ".join(statement.split())
+    return statement if len(statement) <= limit else statement[:limit] + "..."
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._query_started = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_query_started", None)
+    if started is None:
+        return
+    seconds = time.perf_counter() - started
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.add(statement, seconds)
+    if seconds * 1000 >= DB_SLOW_QUERY_MS:
+        where = f" en {stats.label}" if stats is not None and stats.label else ""
+        print(f"🐢 Consulta lenta ({seconds * 1000:.0f} ms{where}): {_short(statement)}")
+
+def instrument_engine(sync_engine):
+    """Registra los eventos de medición en un motor síncrono (o en el sync_engine de uno asíncrono)"""
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+@contextmanager
+def query_budget(max_queries: int, label: str = ""):
+    """Falla si el bloque ejecuta más de max_queries consultas, mostrando cuáles fueron"""
+    with track_queries(label, keep_statements=True) as stats:
+        yield stats
+    if stats.count > max_queries:
+        listed = "\n".join(f"  {n}. {_short(statement, 200)}" for n, statement in enumerate(stats.statements, 1))
+        raise QueryBudgetExceeded(
+            f"{label or 'Bloque'}: {stats.count} consultas (presupuesto {max_queries}), {stats.milliseconds} ms\n{listed}"
+        )
+
+class QueryStatsMiddleware:
+    """Mide las consultas de cada petición HTTP: cabeceras opcionales y registro de peticiones lentas"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        label = f"{scope['method']} {scope['path']}"
+        with track_queries(label) as stats:
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start" and DB_QUERY_STATS_HEADERS:
+                    headers = list(message.get("headers") or [])
+                    headers.append((b"x-db-queries", str(stats.count).encode("latin-1")))
+                    headers.append((b"x-db-time-ms", str(stats.milliseconds).encode("latin-1")))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
+
+        if stats.count > DB_SLOW_REQUEST_QUERIES or stats.seconds * 1000 > DB_SLOW_REQUEST_MS:
+            print(f"🐢 {label}: {stats.count} consultas, {stats.milliseconds} ms en la base de datos")
+            for seconds, statement in stats.slowest[:3]:
+                print(f"   {seconds * 1000:.0f} ms: {_short(statement, 200)}")
@@ -0,0 +1,109 @@
+"""
+Enrutamiento de lecturas a la réplica (DATABASE_REPLICA_URL).
+
+Los endpoints de solo lectura piden la sesión con get_read_db, que usa la réplica salvo que el cliente
+haya escrito hace menos de DB_REPLICA_STICKY_SECONDS: así quien acaba de crear o actualizar algo lo ve
+en la siguiente lectura aunque la réplica todavía no lo tenga. Las escrituras se detectan con
+ReplicaStickinessMiddleware (cualquier método distinto de GET/HEAD/OPTIONS), por cliente (cabecera
+Authorization). El registro vive en memoria, por proceso.
+"""
+import hashlib
+import os
+import threading
+import time
+from typing import Dict, Optional
+from fastapi import Depends, Request, Response
+from .connection import (
+    AsyncReplicaSessionLocal,
+    ReplicaSessionLocal,
+    engine,
+    get_async_db,
+    open_session,
+    replica_engine,
+)
+
+REPLICA_STICKY_SECONDS = float(os.getenv("DB_REPLICA_STICKY_SECONDS", "5"))
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+def replica_enabled() -> bool:
+    return ReplicaSessionLocal is not None
+
+def client_key(authorization: Optional[str]) -> Optional[str]:
+    """Identifica al cliente por su cabecera Authorization (sin guardar el token)"""
+    if not authorization:
+        return None
+    return hashlib.sha256(authorization.encode("utf-8")).hexdigest()[:32]
+
+class ReplicaRouter:
+    """Ventana de lecturas en la primaria tras una escritura de cada cliente"""
+
+    def __init__(self, sticky_seconds: float):
+        self.sticky_seconds = sticky_seconds
+        self._sticky_until: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def mark_write(self, key: Optional[str]):
+        if not key or self.sticky_seconds <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._sticky_until[key] = now + self.sticky_seconds
+            if len(self._sticky_until) > 10000:
+                self._sticky_until = {k: until for k, until in self._sticky_until.items() if until > now}
+
+    def use_primary(self, key: Optional[str]) -> bool:
+        if not key:
+            return False
+        with self._lock:
+            until = self._sticky_until.get(key)
+            if until is None:
+                return False
+            if until <= time.monotonic():
+                del self._sticky_until[key]
+                return False
+            return True
+
+replica_router = ReplicaRouter(REPLICA_STICKY_SECONDS)
+
+class ReplicaStickinessMiddleware:
+    """Marca al cliente como escritor al empezar la respuesta de cualquier petición no segura"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS or not replica_enabled():
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        key = client_key(headers.get(b"authorization", b"").decode("latin-1"))
+
+        async def send_wrapper(message):
+            # Antes de que el cliente reciba la respuesta, para que su siguiente GET ya vaya a la primaria
+            if message["type"] == "http.response.start":
+                replica_router.mark_write(key)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+def routes_to_primary(request: Request) -> bool:
+    return not replica_enabled() or replica_router.use_primary(client_key(request.headers.get("authorization")))
+
+def read_engine(request: Request):
+    """Motor síncrono para lecturas largas fuera de la sesión de la petición (ej: exportaciones)"""
+    return engine if routes_to_primary(request) else replica_engine
+
+async def get_read_db(request: Request, response: Response, primary=Depends(get_async_db)):
+    """
+    Sesión para endpoints de solo lectura: la réplica si está configurada y el cliente no escribió
+    recientemente; si no, la sesión de la primaria de la petición (la misma que usa la autenticación,
+    para no tomar dos conexiones del pool por petición). La cabecera X-DB-Route indica cuál se usó.
+    """
+    use_primary = routes_to_primary(request)
+    response.headers["X-DB-Route"] = "primary" if use_primary else "replica"
+    if use_primary:
+        yield primary
+        return
+    async with open_session(AsyncReplicaSessionLocal, ReplicaSessionLocal) as db:
+        yield db
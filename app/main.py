@@ -1,4 +1,4 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, status, BackgroundTasks, Header, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordBearer
 
@@ -11,9 +11,10 @@ from .api.routes import (
     create_hu_endpoint,
     get_hus_endpoint, 
     get_hu_endpoint,
-    generate_and_send_tests_endpoint,
+    get_hu_revisions_endpoint,
     debug_list_hus_endpoint,
     debug_find_hu_endpoint,
+    debug_db_pool_endpoint,
     update_hu_status_endpoint,
     # Nuevas rutas de proyectos
     create_project_endpoint,
@@ -23,17 +24,42 @@ from .api.routes import (
     # Nuevas rutas para editar y eliminar proyectos
     update_project_endpoint,
     delete_project_endpoint,
+    get_project_deletion_endpoint,
+    retry_project_deletion_endpoint,
     # Nueva ruta para obtener HUs de un proyecto
     get_project_hus_endpoint,
+    export_project_hus_endpoint,
     # Nueva ruta para eliminar HUs individuales
     delete_hu_endpoint,
     # Nueva ruta para validar contraseña
-    validate_password_endpoint
+    validate_password_endpoint,
+    # Service hooks de Azure DevOps
+    azure_webhook_endpoint,
+    get_project_webhook_endpoint,
+    # Catálogo de features por proyecto
+    get_feature_catalog_endpoint,
+    # Estadísticas por proyecto
+    get_project_stats_endpoint,
+    replace_feature_catalog_endpoint,
+    upsert_feature_endpoint,
+    delete_feature_endpoint,
+    import_default_feature_catalog_endpoint,
+    # Cola de importaciones a XRay
+    get_xray_import_queue_endpoint,
+    # Generación de tests asíncrona
+    start_generate_tests_job_endpoint,
+    get_generate_tests_job_endpoint,
+    resend_hu_tests_endpoint
 )
 
-from .schemas.hu_schemas import HUCreate, HUResponse, HUStatusUpdate, TestGenerationRequest, HUListResponse
+from .schemas.hu_schemas import HUCreate, HUResponse, HUStatusUpdate, TestGenerationRequest, HUListResponse, FeatureCatalogItem, FeatureCatalogUpdate
 from .auth.schemas import ProjectCreate, ProjectResponse, ProjectListResponse, ProjectUpdate
-from .database.connection import get_db
+from .database.connection import engine, SessionLocal, get_db, get_async_db, run_in_session
+from .database.replica import ReplicaStickinessMiddleware, get_read_db, read_engine
+from .database.query_stats import QueryStatsMiddleware
+from .services.project_stats import start_stats_reconciler, stop_stats_reconciler
+from .services.project_purge import resume_pending_purges
+from .services.test_generation_jobs import fail_stale_jobs
 from .database.models import User
 from typing import List, Optional
 
@@ -49,9 +75,33 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Lecturas en la réplica: tras una escritura, el cliente lee de la primaria durante una ventana corta
+app.add_middleware(ReplicaStickinessMiddleware)
+
+# Consultas y tiempo en la base de datos por petición (cabeceras con DB_QUERY_STATS_HEADERS, registro de lentas)
+app.add_middleware(QueryStatsMiddleware)
+
 # Incluir rutas de autenticación
 app.include_router(auth_router)
 
+# Reconciliación periódica de las estadísticas por proyecto, borrados de proyectos interrumpidos y
+# jobs de generación huérfanos de un reinicio
+@app.on_event("startup")
+def start_background_jobs():
+    start_stats_reconciler(engine)
+    resume_pending_purges(engine)
+    db = SessionLocal()
+    try:
+        failed = fail_stale_jobs(db)
+        if failed:
+            print(f"⚠️ {failed} jobs de generación interrumpidos marcados como fallidos")
+    finally:
+        db.close()
+
+@app.on_event("shutdown")
+def stop_background_jobs():
+    stop_stats_reconciler()
+
 # Endpoints públicos
 @app.get("/")
 async def root():
@@ -63,12 +113,13 @@ async def health():
 
 # Endpoints protegidos
 @app.post("/hus", response_model=HUResponse)
-async def create_hu(
+def create_hu(
     hu_data: HUCreate, 
     token: str = Depends(oauth2_scheme),
     current_user: User = Depends(get_current_active_user),
     db = Depends(get_db)
 ):
+    # Consulta Azure DevOps y refina con DeepSeek (bloqueante): se ejecuta en el threadpool
     return create_hu_endpoint(hu_data, current_user, db)
 
 
@@ -77,59 +128,113 @@ async def create_hu(
 async def get_hus(
     token: str = Depends(oauth2_scheme),
     current_user: User = Depends(get_current_active_user),
-    db = Depends(get_db),
+    db = Depends(get_read_db),
     status: str = None,
     name: str = None,
     azure_id: str = None,
     feature: str = None,
-    module: str = None
+    module: str = None,
+    q: str = None,
+    limit: int = Query(None, ge=1, le=200),
+    cursor: str = None,
+    include_total: bool = False,
+    view: str = Query("summary", pattern="^(summary|full)$")
 ):
-    return get_hus_endpoint(db, status, name, azure_id, feature, module, current_user)
+    return await run_in_session(db, lambda session: get_hus_endpoint(session, status, name, azure_id, feature, module, current_user, q, limit, cursor, include_total, view))
 
 @app.get("/hus/{hu_id}", response_model=HUResponse)
 async def get_hu(
     hu_id: str, 
     token: str = Depends(oauth2_scheme),
     current_user: User = Depends(get_current_active_user),
-    db = Depends(get_db)
+    db = Depends(get_read_db)
+):
+    return await run_in_session(db, lambda session: get_hu_endpoint(hu_id, session))
+
+@app.get("/hus/{hu_id}/revisions")
+async def get_hu_revisions(
+    hu_id: str,
+    token: str = Depends(oauth2_scheme),
+    current_user: User = Depends(get_current_active_user),
+    db = Depends(get_read_db),
+    include_bodies: bool = False
 ):
-    return get_hu_endpoint(hu_id, db)
+    return await run_in_session(db, lambda session: get_hu_revisions_endpoint(hu_id, current_user, session, include_bodies))
 
-@app.post("/generate-tests")
+@app.post("/generate-tests", status_code=status.HTTP_202_ACCEPTED)
 async def generate_and_send_tests(
     request: TestGenerationRequest, 
+    background_tasks: BackgroundTasks,
+    token: str = Depends(oauth2_scheme),
+    current_user: User = Depends(get_current_active_user),
+    db = Depends(get_async_db)
+):
+    return await run_in_session(db, lambda session: start_generate_tests_job_endpoint(request, current_user, background_tasks, session))
+
+@app.post("/hus/{hu_id}/tests/resend")
+def resend_hu_tests(
+    hu_id: str,
     token: str = Depends(oauth2_scheme),
     current_user: User = Depends(get_current_active_user),
     db = Depends(get_db)
 ):
-    return generate_and_send_tests_endpoint(request, current_user, db)
+    # Importa a XRay (bloqueante): se ejecuta en el threadpool
+    return resend_hu_tests_endpoint(hu_id, current_user, db)
+
+@app.get("/generate-tests/{job_id}")
+async def get_generate_tests_job(
+    job_id: str,
+    token: str = Depends(oauth2_scheme),
+    current_user: User = Depends(get_current_active_user),
+    db = Depends(get_async_db)
+):
+    return await run_in_session(db, lambda session: get_generate_tests_job_endpoint(job_id, current_user, session))
+
+@app.get("/xray/import-queue")
+async def get_xray_import_queue(
+    token: str = Depends(oauth2_scheme),
+    current_user: User = Depends(get_current_active_user),
+    db = Depends(get_async_db)
+):
+    return await run_in_session(db, lambda session: get_xray_import_queue_endpoint(current_user, session))
 
 # Endpoints de depuración (requieren autenticación)
 @app.get("/debug/hus")
 async def debug_list_hus(
     token: str = Depends(oauth2_scheme),
     current_user: User = Depends(get_current_active_user),
-    db = Depends(get_db)
+    db = Depends(get_async_db),
+    limit: int = Query(None, ge=1, le=200),
+    cursor: str = None,
+    include_total: bool = False
 ):
-    return debug_list_hus_endpoint(db)
+    return await run_in_session(db, lambda session: debug_list_hus_endpoint(session, limit, cursor, include_total))
 
 @app.get("/debug/hu/{azure_id}")
 async def debug_find_hu(
     azure_id: str, 
     token: str = Depends(oauth2_scheme),
     current_user: User = Depends(get_current_active_user),
-    db = Depends(get_db)
+    db = Depends(get_async_db)
+):
+    return await run_in_session(db, lambda session: debug_find_hu_endpoint(azure_id, current_user, session))
+
+@app.get("/debug/db-pool")
+async def debug_db_pool(
+    token: str = Depends(oauth2_scheme),
+    current_user: User = Depends(get_current_active_user)
 ):
-    return debug_find_hu_endpoint(azure_id, db)
+    return debug_db_pool_endpoint()
 
 @app.patch("/hus/{hu_id}/status", response_model=HUResponse)
-async def update_hu_status(
+def update_hu_status(
     hu_id: str, 
     status_update: HUStatusUpdate, 
     token: str = Depends(oauth2_scheme),
     current_user: User = Depends(get_current_active_user),
     db = Depends(get_db)
 ):
+    # Actualiza Azure DevOps / re-refina con DeepSeek (bloqueante): se ejecuta en el threadpool
     return update_hu_status_endpoint(hu_id, status_update, current_user, db)
 
 # ==================== ENDPOINTS DE GESTIÓN DE PROYECTOS ====================
@@ -139,51 +244,77 @@ async def create_project(
     project_data: ProjectCreate,
     token: str = Depends(oauth2_scheme),
     current_user: User = Depends(get_current_active_user),
-    db = Depends(get_db)
+    db = Depends(get_async_db)
 ):
-    return create_project_endpoint(project_data, current_user, db)
+    return await run_in_session(db, lambda session: create_project_endpoint(project_data, current_user, session))
 
 @app.get("/projects", response_model=ProjectListResponse)
 async def get_user_projects(
     token: str = Depends(oauth2_scheme),
     current_user: User = Depends(get_current_active_user),
-    db = Depends(get_db)
+    db = Depends(get_read_db),
+    limit: int = Query(None, ge=1, le=200),
+    cursor: str = None,
+    include_total: bool = False
 ):
-    return get_user_projects_endpoint(current_user, db)
+    return await run_in_session(db, lambda session: get_user_projects_endpoint(current_user, session, limit, cursor, include_total))
 
 @app.get("/projects/active", response_model=Optional[ProjectResponse])
 async def get_active_project(
     token: str = Depends(oauth2_scheme),
     current_user: User = Depends(get_current_active_user),
-    db = Depends(get_db)
+    db = Depends(get_read_db)
 ):
-    return get_active_project_endpoint(current_user, db)
+    return await run_in_session(db, lambda session: get_active_project_endpoint(current_user, session))
 
 @app.get("/projects/{project_id}/hus")
 async def get_project_hus(
     project_id: str,
     token: str = Depends(oauth2_scheme),
     current_user: User = Depends(get_current_active_user),
-    db = Depends(get_db)
+    db = Depends(get_read_db),
+    q: str = None,
+    limit: int = Query(None, ge=1, le=200),
+    cursor: str = None,
+    include_total: bool = False,
+    view: str = Query("summary", pattern="^(summary|full)$")
+):
+    return await run_in_session(db, lambda session: get_project_hus_endpoint(project_id, current_user, session, q, limit, cursor, include_total, view))
+
+@app.get("/projects/{project_id}/hus/export")
+async def export_project_hus(
+    project_id: str,
+    request: Request,
+    token: str = Depends(oauth2_scheme),
+    current_user: User = Depends(get_current_active_user),
+    db = Depends(get_read_db),
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    view: str = Query("summary", pattern="^(summary|full)$"),
+    gzip: bool = False
 ):
-    return get_project_hus_endpoint(project_id, current_user, db)
+    stream_engine = read_engine(request)
+    export = await run_in_session(db, lambda session: export_project_hus_endpoint(project_id, current_user, session, stream_engine, format, view, gzip))
+    # La respuesta en streaming no hereda las cabeceras de get_read_db
+    export.headers["X-DB-Route"] = "primary" if stream_engine is engine else "replica"
+    return export
 
 @app.delete("/hus/{hu_id}")
 async def delete_hu(
     hu_id: str,
     token: str = Depends(oauth2_scheme),
     current_user: User = Depends(get_current_active_user),
-    db = Depends(get_db)
+    db = Depends(get_async_db)
 ):
-    return delete_hu_endpoint(hu_id, current_user, db)
+    return await run_in_session(db, lambda session: delete_hu_endpoint(hu_id, current_user, session))
 
 @app.post("/auth/validate-password")
-async def validate_password(
+def validate_password(
     password_data: dict,
     token: str = Depends(oauth2_scheme),
     current_user: User = Depends(get_current_active_user),
     db = Depends(get_db)
 ):
+    # bcrypt es costoso en CPU: se ejecuta en el threadpool
     return validate_password_endpoint(password_data.get("password", ""), current_user, db)
 
 @app.post("/projects/{project_id}/activate", response_model=ProjectResponse)
@@ -191,9 +322,9 @@ async def set_active_project(
     project_id: str,
     token: str = Depends(oauth2_scheme),
     current_user: User = Depends(get_current_active_user),
-    db = Depends(get_db)
+    db = Depends(get_async_db)
 ):
-    return set_active_project_endpoint(project_id, current_user, db)
+    return await run_in_session(db, lambda session: set_active_project_endpoint(project_id, current_user, session))
 
 @app.put("/projects/{project_id}", response_model=ProjectResponse)
 async def update_project(
@@ -201,15 +332,119 @@ async def update_project(
     project_data: ProjectUpdate,
     token: str = Depends(oauth2_scheme),
     current_user: User = Depends(get_current_active_user),
-    db = Depends(get_db)
+    db = Depends(get_async_db)
 ):
-    return update_project_endpoint(project_id, project_data, current_user, db)
+    return await run_in_session(db, lambda session: update_project_endpoint(project_id, project_data, current_user, session))
 
-@app.delete("/projects/{project_id}")
+@app.delete("/projects/{project_id}", status_code=202)
 async def delete_project(
+    project_id: str,
+    background_tasks: BackgroundTasks,
+    token: str = Depends(oauth2_scheme),
+    current_user: User = Depends(get_current_active_user),
+    db = Depends(get_async_db)
+):
+    # Respuesta inmediata: las HUs del proyecto se borran por lotes en segundo plano
+    return await run_in_session(db, lambda session: delete_project_endpoint(project_id, current_user, background_tasks, session))
+
+@app.get("/projects/{project_id}/deletion")
+async def get_project_deletion(
     project_id: str,
     token: str = Depends(oauth2_scheme),
     current_user: User = Depends(get_current_active_user),
+    db = Depends(get_async_db)
+):
+    return await run_in_session(db, lambda session: get_project_deletion_endpoint(project_id, current_user, session))
+
+@app.post("/projects/{project_id}/deletion/retry", status_code=202)
+async def retry_project_deletion(
+    project_id: str,
+    background_tasks: BackgroundTasks,
+    token: str = Depends(oauth2_scheme),
+    current_user: User = Depends(get_current_active_user),
+    db = Depends(get_async_db)
+):
+    # Vuelve a encolar un borrado fallido; continúa desde las HUs que quedan
+    return await run_in_session(db, lambda session: retry_project_deletion_endpoint(project_id, current_user, background_tasks, session))
+
+# ==================== SERVICE HOOKS DE AZURE DEVOPS ====================
+
+@app.post("/webhooks/azure")
+def azure_webhook(
+    project_id: str,
+    payload: dict,
+    background_tasks: BackgroundTasks,
+    authorization: Optional[str] = Header(None),
     db = Depends(get_db)
 ):
-    return delete_project_endpoint(project_id, current_user, db)
+    # Consulta Azure DevOps (bloqueante): se ejecuta en el threadpool
+    return azure_webhook_endpoint(project_id, payload, authorization, background_tasks, db)
+
+@app.get("/projects/{project_id}/stats")
+async def get_project_stats(
+    project_id: str,
+    token: str = Depends(oauth2_scheme),
+    current_user: User = Depends(get_current_active_user),
+    db = Depends(get_read_db)
+):
+    return await run_in_session(db, lambda session: get_project_stats_endpoint(project_id, current_user, session))
+
+@app.get("/projects/{project_id}/webhook")
+async def get_project_webhook(
+    project_id: str,
+    token: str = Depends(oauth2_scheme),
+    current_user: User = Depends(get_current_active_user),
+    db = Depends(get_async_db)
+):
+    return await run_in_session(db, lambda session: get_project_webhook_endpoint(project_id, current_user, session))
+
+# ==================== CATÁLOGO DE FEATURES ====================
+
+@app.get("/projects/{project_id}/features")
+async def get_feature_catalog(
+    project_id: str,
+    token: str = Depends(oauth2_scheme),
+    current_user: User = Depends(get_current_active_user),
+    db = Depends(get_async_db)
+):
+    return await run_in_session(db, lambda session: get_feature_catalog_endpoint(project_id, current_user, session))
+
+@app.put("/projects/{project_id}/features")
+async def replace_feature_catalog(
+    project_id: str,
+    catalog: FeatureCatalogUpdate,
+    token: str = Depends(oauth2_scheme),
+    current_user: User = Depends(get_current_active_user),
+    db = Depends(get_async_db)
+):
+    return await run_in_session(db, lambda session: replace_feature_catalog_endpoint(project_id, catalog, current_user, session))
+
+@app.post("/projects/{project_id}/features/import-default")
+async def import_default_feature_catalog(
+    project_id: str,
+    token: str = Depends(oauth2_scheme),
+    current_user: User = Depends(get_current_active_user),
+    db = Depends(get_async_db)
+):
+    return await run_in_session(db, lambda session: import_default_feature_catalog_endpoint(project_id, current_user, session))
+
+@app.put("/projects/{project_id}/features/{feature_id}")
+async def upsert_feature(
+    project_id: str,
+    feature_id: str,
+    feature: FeatureCatalogItem,
+    token: str = Depends(oauth2_scheme),
+    current_user: User = Depends(get_current_active_user),
+    db = Depends(get_async_db)
+):
+    return await run_in_session(db, lambda session: upsert_feature_endpoint(project_id, feature_id, feature, current_user, session))
+
+@app.delete("/projects/{project_id}/features/{feature_id}")
+async def delete_feature(
+    project_id: str,
+    feature_id: str,
+    token: str = Depends(oauth2_scheme),
+    current_user: User = Depends(get_current_active_user),
+    db = Depends(get_async_db)
+):
+    return await run_in_session(db, lambda session: delete_feature_endpoint(project_id, feature_id, current_user, session))
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Optional, List, Union
 
 class HUCreate(BaseModel):
     azure_id: str
@@ -23,10 +23,34 @@ class HUResponse(BaseModel):
     created_at: Optional[str]
     updated_at: Optional[str]
 
+class HUSummary(BaseModel):
+    # Representación de listados: sin descripción ni textos de refinamiento
+    id: str
+    azure_id: str
+    name: str
+    status: str
+    feature: Optional[str]
+    module: Optional[str]
+    language: Optional[str] = 'es'
+    created_at: Optional[str]
+    updated_at: Optional[str]
+
 class HUListResponse(BaseModel):
-    data: List[HUResponse]
+    data: List[Union[HUResponse, HUSummary]]  # HUSummary por defecto, HUResponse con view=full
     message: str
+    next_cursor: Optional[str] = None  # Cursor de la página siguiente (None en la última)
+    total: Optional[int] = None  # Solo con include_total=true
 
 class TestGenerationRequest(BaseModel):
     xray_path: str
-    azure_id: str
\ No newline at end of file
+    azure_id: str
+    force_regenerate: Optional[bool] = False  # Regenerar aunque existan tests guardados para el mismo refinamiento
+
+class FeatureCatalogItem(BaseModel):
+    feature_id: str  # Identificador de la feature (ej: "F-102")
+    name: str
+    module: Optional[str] = None
+    hus: List[int] = []  # Números de HU de Azure DevOps asignados a la feature
+
+class FeatureCatalogUpdate(BaseModel):
+    features: List[FeatureCatalogItem]
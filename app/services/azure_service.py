@@ -1,12 +1,68 @@
 import os
 import re
 import json
+import hashlib
+import time
+import threading
 import requests
-from typing import Dict
+from typing import Dict, Optional
 from dotenv import load_dotenv
+from ..utils.criteria_lexer import lex_lines, group_sections, find_criteria_bounds, find_split_point
+from ..utils.language_detector import detect_language, GHERKIN_KEYWORDS
+from .feature_catalog_service import lookup_feature
 
 load_dotenv()
 
+# Caché en memoria de work items de Azure DevOps: (org, project, id) -> {hash del PAT: (timestamp, datos)}
+# Cada entrada solo la lee quien la obtuvo con el mismo PAT: un PAT erróneo o revocado no recibe los datos
+# cacheados con el de otro proyecto. Se invalida por push desde el receptor de service hooks
+# (/webhooks/azure), por eso solo se usa para los proyectos de Azure DevOps que ya enviaron algún
+# service hook a este proceso
+WORK_ITEM_CACHE_TTL = int(os.getenv("AZURE_WORK_ITEM_CACHE_TTL", "900"))
+_work_item_cache: Dict[tuple, Dict[str, tuple]] = {}
+_work_item_cache_lock = threading.Lock()
+_webhook_projects: set = set()
+
+def _work_item_cache_key(org: str, project: str, azure_id) -> tuple:
+    return ((org or "").lower(), (project or "").lower(), int(azure_id))
+
+def _credential_hash(token: Optional[str]) -> str:
+    return hashlib.sha256((token or "").encode()).hexdigest()
+
+def get_cached_work_item(org: str, project: str, azure_id, token: Optional[str]) -> Optional[dict]:
+    """Obtiene un work item de la caché si no ha expirado y se cacheó con el mismo PAT"""
+    key, credential = _work_item_cache_key(org, project, azure_id), _credential_hash(token)
+    with _work_item_cache_lock:
+        entry = _work_item_cache.get(key, {}).get(credential)
+        if not entry:
+            return None
+        cached_at, data = entry
+        if time.monotonic() - cached_at > WORK_ITEM_CACHE_TTL:
+            del _work_item_cache[key][credential]
+            return None
+        return dict(data)
+
+def cache_work_item(org: str, project: str, azure_id, token: Optional[str], data: dict):
+    with _work_item_cache_lock:
+        _work_item_cache.setdefault(_work_item_cache_key(org, project, azure_id), {})[_credential_hash(token)] = (
+            time.monotonic(), data
+        )
+
+def mark_webhook_project(org: str, project: str):
+    """Registra que el proyecto de Azure DevOps envía service hooks (sus cambios invalidan la caché)"""
+    with _work_item_cache_lock:
+        _webhook_projects.add(((org or "").lower(), (project or "").lower()))
+
+def work_item_cache_enabled(org: str, project: str) -> bool:
+    with _work_item_cache_lock:
+        return ((org or "").lower(), (project or "").lower()) in _webhook_projects
+
+def invalidate_work_item(org: str, project: str, azure_id) -> bool:
+    """Elimina un work item de la caché, cacheado con cualquier PAT. Retorna True si estaba cacheado"""
+    key = _work_item_cache_key(org, project, azure_id)
+    with _work_item_cache_lock:
+        return bool(_work_item_cache.pop(key, None))
+
 class AzureService:
     def __init__(self):
         self.token = os.getenv("AZURE_DEVOPS_TOKEN")
@@ -17,6 +73,8 @@ class AzureService:
             "Accept": "application/json",
             "Content-Type": "application/json"
         }
+        # Proyecto cuyo catálogo de features se consulta antes de las heurísticas
+        self.feature_catalog_project_id = None
 
     def parse_refined_content(self, refined_content: str) -> dict:
         """
@@ -209,7 +267,8 @@ class AzureService:
         # PASO 1: Limpiar y normalizar el contenido
         content = self._clean_and_normalize_content(content)
         
-        lines = content.split('\n')
+        # Clasificar cada línea una sola vez; descripción y criterios comparten el resultado
+        lines = lex_lines(content.split('\n'))
         
         # PASO 2: Encontrar división inteligente entre descripción y criterios
         split_point = self._find_smart_split_point(lines)
@@ -270,43 +329,12 @@ class AzureService:
         """
         print("🔍 Buscando punto de división inteligente...")
         
-        # Indicadores fuertes de criterios
-        strong_indicators = [
-            'criterios de aceptación',
-            'criterios detallados', 
-            'escenario:',
-            'dado que',
-            'cuando el',
-            'entonces el',
-            '1. intención macro',
-            '### 1.',
-            'flujo funcional'
-        ]
-        
-        # Indicadores débiles de criterios
-        weak_indicators = [
-            'validación',
-            'verificación',
-            'error',
-            'casos',
-            'prueba'
-        ]
+        lines = lex_lines(lines)
+        split_at, kind, indicator = find_split_point(lines)
         
-        for i, line in enumerate(lines):
-            line_lower = line.lower().strip()
-            
-            # Buscar indicadores fuertes
-            for indicator in strong_indicators:
-                if indicator in line_lower:
-                    print(f"✅ Indicador fuerte encontrado en línea {i}: '{indicator}' en '{line[:50]}...'")
-                    return i
-            
-            # Si llegamos a la mitad sin indicadores fuertes, buscar débiles
-            if i > len(lines) // 3:
-                for indicator in weak_indicators:
-                    if indicator in line_lower and len(line.strip()) > 10:
-                        print(f"✅ Indicador débil encontrado en línea {i}: '{indicator}' en '{line[:50]}...'")
-                        return i
+        if split_at != -1:
+            print(f"✅ Indicador {kind} encontrado en línea {split_at}: '{indicator}' en '{lines[split_at].text[:50]}...'")
+            return split_at
         
         # Si no encontramos nada, dividir en 60% descripción, 40% criterios
         split_at = int(len(lines) * 0.6)
@@ -320,7 +348,7 @@ class AzureService:
         print("📝 Generando descripción HTML...")
         
         # Combinar líneas y limpiar
-        desc_text = '\n'.join(desc_lines).strip()
+        desc_text = '\n'.join(str(line) for line in desc_lines).strip()
         
         # Extraer información clave
         functionality_text = self._extract_functionality(desc_text)
@@ -478,35 +506,7 @@ class AzureService:
         """
         Agrupa las líneas de criterios en secciones
         """
-        sections = []
-        current_section = []
-        
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-            
-            # Detectar nueva sección
-            is_new_section = (
-                line.startswith('###') or
-                line.startswith('##') or
-                re.match(r'^\d+\.\s+[A-Z]', line) or
-                any(keyword in line.lower() for keyword in [
-                    'intención macro', 'flujo funcional', 'interacción', 
-                    'validación', 'casos de borde', 'casos límite'
-                ])
-            )
-            
-            if is_new_section and current_section:
-                sections.append(current_section)
-                current_section = []
-            
-            current_section.append(line)
-        
-        if current_section:
-            sections.append(current_section)
-        
-        return sections
+        return group_sections(lines)
 
     def _format_section_content(self, section_lines: list) -> str:
         """
@@ -516,29 +516,18 @@ class AzureService:
         html_parts = []
         current_scenario = []
         
-        for line in section_lines:
-            # Limpiar línea
-            line = line.strip()
+        for line in lex_lines(section_lines):
             if not line:
                 continue
             
-            # Limpiar títulos de sección
-            line = re.sub(r'^#+\s*', '', line)
-            line = re.sub(r'^\d+\.\s*', '', line)
-            
-            # Detectar nuevo escenario
-            is_new_scenario = (
-                'escenario' in line.lower() and 
-                ('principal' in line.lower() or 'alternativo' in line.lower() or 'edge' in line.lower())
-            )
-            
             # Si es nuevo escenario y tenemos uno anterior, procesarlo
-            if is_new_scenario and current_scenario:
+            if line.is_scenario_variant and current_scenario:
                 scenario_html = self._format_single_scenario(current_scenario)
                 html_parts.append(f"<p>{scenario_html}</p>")
                 current_scenario = []
             
-            current_scenario.append(line)
+            # Línea sin prefijos de título (#, numeración)
+            current_scenario.append(line.body)
         
         # Procesar el último escenario
         if current_scenario:
@@ -580,10 +569,19 @@ class AzureService:
         cleaned = re.sub(r'<[^>]+>', '', html_string)
         return cleaned.strip()
     
-    def extract_feature_from_azure(self, fields: dict) -> dict:
+    def extract_feature_from_azure(self, fields: dict, azure_id_num: int = None) -> dict:
         """
-        Extrae feature y módulo directamente de los campos de Azure DevOps
+        Extrae feature y módulo: primero del catálogo de features del proyecto
+        y, si la HU no está catalogada, de los campos de Azure DevOps
         """
+        catalog_info = lookup_feature(self.feature_catalog_project_id, azure_id_num)
+        if catalog_info:
+            return {
+                'feature': catalog_info['feature'],
+                'module': catalog_info['module'] or "Sin Módulo",
+                'source': 'catalog'
+            }
+        
         # Opciones de campos donde podría estar la información del feature/módulo
         feature_fields = [
             'System.AreaPath',           # Área del proyecto
@@ -625,15 +623,32 @@ class AzureService:
         
         return {
             'feature': feature or "Sin Feature",
-            'module': module or "Sin Módulo"
+            'module': module or "Sin Módulo",
+            'source': 'azure'
         }
     
-    def fetch_hu(self, azure_id: str) -> dict:
+    def fetch_hu(self, azure_id: str, use_cache: Optional[bool] = None) -> dict:
         try:
             azure_id_num = int(azure_id)
         except ValueError:
             raise Exception(f"Azure ID must be a number, got: {azure_id}")
         
+        # Sin service hook configurado nada invalida la caché: se consulta siempre Azure DevOps
+        if use_cache is None:
+            use_cache = work_item_cache_enabled(self.org, self.project)
+        if use_cache:
+            cached = get_cached_work_item(self.org, self.project, azure_id_num, self.token)
+            if cached:
+                # El catálogo puede haber cambiado desde que se cacheó el work item
+                catalog_info = lookup_feature(self.feature_catalog_project_id, azure_id_num)
+                if catalog_info:
+                    cached['feature'] = catalog_info['feature']
+                    cached['module'] = catalog_info['module'] or "Sin Módulo"
+                    cached['featureSource'] = 'catalog'
+                if catalog_info or cached.get('featureSource') != 'catalog':
+                    print(f"⚡ Work item {azure_id_num} obtenido de la caché")
+                    return cached
+        
         # ✅ MEJORADO: Expandir más campos para obtener toda la información
         url = f"https://dev.azure.com/{self.org}/{self.project}/_apis/wit/workitems?ids={azure_id_num}&$expand=all&api-version=7.1"
         
@@ -655,7 +670,7 @@ class AzureService:
         print(f"📋 Work item fields found: {list(fields.keys())}")
         
         # ✅ MEJORADO: Obtener feature y módulo dinámicamente
-        feature_info = self.extract_feature_from_azure(fields)
+        feature_info = self.extract_feature_from_azure(fields, azure_id_num)
         
         # ✅ MEJORADO: Obtener más información del work item
         title = fields.get('System.Title', '')
@@ -676,17 +691,23 @@ class AzureService:
         print(f"   Description length: {len(description)} chars")
         print(f"   Acceptance criteria length: {len(acceptance_criteria)} chars")
         
-        return {
+        result = {
             'id': work_item.get('id'),
             'title': title,
             'description': description,
             'acceptanceCriteria': acceptance_criteria,
             'feature': feature_info['feature'],
             'module': feature_info['module'],
+            'featureSource': feature_info['source'],
+            'areaPath': fields.get('System.AreaPath', ''),
             'workItemType': work_item_type,
             'state': state,
             'priority': priority
         }
+        
+        cache_work_item(self.org, self.project, azure_id_num, self.token, result)
+        
+        return dict(result)
 
     def update_hu_in_azure(self, azure_id: str, refined_response: str, markdown_response: str) -> bool:
         """
@@ -781,6 +802,9 @@ class AzureService:
                 print(f"   🎨 HTML Criteria: {len(criteria_html)} chars")
                 print(f"   📝 Description: PRESERVED (no changes)")
                 
+                # El work item cambió en Azure: descartar la copia cacheada
+                invalidate_work_item(self.org, self.project, azure_id_num)
+                
                 if new_rev != current_rev:
                     print(f"✅ CONFIRMED: Criteria content updated correctly in Azure DevOps")
                     return True
@@ -944,8 +968,8 @@ class AzureService:
         # PASO 1: Limpiar y normalizar el contenido
         content = self._clean_and_normalize_content(content)
         
-        # PASO 2: Extraer solo la sección de criterios
-        criteria_section = self._extract_criteria_section(content)
+        # PASO 2: Extraer solo la sección de criterios (líneas ya clasificadas)
+        criteria_section = self._extract_criteria_lines(content)
         
         if not criteria_section:
             print("⚠️ No se encontraron criterios, usando plantilla")
@@ -963,104 +987,30 @@ class AzureService:
         Extrae solo la sección de criterios de aceptación del contenido
         SOPORTE BILINGÜE: Español e Inglés
         """
-        print("🔍 Extrayendo sección de criterios (bilingüe)...")
+        criteria_text = '\n'.join(line.text for line in self._extract_criteria_lines(content))
+        if criteria_text:
+            print(f"✅ Sección de criterios extraída: {len(criteria_text)} chars")
         
-        # Buscar marcadores de criterios en ESPAÑOL
-        criteria_markers_spanish = [
-            'CRITERIOS DE ACEPTACIÓN DETALLADOS',
-            'CRITERIOS DE ACEPTACIÓN',
-            '## CRITERIOS DE ACEPTACIÓN',
-            '### CRITERIOS DE ACEPTACIÓN',
-            '1. Intención Macro',
-            '2. Flujo Funcional',
-            '### 1. Intención Macro',
-            '### 2. Flujo Funcional',
-            '### 3. Interacción',
-            '### 4. Validación',
-            '### 5. Casos'
-        ]
-        
-        # Buscar marcadores de criterios en INGLÉS
-        criteria_markers_english = [
-            'ACCEPTANCE CRITERIA (use Gherkin syntax)',
-            'ACCEPTANCE CRITERIA',
-            '## ACCEPTANCE CRITERIA',
-            '### ACCEPTANCE CRITERIA',
-            '1. Business Value Scenario',
-            '2. Complete Functional Flow',
-            '### 1. Business Value Scenario',
-            '### 2. Complete Functional Flow',
-            '### 3. UI Interaction',
-            '### 4. Data Validation',
-            '### 5. Edge Cases'
-        ]
-        
-        # Combinar todos los marcadores
-        criteria_markers = criteria_markers_spanish + criteria_markers_english
-        
-        lines = content.split('\n')
-        start_index = -1
-        
-        # Buscar el inicio de criterios
-        for i, line in enumerate(lines):
-            line_lower = line.lower().strip()
-            for marker in criteria_markers:
-                if marker.lower() in line_lower:
-                    start_index = i
-                    print(f"✅ Encontrado inicio de criterios en línea {i}: '{line[:50]}...'")
-                    break
-            if start_index != -1:
-                break
+        return criteria_text
+
+    def _extract_criteria_lines(self, content: str) -> list:
+        """
+        Extrae las líneas (ya clasificadas por el lexer) de la sección de criterios
+        """
+        print("🔍 Extrayendo sección de criterios (bilingüe)...")
         
-        # Si no encontramos marcadores específicos, buscar por contenido (bilingüe)
-        if start_index == -1:
-            for i, line in enumerate(lines):
-                # Buscar en español
-                if (('criterios' in line.lower() and 'aceptación' in line.lower()) or \
-                    ('intención macro' in line.lower()) or \
-                    ('flujo funcional' in line.lower())):
-                    start_index = i
-                    print(f"✅ Encontrado inicio de criterios por contenido (ES) en línea {i}: '{line[:50]}...'")
-                    break
-                # Buscar en inglés
-                elif (('acceptance criteria' in line.lower()) or \
-                      ('business value scenario' in line.lower()) or \
-                      ('complete functional flow' in line.lower())):
-                    start_index = i
-                    print(f"✅ Encontrado inicio de criterios por contenido (EN) en línea {i}: '{line[:50]}...'")
-                    break
+        # Marcadores bilingües precompilados en utils/criteria_lexer.py
+        lines = lex_lines(content.split('\n'))
+        start_index, end_index = find_criteria_bounds(lines)
         
         if start_index == -1:
             print("⚠️ No se encontró sección de criterios")
-            return ""
+            return []
         
-        # Extraer desde el inicio hasta el final o hasta el siguiente marcador
-        criteria_lines = []
-        for i in range(start_index, len(lines)):
-            line = lines[i].strip()
-            
-            # Detectar fin de criterios (nuevo marcador de sección) - BILINGÜE
-            if (i > start_index and 
-                (line.startswith('## ') or 
-                 line.startswith('### ') or
-                 'CONSIDERACIONES TÉCNICAS' in line.upper() or
-                 'CRITERIOS DE DONE' in line.upper() or
-                 'TECHNICAL CONSIDERATIONS' in line.upper() or
-                 'DONE CRITERIA' in line.upper())):
-                # Solo romper si es una nueva sección principal, no subsecciones
-                spanish_keywords = ['intención macro', 'flujo funcional', 'interacción', 'validación', 'casos']
-                english_keywords = ['business value scenario', 'complete functional flow', 'ui interaction', 'data validation', 'edge cases']
-                all_keywords = spanish_keywords + english_keywords
-                
-                if not any(keyword in line.lower() for keyword in all_keywords):
-                    break
-            
-            criteria_lines.append(line)
-        
-        criteria_text = '\n'.join(criteria_lines)
-        print(f"✅ Sección de criterios extraída: {len(criteria_text)} chars")
+        print(f"✅ Encontrado inicio de criterios en línea {start_index}: '{lines[start_index].text[:50]}...'")
         
-        return criteria_text
+        # Desde el inicio hasta el siguiente marcador de sección principal
+        return lines[start_index:end_index]
 
     def _generate_complete_criteria_html(self, criteria_section: str) -> str:
         """
@@ -1101,47 +1051,7 @@ class AzureService:
         Agrupa las líneas de criterios en secciones SIN LÍMITES
         SOPORTE BILINGÜE: Español e Inglés
         """
-        sections = []
-        current_section = []
-        
-        # Palabras clave en español
-        spanish_keywords = [
-            'intención macro', 'flujo funcional', 'interacción', 
-            'validación', 'casos de borde', 'casos límite', 'componentes ui',
-            'datos y reglas', 'manejo de errores'
-        ]
-        
-        # Palabras clave en inglés
-        english_keywords = [
-            'business value scenario', 'complete functional flow', 'ui interaction',
-            'data validation', 'edge cases', 'error handling', 'components ui',
-            'data and rules', 'technical considerations'
-        ]
-        
-        # Combinar todas las palabras clave
-        all_keywords = spanish_keywords + english_keywords
-        
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-            
-            # Detectar nueva sección
-            is_new_section = (
-                line.startswith('###') or
-                line.startswith('##') or
-                re.match(r'^\d+\.\s+[A-Z]', line) or
-                any(keyword in line.lower() for keyword in all_keywords)
-            )
-            
-            if is_new_section and current_section:
-                sections.append(current_section)
-                current_section = []
-            
-            current_section.append(line)
-        
-        if current_section:
-            sections.append(current_section)
+        sections = group_sections(lines, complete=True)
         
         print(f"✅ Secciones de criterios encontradas: {len(sections)}")
         return sections
@@ -1151,14 +1061,10 @@ class AzureService:
         Extrae el título de una sección de criterios
         SOPORTE BILINGÜE: Mejor manejo de markdown
         """
-        for line in section_lines:
-            line = line.strip()
-            if (line.startswith('###') or 
-                line.startswith('##') or 
-                re.match(r'^\d+\.\s+[A-Z]', line)):
+        for line in lex_lines(section_lines):
+            if line.is_section_title:
                 # Limpiar el título - manejar mejor los signos de markdown
-                title = re.sub(r'^#+\s*', '', line)
-                title = re.sub(r'^\d+\.\s*', '', title)
+                title = line.body
                 # Limpiar cualquier markdown restante
                 title = re.sub(r'\*\*([^*]+)\*\*', r'\1', title)  # Remover **texto**
                 title = re.sub(r'\*([^*]+)\*', r'\1', title)      # Remover *texto*
@@ -1174,29 +1080,13 @@ class AzureService:
         html_parts = []
         current_scenario = []
         
-        for line in section_lines:
-            # Limpiar línea
-            line = line.strip()
+        for line in lex_lines(section_lines):
             if not line:
                 continue
             
-            # Verificar si es un título de sección (no procesar como escenario)
-            original_line = line
-            is_section_title = line.startswith('###') or line.startswith('##') or re.match(r'^\d+\.\s+[A-Z]', line)
-            
-            # Limpiar títulos de sección - manejar mejor markdown
-            line = re.sub(r'^#+\s*', '', line)
-            line = re.sub(r'^\d+\.\s*', '', line)
-            
             # Detectar nuevo escenario - BILINGÜE (solo si no es título de sección)
-            is_new_scenario = (
-                not is_section_title and
-                (('escenario' in line.lower() or 'scenario' in line.lower()) and
-                 (':' in line or line.strip().endswith(':')))
-            )
-            
             # Si es nuevo escenario y tenemos uno anterior, procesarlo
-            if is_new_scenario and current_scenario:
+            if line.is_scenario_start and current_scenario:
                 scenario_html = self._format_single_scenario(current_scenario)
                 html_parts.append(f"<p>{scenario_html}</p>")
                 # Agregar salto de línea real entre escenarios
@@ -1204,8 +1094,8 @@ class AzureService:
                 current_scenario = []
             
             # Solo agregar líneas que no sean títulos de sección al escenario actual
-            if not is_section_title:
-                current_scenario.append(line)
+            if not line.is_section_title:
+                current_scenario.append(line.body)
         
         # Procesar el último escenario
         if current_scenario:
@@ -1222,28 +1112,9 @@ class AzureService:
         formatted_parts = []
         
         # Detectar idioma del contenido descriptivo (ignorar palabras clave Gherkin originales)
-        content_text = ' '.join(scenario_lines).lower()
-        
-        # Palabras de contenido en inglés (dominantes en el contenido del usuario)
-        english_content_words = ['user', 'admin', 'projects', 'page', 'system', 'widgets', 'dashboard', 'company', 'visibility', 'approval', 'margin', 'portfolio', 'health', 'status', 'filter', 'sort', 'table', 'card', 'view', 'data', 'export', 'timeline', 'permission', 'access', 'control', 'validation', 'error', 'performance', 'real-time', 'update', 'refresh', 'session', 'preference', 'toggle', 'persistence', 'pagination', 'scroll', 'responsive', 'mobile', 'desktop', 'tablet', 'role', 'opens', 'sees', 'displays', 'aggregates', 'restricted', 'tied', 'visible', 'widget', 'badge', 'count', 'buttons', 'enabled', 'disappears', 'decrements', 'sorts', 'filters', 'needs', 'attention', 'consistent', 'aligns', 'optimizing', 'opportunities', 'orders', 'descending', 'updates', 'accordingly', 'applied', 'layout', 'loads', 'sections', 'render', 'order', 'default', 'sorting', 'recently', 'used', 'session', 'first', 'time', 'toggles', 'saves', 'preference', 'persists', 'maintains', 'chips', 'clear', 'removes', 'restores', 'dataset', 'size', 'selector', 'items', 'showing', 'controls', 'reflect', 'actions', 'details', 'edit', 'timeline', 'triggers', 'navigation', 'interaction', 'display', 'truncated', 'description', 'logo', 'label', 'color', 'progress', 'estimated', 'favorite', 'star', 'menu', 'button', 'grid', 'columns', 'header', 'sticky', 'sortable', 'toggling', 'horizontal', 'alphabetically', 'ascending', 'reverses', 'numerical', 'percentage', 'timestamp', 'stars', 'appears', 'favorites', 'link', 'un-starring', 'removes', 'real', 'planning', 'start', 'dates', 'within', 'days', 'lists', 'sorted', 'nearest', 'qualify', 'shows', 'color', 'coding', 'values', 'equals', 'count', 'distribution', 'pie', 'aligns', 'reflects', 'completed', 'cancelled', 'ratio', 'utilization', 'active', 'consistent', 'scope', 'requesting', 'returned', 'queries', 'attempts', 'denied', 'becomes', 'higher', 'approved', 'rejected', 'removed', 'types', 'search', 'bar', 'executes', 'contains', 'case-insensitive', 'tokenized', 'highlighted', 'terms', 'matched', 'optional', 'correct', 'calculated', 'duration', 'range', 'numeric', 'between', 'matches', 'visual', 'empty', 'exists', 'illustration', 'create', 'hidden', 'cannot', 'overly', 'restrictive', 'returns', 'results', 'display', 'suggestions', 'adjust', 'large', 'dataset', 'exists', 'applied', 'server-side', 'indexed', 'acceptable', 'sla', 'skeleton', 'loaders', 'progressive', 'jank', 'approves', 'another', 'viewing', 'count', 'list', 'updates', 'reload', 'network', 'occurs', 'triggers', 'toast', 'failed', 'retry', 'duplicate', 'download', 'initiated', 'rate', 'limiting', 'prevents', 'rapid', 'calls', 'without', 'edit', 'permissions', 'disabled', 'attempting', 'navigate', 'directly', 'returns', 'reduces', 'fewer', 'resets', 'accurately', 'sets', 'earlier', 'validation', 'appears', 'corrected', 'minimum', 'exceed', 'maximum', 'values', 'corrected', 'applying', 'narrow', 'viewport', 'horizontally', 'fixed', 'remaining', 'smoothly', 'overlap']
-        
-        # Palabras de contenido en español
-        spanish_content_words = ['usuario', 'administrador', 'proyectos', 'página', 'sistema', 'widgets', 'panel', 'empresa', 'visibilidad', 'aprobación', 'margen', 'portafolio', 'salud', 'estado', 'filtro', 'ordenar', 'tabla', 'tarjeta', 'vista', 'datos', 'exportar', 'línea', 'permiso', 'acceso', 'control', 'validación', 'error', 'rendimiento', 'tiempo', 'actualizar', 'refrescar', 'sesión', 'preferencia', 'alternar', 'persistencia', 'paginación', 'desplazamiento', 'responsivo', 'móvil', 'escritorio', 'tableta']
-        
-        # Contar palabras de contenido de cada idioma
-        english_content_count = sum(1 for word in english_content_words if word in content_text)
-        spanish_content_count = sum(1 for word in spanish_content_words if word in content_text)
-        
-        # Si hay más contenido en inglés que en español, usar inglés
-        # Si hay empate o más español, usar español
-        use_english = english_content_count > spanish_content_count
-        
-        # Debug: Imprimir información de detección (solo en desarrollo)
-        # print(f"🔍 DEBUG: Detección de idioma para escenario:")
-        # print(f"   📊 Palabras en inglés: {english_content_count}")
-        # print(f"   📊 Palabras en español: {spanish_content_count}")
-        # print(f"   🌐 Usando inglés: {use_english}")
-        # print(f"   📝 Contenido: {content_text[:100]}...")
+        # Si no hay evidencia o hay empate, usar español
+        guess = detect_language(' '.join(scenario_lines), ignore=GHERKIN_KEYWORDS)
+        use_english = guess.language == 'en'
         
         for line in scenario_lines:
             # Limpiar línea
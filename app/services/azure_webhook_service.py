@@ -0,0 +1,83 @@
+import os
+import hmac
+import base64
+import hashlib
+from typing import Optional, List
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SUPPORTED_EVENTS = ("workitem.created", "workitem.updated")
+
+def get_webhook_secret(project_id: str) -> str:
+    """
+    Secreto del service hook de un proyecto, derivado de JWT_SECRET_KEY.
+    Se configura en Azure DevOps como contraseña de Basic Auth del Web Hook.
+    """
+    key = os.getenv("AZURE_WEBHOOK_SECRET_KEY") or os.getenv("JWT_SECRET_KEY", "your-secret-key-here-change-in-production")
+    return hmac.new(key.encode(), f"azure-webhook:{project_id}".encode(), hashlib.sha256).hexdigest()
+
+def verify_webhook_authorization(project_id: str, authorization: Optional[str]) -> bool:
+    """Valida el header Authorization (Basic) enviado por el service hook"""
+    if not authorization or not authorization.lower().startswith("basic "):
+        return False
+    try:
+        decoded = base64.b64decode(authorization.split(" ", 1)[1].strip()).decode("utf-8")
+    except (ValueError, UnicodeDecodeError):
+        return False
+    # Azure DevOps envía "usuario:contraseña"; el usuario es libre
+    password = decoded.split(":", 1)[1] if ":" in decoded else decoded
+    return hmac.compare_digest(password, get_webhook_secret(project_id))
+
+def get_auto_refine_area_paths() -> List[str]:
+    """Area paths (separados por coma) cuyas HUs nuevas se importan y refinan automáticamente"""
+    raw = os.getenv("AZURE_WEBHOOK_AREA_PATHS", "")
+    return [path.strip().lower() for path in raw.split(",") if path.strip()]
+
+def get_auto_refine_work_item_types() -> List[str]:
+    """Tipos de work item (separados por coma) que se importan automáticamente; por defecto solo User Story"""
+    raw = os.getenv("AZURE_WEBHOOK_WORK_ITEM_TYPES", "User Story")
+    return [work_item_type.strip().lower() for work_item_type in raw.split(",") if work_item_type.strip()]
+
+def work_item_type_matches(work_item_type: str, configured_types: List[str]) -> bool:
+    return (work_item_type or "").strip().lower() in configured_types
+
+def area_path_matches(area_path: str, configured_paths: List[str]) -> bool:
+    """Un area path coincide si es igual o está debajo de alguna ruta configurada"""
+    area_path = (area_path or "").lower()
+    return any(area_path == path or area_path.startswith(path + "\\") for path in configured_paths)
+
+def _work_item_id(value) -> Optional[int]:
+    """Id numérico positivo del work item, o None si falta o no es válido"""
+    if isinstance(value, bool):
+        return None
+    try:
+        work_item_id = int(str(value).strip()) if value is not None else None
+    except ValueError:
+        return None
+    return work_item_id if work_item_id and work_item_id > 0 else None
+
+def parse_work_item_event(payload: dict) -> dict:
+    """
+    Extrae la información relevante de un evento workitem.created / workitem.updated.
+    En workitem.updated los campos actuales vienen en resource.revision. work_item_id es None si falta
+    o no es un número (el endpoint responde 400)
+    """
+    event_type = payload.get("eventType", "")
+    resource = payload.get("resource") or {}
+
+    if event_type == "workitem.updated":
+        work_item_id = resource.get("workItemId") or (resource.get("revision") or {}).get("id")
+        fields = (resource.get("revision") or {}).get("fields") or {}
+    else:
+        work_item_id = resource.get("id")
+        fields = resource.get("fields") or {}
+
+    return {
+        "event_type": event_type,
+        "work_item_id": _work_item_id(work_item_id),
+        "team_project": fields.get("System.TeamProject", ""),
+        "area_path": fields.get("System.AreaPath", ""),
+        "work_item_type": fields.get("System.WorkItemType", ""),
+        "title": fields.get("System.Title", "")
+    }
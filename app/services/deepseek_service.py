@@ -1,9 +1,11 @@
 import os
 import json
+import time
 import requests
-from typing import Tuple
+from typing import Optional, Tuple
 from datetime import datetime
 from dotenv import load_dotenv
+from ..utils.language_detector import detect_language, needs_translation_to_english, is_confidently_spanish
 
 load_dotenv()
 
@@ -17,6 +19,18 @@ class DeepSeekService:
             "HTTP-Referer": "https://blackbird-labs.com",
             "X-Title": "RIWI QA Backend"
         }
+        # Modelo, tokens y latencia de la última llamada de refinamiento (ver hu_revisions)
+        self.last_call: Optional[dict] = None
+    
+    def _record_call(self, payload: dict, result: dict, started: float):
+        usage = result.get("usage") or {}
+        self.last_call = {
+            "model": result.get("model") or payload["model"],
+            "prompt_tokens": usage.get("prompt_tokens"),
+            "completion_tokens": usage.get("completion_tokens"),
+            "total_tokens": usage.get("total_tokens"),
+            "latency_ms": int((time.perf_counter() - started) * 1000),
+        }
     
     def refine_hu(self, title: str, description: str, acceptance_criteria: str = "", feature: str = "", module: str = "", language: str = "es") -> Tuple[str, str]:
         if not title or len(title.strip()) < 5:
@@ -31,12 +45,12 @@ class DeepSeekService:
         
         # Seleccionar el prompt según el idioma
         if language == "en":
-            print("🔄 Translating input fields to English...")
-            title = self._translate_to_english(title)
-            description = self._translate_to_english(description)
-            acceptance_criteria = self._translate_to_english(acceptance_criteria)
-            feature = self._translate_to_english(feature)
-            module = self._translate_to_english(module)
+            print("🔄 Translating input fields to English (only when needed)...")
+            title = self._ensure_english(title)
+            description = self._ensure_english(description)
+            acceptance_criteria = self._ensure_english(acceptance_criteria)
+            feature = self._ensure_english(feature)
+            module = self._ensure_english(module)
             prompt = self._get_english_prompt(title, description, acceptance_criteria, feature, module)
             print(f"🔍 DEBUG: Usando prompt en INGLÉS")
         else:
@@ -59,6 +73,7 @@ class DeepSeekService:
         print(f"   🌐 Language: {language}")
         
         try:
+            started = time.perf_counter()
             response = requests.post(self.base_url, headers=self.headers, json=payload, timeout=90)
             
             if response.status_code != 200:
@@ -72,6 +87,7 @@ class DeepSeekService:
                 raise Exception("Invalid API response format")
             
             content = result['choices'][0]['message']['content']
+            self._record_call(payload, result, started)
             
             print(f"✅ Gemma response received:")
             print(f"   📏 Content length: {len(content)} characters")
@@ -79,18 +95,18 @@ class DeepSeekService:
             print(f"   📄 Content preview (primeros 500 chars):")
             print(f"   {content[:500]}...")
             
-            # Debug: Verificar si la respuesta está en inglés
-            print(f"🔍 DEBUG: Verificando idioma de la respuesta:")
-            if 'EVALUACIÓN AUTOMÁTICA DE CRITICIDAD' in content[:1000]:
+            # Verificar el idioma de la respuesta
+            guess = detect_language(content)
+            print(f"🔍 DEBUG: Idioma detectado en la respuesta: {guess.language} (confianza {guess.confidence})")
+            if language == "en" and is_confidently_spanish(content):
+                # Se solicitó inglés pero la IA respondió en español: traducir
                 print(f"   ⚠️  La IA respondió en ESPAÑOL aunque se solicitó {language.upper()}")
-                # Si se solicitó inglés pero la IA respondió en español, traducir
-                if language == "en":
-                    print(f"   🔄 Traduciendo contenido de español a inglés...")
-                    content = self._translate_to_english(content)
-                    print(f"   ✅ Contenido traducido a inglés")
-            elif 'AUTOMATIC CRITICALITY ASSESSMENT' in content[:1000]:
-                print(f"   ✅ La IA respondió en INGLÉS correctamente")
-            else:
+                print(f"   🔄 Traduciendo contenido de español a inglés...")
+                content = self._translate_to_english(content)
+                print(f"   ✅ Contenido traducido a inglés")
+            elif guess.language == language:
+                print(f"   ✅ La IA respondió en el idioma solicitado")
+            elif guess.language is None:
                 print(f"   ❓ No se puede determinar el idioma de la respuesta")
             
             possible_plain_markers = [
@@ -487,6 +503,7 @@ class DeepSeekService:
         }
         
         print(f"🤖 Re-refining with Gemma using compatible configuration...")
+        started = time.perf_counter()
         response = requests.post(self.base_url, headers=self.headers, json=payload, timeout=90)
         
         if response.status_code != 200:
@@ -495,6 +512,7 @@ class DeepSeekService:
         
         result = response.json()
         content = result['choices'][0]['message']['content']
+        self._record_call(payload, result, started)
         print(f"✅ Re-refinement completed with {len(content)} characters")
         
         try:
@@ -937,6 +955,12 @@ Your task is to convert each of the provided scenarios into a manual test case i
         
         return simplified_content
 
+    def _ensure_english(self, content: str) -> str:
+        """Traduce al inglés solo si el detector no identifica el texto como inglés"""
+        if not needs_translation_to_english(content):
+            return content
+        return self._translate_to_english(content)
+
     def _translate_to_english(self, content: str) -> str:
         """Traduce el contenido de español a inglés usando la IA"""
         try:
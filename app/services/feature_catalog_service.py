@@ -0,0 +1,201 @@
+import os
+import time
+import threading
+from typing import Dict, List, Optional
+from sqlalchemy.orm import Session, selectinload
+from dotenv import load_dotenv
+
+from ..database.connection import SessionLocal
+from ..database.models import FeatureCatalogEntry, FeatureCatalogHU, FeatureCatalogVersion
+
+load_dotenv()
+
+# Segundos entre comprobaciones de la versión del catálogo en la base de datos
+# (las ediciones hechas en este proceso invalidan la caché de inmediato)
+FEATURE_CATALOG_VERSION_CHECK_SECONDS = float(os.getenv("FEATURE_CATALOG_VERSION_CHECK_SECONDS", "5"))
+
+# Caché en memoria por proyecto: project_id -> (versión, timestamp de comprobación, {hu_number: info})
+_catalog_cache: Dict[str, tuple] = {}
+_catalog_cache_lock = threading.Lock()
+
+class FeatureCatalogError(ValueError):
+    """Catálogo de features inválido (ej: una HU asignada a dos features)"""
+
+def get_catalog_version(db: Session, project_id: str) -> int:
+    """Versión actual del catálogo de un proyecto (0 si nunca se editó)"""
+    row = db.query(FeatureCatalogVersion).filter(FeatureCatalogVersion.project_id == project_id).first()
+    return row.version if row else 0
+
+def _load_index(db: Session, project_id: str) -> Dict[int, dict]:
+    """Carga el índice inverso HU -> feature de un proyecto en un dict"""
+    rows = db.query(FeatureCatalogHU.hu_number, FeatureCatalogEntry.feature_id,
+                    FeatureCatalogEntry.name, FeatureCatalogEntry.module).join(
+        FeatureCatalogEntry, FeatureCatalogHU.feature_entry_id == FeatureCatalogEntry.id
+    ).filter(FeatureCatalogHU.project_id == project_id).all()
+
+    return {
+        hu_number: {'feature': name, 'module': module, 'feature_id': feature_id}
+        for hu_number, feature_id, name, module in rows
+    }
+
+def invalidate_catalog_cache(project_id: str):
+    """Descarta el índice cacheado de un proyecto"""
+    with _catalog_cache_lock:
+        _catalog_cache.pop(project_id, None)
+
+def get_catalog_index(project_id: str, db: Optional[Session] = None) -> Dict[int, dict]:
+    """
+    Índice inverso HU -> feature del proyecto, recargado solo cuando cambia la versión.
+    Si no se pasa sesión se abre una propia únicamente cuando hay que consultar la base de datos.
+    """
+    now = time.monotonic()
+    with _catalog_cache_lock:
+        entry = _catalog_cache.get(project_id)
+    if entry and now - entry[1] < FEATURE_CATALOG_VERSION_CHECK_SECONDS:
+        return entry[2]
+
+    own_session = db is None
+    if own_session:
+        db = SessionLocal()
+    try:
+        version = get_catalog_version(db, project_id)
+        if entry and entry[0] == version:
+            index = entry[2]
+        else:
+            index = _load_index(db, project_id)
+            print(f"📚 Catálogo de features del proyecto {project_id} cargado (versión {version}, {len(index)} HUs)")
+    finally:
+        if own_session:
+            db.close()
+
+    with _catalog_cache_lock:
+        _catalog_cache[project_id] = (version, now, index)
+    return index
+
+def lookup_feature(project_id: Optional[str], hu_number, db: Optional[Session] = None) -> Optional[dict]:
+    """Busca la feature de una HU en el catálogo del proyecto. Retorna None si no está catalogada"""
+    if not project_id:
+        return None
+    try:
+        hu_number = int(hu_number)
+    except (TypeError, ValueError):
+        return None
+    info = get_catalog_index(project_id, db).get(hu_number)
+    return dict(info) if info else None
+
+def list_catalog(db: Session, project_id: str) -> dict:
+    """Catálogo completo del proyecto con su versión"""
+    # Las HUs de todas las features en una sola consulta (sin una carga por feature)
+    entries = db.query(FeatureCatalogEntry).options(selectinload(FeatureCatalogEntry.hus)).filter(
+        FeatureCatalogEntry.project_id == project_id
+    ).order_by(FeatureCatalogEntry.module, FeatureCatalogEntry.feature_id).all()
+
+    return {
+        "version": get_catalog_version(db, project_id),
+        "features": [
+            {
+                "feature_id": entry.feature_id,
+                "name": entry.name,
+                "module": entry.module,
+                "hus": sorted(hu.hu_number for hu in entry.hus)
+            }
+            for entry in entries
+        ]
+    }
+
+def _bump_version(db: Session, project_id: str) -> int:
+    row = db.query(FeatureCatalogVersion).filter(FeatureCatalogVersion.project_id == project_id).first()
+    if not row:
+        row = FeatureCatalogVersion(project_id=project_id, version=0)
+        db.add(row)
+    row.version = (row.version or 0) + 1
+    return row.version
+
+def _validate_features(features: List[dict]):
+    seen_features = set()
+    seen_hus = {}
+    for feature in features:
+        feature_id = (feature.get('feature_id') or '').strip()
+        if not feature_id or not (feature.get('name') or '').strip():
+            raise FeatureCatalogError("Cada feature necesita feature_id y name")
+        if feature_id in seen_features:
+            raise FeatureCatalogError(f"Feature {feature_id} duplicada")
+        seen_features.add(feature_id)
+        for hu_number in feature.get('hus') or []:
+            if hu_number in seen_hus:
+                raise FeatureCatalogError(
+                    f"La HU {hu_number} está asignada a {seen_hus[hu_number]} y a {feature_id}"
+                )
+            seen_hus[hu_number] = feature_id
+
+def replace_catalog(db: Session, project_id: str, features: List[dict]) -> int:
+    """Reemplaza el catálogo completo del proyecto. Retorna la nueva versión"""
+    _validate_features(features)
+
+    db.query(FeatureCatalogHU).filter(FeatureCatalogHU.project_id == project_id).delete(synchronize_session=False)
+    db.query(FeatureCatalogEntry).filter(FeatureCatalogEntry.project_id == project_id).delete(synchronize_session=False)
+
+    for feature in features:
+        entry = FeatureCatalogEntry(
+            project_id=project_id,
+            feature_id=feature['feature_id'].strip(),
+            name=feature['name'].strip(),
+            module=feature.get('module')
+        )
+        entry.hus = [FeatureCatalogHU(project_id=project_id, hu_number=int(n)) for n in feature.get('hus') or []]
+        db.add(entry)
+
+    version = _bump_version(db, project_id)
+    db.commit()
+    invalidate_catalog_cache(project_id)
+    return version
+
+def upsert_feature(db: Session, project_id: str, feature: dict) -> int:
+    """Crea o actualiza una feature del catálogo (sus HUs se reasignan). Retorna la nueva versión"""
+    _validate_features([feature])
+    feature_id = feature['feature_id'].strip()
+
+    entry = db.query(FeatureCatalogEntry).filter(
+        FeatureCatalogEntry.project_id == project_id,
+        FeatureCatalogEntry.feature_id == feature_id
+    ).first()
+    if not entry:
+        entry = FeatureCatalogEntry(project_id=project_id, feature_id=feature_id)
+        db.add(entry)
+    entry.name = feature['name'].strip()
+    entry.module = feature.get('module')
+    db.flush()
+
+    hu_numbers = [int(n) for n in feature.get('hus') or []]
+    if hu_numbers:
+        conflict = db.query(FeatureCatalogHU).filter(
+            FeatureCatalogHU.project_id == project_id,
+            FeatureCatalogHU.hu_number.in_(hu_numbers),
+            FeatureCatalogHU.feature_entry_id != entry.id
+        ).first()
+        if conflict:
+            message = f"La HU {conflict.hu_number} ya está asignada a la feature {conflict.feature.feature_id}"
+            db.rollback()
+            raise FeatureCatalogError(message)
+
+    existing = {hu.hu_number: hu for hu in entry.hus}
+    entry.hus = [existing.get(n) or FeatureCatalogHU(project_id=project_id, hu_number=n) for n in hu_numbers]
+    version = _bump_version(db, project_id)
+    db.commit()
+    invalidate_catalog_cache(project_id)
+    return version
+
+def delete_feature(db: Session, project_id: str, feature_id: str) -> Optional[int]:
+    """Elimina una feature del catálogo. Retorna la nueva versión o None si no existía"""
+    entry = db.query(FeatureCatalogEntry).filter(
+        FeatureCatalogEntry.project_id == project_id,
+        FeatureCatalogEntry.feature_id == feature_id
+    ).first()
+    if not entry:
+        return None
+
+    db.delete(entry)
+    version = _bump_version(db, project_id)
+    db.commit()
+    invalidate_catalog_cache(project_id)
+    return version
@@ -0,0 +1,43 @@
+import hashlib
+from datetime import datetime, timezone
+from typing import Optional
+
+def refinement_hash(refined_response: str) -> str:
+    """Hash del contenido refinado a partir del cual se generaron los tests"""
+    return hashlib.sha256((refined_response or "").encode("utf-8")).hexdigest()
+
+def build_stored_tests(refined_response: str, xray_path: str, test_result: dict) -> dict:
+    """Contenido de HU.tests_generated para un resultado de generate_xray_tests"""
+    return {
+        "source_hash": refinement_hash(refined_response),
+        "xray_path": xray_path,
+        "classified_tests": test_result.get("classified_tests", {}),
+        "summary": test_result.get("summary", {}),
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "last_import": None
+    }
+
+def get_reusable_tests(stored: Optional[dict], refined_response: str, xray_path: str) -> Optional[dict]:
+    """
+    Tests guardados reutilizables si se generaron con el mismo refinamiento y la misma ruta de XRay.
+    Retorna un dict con el formato de generate_xray_tests o None si hay que regenerar.
+    """
+    if not isinstance(stored, dict) or not stored.get("classified_tests"):
+        return None
+    if stored.get("source_hash") != refinement_hash(refined_response) or stored.get("xray_path") != xray_path:
+        return None
+    return {"classified_tests": stored["classified_tests"], "summary": stored.get("summary", {})}
+
+def with_import_result(stored: dict, xray_results: dict) -> dict:
+    """Copia de tests_generated con el resultado del último envío a XRay"""
+    summary = xray_results.get("summary", {})
+    return {
+        **stored,
+        "last_import": {
+            "success": summary.get("total_failed", 0) == 0 and (summary.get("total_tests", 0) > 0 or summary.get("total_skipped", 0) > 0),
+            "tests_sent": summary.get("total_success", 0),
+            "tests_failed": summary.get("total_failed", 0),
+            "tests_skipped": summary.get("total_skipped", 0),
+            "imported_at": datetime.now(timezone.utc).isoformat()
+        }
+    }
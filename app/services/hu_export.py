@@ -0,0 +1,143 @@
+"""
+Exportación masiva de las HUs de un proyecto en NDJSON o CSV.
+
+Las filas se leen en lotes con yield_per (cursor del lado del servidor en Postgres) sobre una conexión
+propia, se serializan una a una y se envían en bloques de EXPORT_CHUNK_BYTES, opcionalmente comprimidos
+con gzip: la memoria no depende del tamaño del proyecto. Con view=full cada fila incluye la descripción
+y los textos de refinamiento, descomprimidos de refinement_contents fila a fila.
+"""
+import csv
+import io
+import json
+import os
+import unicodedata
+import zlib
+from typing import Iterable, Iterator, Optional
+from urllib.parse import quote
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import aliased
+from dotenv import load_dotenv
+
+from ..database.models import HU, RefinementContent
+from ..utils.content_codec import decode_content
+
+load_dotenv()
+
+EXPORT_BATCH_SIZE = int(os.getenv("HU_EXPORT_BATCH_SIZE", "500"))
+EXPORT_CHUNK_BYTES = 64 * 1024
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+SUMMARY_FIELDS = ["id", "azure_id", "name", "status", "feature", "module", "language", "created_at", "updated_at"]
+FULL_FIELDS = SUMMARY_FIELDS + ["description", "refined_response", "markdown_response"]
+
+def export_fields(view: str) -> list:
+    return FULL_FIELDS if view == "full" else SUMMARY_FIELDS
+
+def _export_statement(project_id: str, view: str):
+    hus = HU.__table__
+    columns = [hus.c.id, hus.c.azure_id, hus.c.name, hus.c.status, hus.c.feature, hus.c.module,
+               hus.c.language, hus.c.created_at, hus.c.updated_at]
+    if view != "full":
+        return select(*columns).where(hus.c.project_id == project_id).order_by(hus.c.created_at, hus.c.id)
+
+    refined = aliased(RefinementContent.__table__, name="refined")
+    markdown = aliased(RefinementContent.__table__, name="markdown")
+    return (
+        select(*columns, hus.c.description,
+               hus.c.refined_response.label("legacy_refined"), hus.c.markdown_response.label("legacy_markdown"),
+               refined.c.codec.label("refined_codec"), refined.c.body.label("refined_body"),
+               markdown.c.codec.label("markdown_codec"), markdown.c.body.label("markdown_body"))
+        .select_from(hus)
+        .outerjoin(refined, refined.c.hash == hus.c.refined_hash)
+        .outerjoin(markdown, markdown.c.hash == hus.c.markdown_hash)
+        .where(hus.c.project_id == project_id)
+        .order_by(hus.c.created_at, hus.c.id)
+    )
+
+def _row_to_dict(row, view: str) -> dict:
+    result = {
+        "id": row.id,
+        "azure_id": row.azure_id,
+        "name": row.name,
+        "status": row.status.value if row.status else None,
+        "feature": row.feature,
+        "module": row.module,
+        "language": row.language or 'es',
+        "created_at": row.created_at.isoformat() if row.created_at else None,
+        "updated_at": row.updated_at.isoformat() if row.updated_at else None,
+    }
+    if view == "full":
+        result["description"] = row.description
+        # Las HUs anteriores a la migración 3 conservan el texto en la columna heredada
+        result["refined_response"] = (decode_content(row.refined_codec, row.refined_body)
+                                      if row.refined_body is not None else row.legacy_refined)
+        result["markdown_response"] = (decode_content(row.markdown_codec, row.markdown_body)
+                                       if row.markdown_body is not None else row.legacy_markdown)
+    return result
+
+def iter_project_hus(engine: Engine, project_id: str, view: str = "summary") -> Iterator[dict]:
+    """HUs del proyecto en orden de creación, leídas en lotes de EXPORT_BATCH_SIZE"""
+    with engine.connect() as connection:
+        result = connection.execution_options(yield_per=EXPORT_BATCH_SIZE).execute(_export_statement(project_id, view))
+        for row in result:
+            yield _row_to_dict(row, view)
+
+def ndjson_lines(rows: Iterable[dict]) -> Iterator[str]:
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + "\n"
+
+def csv_lines(rows: Iterable[dict], fields: list) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction="ignore")
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def chunked(lines: Iterable[str], compress: bool = False) -> Iterator[bytes]:
+    """Agrupa las líneas en bloques de ~EXPORT_CHUNK_BYTES (comprimidos con gzip si compress)"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None  # wbits=31: formato gzip
+    pending, size = [], 0
+    for line in lines:
+        data = line.encode("utf-8")
+        pending.append(data)
+        size += len(data)
+        if size >= EXPORT_CHUNK_BYTES:
+            block = b"".join(pending)
+            pending, size = [], 0
+            block = compressor.compress(block) if compressor else block
+            if block:
+                yield block
+    block = b"".join(pending)
+    if compressor:
+        block = compressor.compress(block) + compressor.flush()
+    if block:
+        yield block
+
+def export_project_hus(engine: Engine, project_id: str, export_format: str = "ndjson", view: str = "summary",
+                       compress: bool = False) -> Iterator[bytes]:
+    rows = iter_project_hus(engine, project_id, view)
+    lines = csv_lines(rows, export_fields(view)) if export_format == "csv" else ndjson_lines(rows)
+    return chunked(lines, compress)
+
+def export_filename(project_name: Optional[str], export_format: str, compress: bool, ascii_only: bool = True) -> str:
+    """Nombre del archivo exportado. Con ascii_only se quitan los acentos y los demás caracteres no ASCII"""
+    name = project_name or "proyecto"
+    if ascii_only:
+        name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii")
+    slug = "".join(ch if ch.isalnum() else "-" for ch in name).strip("-").lower() or "proyecto"
+    return f"{slug}-hus.{export_format}" + (".gz" if compress else "")
+
+def export_content_disposition(project_name: Optional[str], export_format: str, compress: bool) -> str:
+    """
+    Content-Disposition del export: filename en ASCII (los headers se codifican en latin-1) y el nombre
+    real del proyecto en filename* (RFC 5987)
+    """
+    filename = export_filename(project_name, export_format, compress)
+    unicode_filename = export_filename(project_name, export_format, compress, ascii_only=False)
+    return f"attachment; filename=\"{filename}\"; filename*=UTF-8''{quote(unicode_filename, safe='')}"
@@ -0,0 +1,159 @@
+"""
+Historial de refinamientos de las HUs (hu_revisions).
+
+Cada refinamiento (creación, rechazo con feedback, refinamiento automático del service hook) agrega una
+revisión con el modelo, los tokens y la latencia de la llamada. El refined se guarda como delta zlib contra
+el refined de la revisión anterior y el markdown contra el refined de la misma revisión (suelen coincidir),
+con una revisión completa cada HU_REVISION_KEYFRAME_INTERVAL para acotar la cadena a descomprimir.
+"""
+import os
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+
+from ..database.models import HU, HURevision
+from ..utils.content_codec import content_hash, encode_content, decode_content, encode_delta, decode_delta
+
+load_dotenv()
+
+HU_REVISION_KEYFRAME_INTERVAL = max(1, int(os.getenv("HU_REVISION_KEYFRAME_INTERVAL", "10")))
+PLACEHOLDER_PREFIXES = ("🤖 Refinando con IA", "❌ Error refinando")
+
+def is_refined_text(text: Optional[str]) -> bool:
+    """False para los textos provisionales (refinamiento en curso o fallido)"""
+    return bool(text) and not text.startswith(PLACEHOLDER_PREFIXES)
+
+def decode_revisions(revisions: List[HURevision]) -> Dict[int, Tuple[str, str]]:
+    """Textos (refined, markdown) por número de revisión. La lista debe empezar en una revisión completa"""
+    texts = {}
+    previous = None
+    for revision in revisions:
+        if revision.codec == "zlib":
+            refined = decode_content("zlib", revision.refined_body)
+        elif revision.codec == "zlib-delta" and previous is not None:
+            refined = decode_delta(revision.refined_body, previous)
+        else:
+            raise ValueError(f"Revisión {revision.revision} de la HU {revision.hu_id} sin revisión base")
+        markdown = decode_delta(revision.markdown_body, refined)
+        if content_hash(refined) != revision.refined_hash or content_hash(markdown) != revision.markdown_hash:
+            raise ValueError(f"Revisión {revision.revision} de la HU {revision.hu_id} no coincide con su hash")
+        texts[revision.revision] = (refined, markdown)
+        previous = refined
+    return texts
+
+def _latest_refined_text(db: Session, hu_id: str, last_revision: int) -> str:
+    """refined de la última revisión: se descomprime desde la revisión completa más cercana"""
+    keyframe = db.query(func.max(HURevision.revision)).filter(
+        HURevision.hu_id == hu_id,
+        HURevision.codec == "zlib",
+        HURevision.revision <= last_revision
+    ).scalar()
+    chain = db.query(HURevision).filter(
+        HURevision.hu_id == hu_id,
+        HURevision.revision >= keyframe,
+        HURevision.revision <= last_revision
+    ).order_by(HURevision.revision).all()
+    return decode_revisions(chain)[last_revision][0]
+
+def record_revision(db: Session, hu: HU, trigger: str, refined_text: str, markdown_text: Optional[str],
+                    call: Optional[dict] = None, feedback: Optional[str] = None,
+                    user_id: Optional[str] = None) -> Optional[HURevision]:
+    """Agrega una revisión a la HU (sin confirmar la transacción). call: DeepSeekService.last_call"""
+    if refined_text is None:
+        return None
+    markdown_text = markdown_text if markdown_text is not None else ""
+    # Lock de la fila de la HU hasta el commit: un rechazo y un refinamiento automático simultáneos
+    # numeran sus revisiones uno después del otro en vez de chocar en uq_hu_revisions_hu_revision
+    # (en SQLite FOR UPDATE se ignora: las escrituras ya se serializan)
+    db.query(HU.id).filter(HU.id == hu.id).with_for_update().first()
+    last_revision = db.query(func.max(HURevision.revision)).filter(HURevision.hu_id == hu.id).scalar() or 0
+    number = last_revision + 1
+
+    codec, refined_body = None, None
+    if last_revision and (number - 1) % HU_REVISION_KEYFRAME_INTERVAL:
+        try:
+            refined_body = encode_delta(refined_text, _latest_refined_text(db, hu.id, last_revision))
+            codec = "zlib-delta"
+        except ValueError as e:
+            print(f"⚠️ {str(e)}: la revisión {number} se guarda completa")
+    if codec is None:
+        codec, refined_body = encode_content(refined_text)
+    markdown_body = encode_delta(markdown_text, refined_text)
+
+    call = call or {}
+    revision = HURevision(
+        hu_id=hu.id,
+        revision=number,
+        trigger=trigger,
+        feedback=feedback,
+        user_id=user_id,
+        model=call.get("model"),
+        prompt_tokens=call.get("prompt_tokens"),
+        completion_tokens=call.get("completion_tokens"),
+        total_tokens=call.get("total_tokens"),
+        latency_ms=call.get("latency_ms"),
+        codec=codec,
+        refined_body=refined_body,
+        markdown_body=markdown_body,
+        refined_hash=content_hash(refined_text),
+        markdown_hash=content_hash(markdown_text),
+        length=len(refined_text) + len(markdown_text),
+        stored_size=len(refined_body) + len(markdown_body),
+    )
+    db.add(revision)
+    db.flush()
+    print(f"📚 Revisión {number} de la HU {hu.azure_id} ({trigger}): {revision.length} caracteres, "
+          f"{revision.stored_size} bytes ({codec})")
+    return revision
+
+def record_baseline_revision(db: Session, hu: HU) -> Optional[HURevision]:
+    """
+    Guarda el refinamiento actual como revisión 1 si la HU todavía no tiene historial (HUs anteriores
+    a hu_revisions), para no perderlo antes de sobrescribirlo
+    """
+    if not is_refined_text(hu.refined_response):
+        return None
+    if db.query(HURevision.id).filter(HURevision.hu_id == hu.id).first():
+        return None
+    return record_revision(db, hu, "baseline", hu.refined_response, hu.markdown_response)
+
+def revision_to_dict(revision: HURevision, texts: Optional[Tuple[str, str]] = None) -> dict:
+    result = {
+        "revision": revision.revision,
+        "trigger": revision.trigger,
+        "feedback": revision.feedback,
+        "user_id": revision.user_id,
+        "model": revision.model,
+        "prompt_tokens": revision.prompt_tokens,
+        "completion_tokens": revision.completion_tokens,
+        "total_tokens": revision.total_tokens,
+        "latency_ms": revision.latency_ms,
+        "length": revision.length,
+        "stored_size": revision.stored_size,
+        "codec": revision.codec,
+        "created_at": revision.created_at,
+    }
+    if texts is not None:
+        result["refined_response"], result["markdown_response"] = texts
+    return result
+
+def list_revisions(db: Session, hu: HU, include_bodies: bool = False) -> dict:
+    """Historial de una HU con los totales de tokens, latencia y almacenamiento"""
+    revisions = db.query(HURevision).filter(HURevision.hu_id == hu.id).order_by(HURevision.revision).all()
+    texts = decode_revisions(revisions) if include_bodies else {}
+    return {
+        "hu_id": hu.id,
+        "azure_id": hu.azure_id,
+        "revisions": [revision_to_dict(revision, texts.get(revision.revision)) for revision in revisions],
+        "totals": {
+            "revisions": len(revisions),
+            "rejections": sum(1 for revision in revisions if revision.trigger == "rejection"),
+            "prompt_tokens": sum(revision.prompt_tokens or 0 for revision in revisions),
+            "completion_tokens": sum(revision.completion_tokens or 0 for revision in revisions),
+            "total_tokens": sum(revision.total_tokens or 0 for revision in revisions),
+            "latency_ms": sum(revision.latency_ms or 0 for revision in revisions),
+            "length": sum(revision.length for revision in revisions),
+            "stored_size": sum(revision.stored_size for revision in revisions),
+        },
+    }
@@ -0,0 +1,137 @@
+"""
+Búsqueda de HUs por nombre, Azure ID, feature, módulo y texto refinado.
+
+- SQLite: tabla virtual FTS5 (hus_fts) sincronizada con hus mediante triggers; los términos se
+  buscan por prefijo y los resultados se ordenan por relevancia (bm25).
+- Postgres: índices GIN con pg_trgm, que aceleran los ILIKE '%término%'; la relevancia se calcula
+  con similarity(). El texto refinado se busca en la copia descomprimida refinement_contents.search_text.
+- Sin ninguno de los dos (FTS5 no disponible, migraciones sin aplicar) se usa ILIKE como antes; en SQLite
+  el texto refinado se descomprime en la consulta con refinement_inflate.
+
+Las estructuras se crean en las migraciones 2 y 7 (app/database/migrations.py).
+"""
+import re
+import threading
+from typing import Dict, Optional
+from sqlalchemy import text, func, or_, and_, literal_column, select
+from sqlalchemy.orm import Query, Session
+
+from ..database.models import HU, RefinementContent
+from ..database.migrations import HU_SEARCH_COLUMNS as SEARCH_COLUMNS
+
+# Peso de cada columna indexada en la relevancia
+SEARCH_WEIGHTS = {"name": 10.0, "azure_id": 8.0, "feature": 4.0, "module": 3.0, "refined_response": 1.0}
+
+# El texto refinado no está en hus (se guarda en refinement_contents): con LIKE / pg_trgm se busca aparte
+LIKE_SEARCH_COLUMNS = [column for column in SEARCH_COLUMNS if column != "refined_response"]
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+_backend_cache: Dict[str, str] = {}
+_backend_lock = threading.Lock()
+
+def tokenize(term: Optional[str]) -> list:
+    """Palabras del término de búsqueda, sin operadores ni comillas"""
+    return _TOKEN_RE.findall(term or "")
+
+def detect_backend(db: Session) -> str:
+    """'fts5', 'trgm' o 'like' según lo disponible en la base de datos (se cachea por URL)"""
+    bind = db.get_bind()
+    key = str(bind.url)
+    if key in _backend_cache:
+        return _backend_cache[key]
+    with _backend_lock:
+        if key not in _backend_cache:
+            backend = "like"
+            if bind.dialect.name == "sqlite":
+                found = db.execute(text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'hus_fts'")).first()
+                backend = "fts5" if found else "like"
+            elif bind.dialect.name == "postgresql":
+                found = db.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")).first()
+                backend = "trgm" if found else "like"
+            print(f"🔎 Backend de búsqueda de HUs: {backend}")
+            _backend_cache[key] = backend
+    return _backend_cache[key]
+
+def reset_backend_cache():
+    """Olvida el backend detectado (ej: después de aplicar migraciones)"""
+    with _backend_lock:
+        _backend_cache.clear()
+
+def build_fts_match(filters: Dict[str, Optional[str]], query: Optional[str] = None) -> Optional[str]:
+    """
+    Expresión MATCH de FTS5: cada palabra se busca por prefijo ("pal"*), restringida a su columna
+    para los filtros por campo y en todas las columnas para la búsqueda libre.
+    """
+    clauses = []
+    for column, term in filters.items():
+        for token in tokenize(term):
+            clauses.append(f'{column} : "{token}"*')
+    for token in tokenize(query):
+        clauses.append(f'"{token}"*')
+    return " AND ".join(clauses) or None
+
+def _escape_like(token: str) -> str:
+    return token.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def _ilike_all(column, term: str):
+    """Todas las palabras del término deben aparecer en la columna"""
+    return and_(*[column.ilike(f"%{_escape_like(token)}%", escape="\\") for token in tokenize(term)])
+
+def _refined_text(db: Session):
+    """Texto refinado de refinement_contents: copia de búsqueda, o descomprimido en la consulta en SQLite"""
+    contents = RefinementContent.__table__
+    if db.get_bind().dialect.name == "sqlite":
+        return contents, func.refinement_inflate(contents.c.codec, contents.c.body)
+    return contents, contents.c.search_text
+
+def _refined_matches(db: Session, token: str):
+    """HUs cuyo texto refinado contiene la palabra (en Postgres usa el índice pg_trgm de search_text)"""
+    contents, refined = _refined_text(db)
+    return HU.refined_hash.in_(select(contents.c.hash).where(_ilike_all(refined, token)))
+
+def _refined_similarity(db: Session, needle: str):
+    contents, refined = _refined_text(db)
+    value = select(refined).where(contents.c.hash == HU.refined_hash).correlate(HU.__table__).scalar_subquery()
+    return func.similarity(func.coalesce(value, ""), needle) * SEARCH_WEIGHTS["refined_response"]
+
+def apply_search(db: Session, query: Query, filters: Dict[str, Optional[str]], q: Optional[str] = None):
+    """
+    Aplica los filtros de texto y la búsqueda libre a una query de HUs.
+    Retorna (query, rank): rank es la expresión de relevancia (menor = más relevante) o None si
+    el backend no ordena por relevancia. La query no queda ordenada (ver utils/pagination.py).
+    """
+    filters = {column: term for column, term in filters.items() if tokenize(term)}
+    if not filters and not tokenize(q):
+        return query, None
+
+    backend = detect_backend(db)
+
+    if backend == "fts5":
+        match = build_fts_match(filters, q)
+        weights = ", ".join(str(SEARCH_WEIGHTS[column]) for column in SEARCH_COLUMNS)
+        ranked = text(
+            f"SELECT rowid AS hu_rowid, bm25(hus_fts, {weights}) AS rank FROM hus_fts WHERE hus_fts MATCH :match"
+        ).bindparams(match=match).columns(literal_column("hu_rowid"), literal_column("rank")).subquery("hu_search")
+        query = query.join(ranked, literal_column("hus.rowid") == ranked.c.hu_rowid)
+        # bm25 es más negativo cuanto más relevante
+        return query, ranked.c.rank
+
+    for column, term in filters.items():
+        query = query.filter(_ilike_all(getattr(HU, column), term))
+    if tokenize(q):
+        for token in tokenize(q):
+            query = query.filter(or_(*[_ilike_all(getattr(HU, column), token) for column in LIKE_SEARCH_COLUMNS],
+                                     _refined_matches(db, token)))
+
+    if backend == "trgm":
+        needle = " ".join(tokenize(q) or [token for term in filters.values() for token in tokenize(term)])
+        scores = [
+            func.similarity(func.coalesce(getattr(HU, column), ""), needle) * SEARCH_WEIGHTS[column]
+            for column in LIKE_SEARCH_COLUMNS
+        ]
+        if tokenize(q):
+            scores.append(_refined_similarity(db, needle))
+        return query, -func.greatest(*scores)
+
+    return query, None
@@ -0,0 +1,213 @@
+"""
+Borrado en segundo plano de los proyectos eliminados.
+
+DELETE /projects/{id} solo marca el proyecto (projects.deleted_at) y crea un project_purges: desde ese
+momento el proyecto no aparece en ninguna consulta. El purgador borra sus HUs en lotes de
+PROJECT_PURGE_BATCH_SIZE con DELETE masivos (primero hu_revisions, luego hus, los refinement_contents que
+quedan sin referencias y las huellas de tests importados y jobs de generación de esas HUs), cada lote en su
+propia transacción corta que además actualiza el progreso; al terminar borra las estadísticas, el catálogo
+de features y el proyecto. Nada se carga en memoria ni se mantiene un lock durante todo el borrado.
+Los purgados que quedaron a medias (reinicio del proceso) o fallaron se retoman al arrancar; los fallidos
+también con POST /projects/{id}/deletion/retry.
+"""
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import List, Optional
+from sqlalchemy import select, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+
+from ..database.models import (
+    HU,
+    HURevision,
+    ImportedTestFingerprint,
+    JobStatus,
+    Project,
+    ProjectHUStat,
+    ProjectPurge,
+    FeatureCatalogEntry,
+    FeatureCatalogHU,
+    FeatureCatalogVersion,
+    TestGenerationJob,
+)
+from .refinement_gc import delete_unreferenced_contents
+from .test_fingerprints import normalize_azure_id
+
+load_dotenv()
+
+PROJECT_PURGE_BATCH_SIZE = max(1, int(os.getenv("PROJECT_PURGE_BATCH_SIZE", "500")))
+# Pausa entre lotes para dejar pasar otras escrituras (SQLite admite un solo escritor)
+PROJECT_PURGE_PAUSE_SECONDS = float(os.getenv("PROJECT_PURGE_PAUSE_SECONDS", "0.05"))
+
+def create_purge(db: Session, project: Project) -> ProjectPurge:
+    """Marca el proyecto como eliminado y registra su purgado (en la misma transacción)"""
+    project.deleted_at = datetime.now(timezone.utc)
+    project.is_active = False
+    total = db.query(HU.id).filter(HU.project_id == project.id).count()
+    purge = ProjectPurge(project_id=project.id, project_name=project.name, user_id=project.user_id,
+                         status=JobStatus.QUEUED, total_hus=total, deleted_hus=0, batches=0)
+    db.add(purge)
+    db.commit()
+    db.refresh(purge)
+    return purge
+
+def _azure_id_variants(numbers) -> List[str]:
+    return [value for number in numbers for value in (number, f"HU-{number}")]
+
+def _delete_hu_tests_rows(connection, user_id: str, client_id: Optional[str], azure_ids: List[str]):
+    """
+    Borra las huellas de tests importados (tenant de XRay del proyecto) y los jobs de generación terminados
+    (usuario del proyecto) de las HUs borradas. Se conservan los números de work item que todavía tiene
+    otra HU del mismo tenant o del mismo usuario; los jobs en curso los sigue actualizando el pipeline
+    """
+    hus, projects = HU.__table__, Project.__table__
+    fingerprints, jobs = ImportedTestFingerprint.__table__, TestGenerationJob.__table__
+    numbers = {normalize_azure_id(azure_id) for azure_id in azure_ids} - {""}
+    if not numbers:
+        return
+    still_used = connection.execute(
+        select(hus.c.azure_id, projects.c.client_id, projects.c.user_id)
+        .join(projects, projects.c.id == hus.c.project_id)
+        .where(hus.c.azure_id.in_(_azure_id_variants(numbers)))
+    ).fetchall()
+    tenant_numbers = numbers - {normalize_azure_id(row.azure_id) for row in still_used if row.client_id == client_id}
+    user_numbers = numbers - {normalize_azure_id(row.azure_id) for row in still_used if row.user_id == user_id}
+    if tenant_numbers:
+        connection.execute(fingerprints.delete().where(
+            fingerprints.c.client_id == (client_id or ""), fingerprints.c.azure_id.in_(sorted(tenant_numbers))
+        ))
+    if user_numbers:
+        connection.execute(jobs.delete().where(
+            jobs.c.user_id == user_id, jobs.c.azure_id.in_(_azure_id_variants(sorted(user_numbers))),
+            jobs.c.status.in_([JobStatus.COMPLETED, JobStatus.FAILED])
+        ))
+
+def _delete_hu_batch(engine: Engine, purge_id: str, project_id: str) -> int:
+    """Borra un lote de HUs del proyecto y suma el progreso. Retorna las HUs borradas"""
+    hus, revisions, purges, projects = HU.__table__, HURevision.__table__, ProjectPurge.__table__, Project.__table__
+    with engine.begin() as connection:
+        rows = connection.execute(
+            select(hus.c.id, hus.c.azure_id, hus.c.refined_hash, hus.c.markdown_hash)
+            .where(hus.c.project_id == project_id).limit(PROJECT_PURGE_BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            return 0
+        ids = [row.id for row in rows]
+        connection.execute(revisions.delete().where(revisions.c.hu_id.in_(ids)))
+        deleted = connection.execute(hus.delete().where(hus.c.id.in_(ids))).rowcount
+        delete_unreferenced_contents(connection, [value for row in rows for value in (row.refined_hash, row.markdown_hash)])
+        project = connection.execute(
+            select(projects.c.user_id, projects.c.client_id).where(projects.c.id == project_id)
+        ).first()
+        if project:
+            _delete_hu_tests_rows(connection, project.user_id, project.client_id, [row.azure_id for row in rows])
+        connection.execute(
+            update(purges).where(purges.c.id == purge_id)
+            .values(deleted_hus=purges.c.deleted_hus + deleted, batches=purges.c.batches + 1,
+                    updated_at=datetime.now(timezone.utc))
+        )
+        return deleted
+
+def _delete_project_rows(engine: Engine, project_id: str):
+    """Borra las filas que quedan del proyecto (sin HUs) y el proyecto"""
+    with engine.begin() as connection:
+        for table in (ProjectHUStat.__table__, FeatureCatalogHU.__table__, FeatureCatalogEntry.__table__,
+                      FeatureCatalogVersion.__table__):
+            connection.execute(table.delete().where(table.c.project_id == project_id))
+        projects = Project.__table__
+        connection.execute(projects.delete().where(projects.c.id == project_id, projects.c.deleted_at.is_not(None)))
+
+def _set_status(engine: Engine, purge_id: str, status: JobStatus, **values):
+    purges = ProjectPurge.__table__
+    with engine.begin() as connection:
+        connection.execute(update(purges).where(purges.c.id == purge_id).values(status=status, **values))
+
+def run_project_purge(engine: Engine, purge_id: str):
+    """Ejecuta (o retoma) un purgado hasta borrar el proyecto"""
+    with engine.connect() as connection:
+        purge = connection.execute(
+            select(ProjectPurge.__table__).where(ProjectPurge.__table__.c.id == purge_id)
+        ).first()
+    if not purge:
+        print(f"❌ Purgado {purge_id} no encontrado")
+        return
+
+    now = datetime.now(timezone.utc)
+    _set_status(engine, purge_id, JobStatus.RUNNING, started_at=purge.started_at or now, error=None)
+    print(f"🗑️ Purgando proyecto {purge.project_name} ({purge.project_id}): {purge.total_hus} HUs "
+          f"en lotes de {PROJECT_PURGE_BATCH_SIZE}")
+    started = time.perf_counter()
+    deleted = purge.deleted_hus
+    try:
+        while True:
+            batch = _delete_hu_batch(engine, purge_id, purge.project_id)
+            if not batch:
+                break
+            deleted += batch
+            print(f"   🗑️ {purge.project_name}: {deleted}/{purge.total_hus} HUs borradas")
+            if PROJECT_PURGE_PAUSE_SECONDS > 0:
+                time.sleep(PROJECT_PURGE_PAUSE_SECONDS)
+        _delete_project_rows(engine, purge.project_id)
+        _set_status(engine, purge_id, JobStatus.COMPLETED, finished_at=datetime.now(timezone.utc))
+        print(f"✅ Proyecto {purge.project_name} purgado en {time.perf_counter() - started:.1f}s")
+    except Exception as e:
+        print(f"❌ Error purgando el proyecto {purge.project_name}: {str(e)}")
+        _set_status(engine, purge_id, JobStatus.FAILED, error=str(e), finished_at=datetime.now(timezone.utc))
+
+def pending_purge_ids(engine: Engine) -> List[str]:
+    """Purgados sin terminar: en cola, interrumpidos por un reinicio o fallidos"""
+    purges = ProjectPurge.__table__
+    with engine.connect() as connection:
+        return connection.execute(
+            select(purges.c.id).where(purges.c.status.in_([JobStatus.QUEUED, JobStatus.RUNNING, JobStatus.FAILED]))
+            .order_by(purges.c.created_at)
+        ).scalars().all()
+
+def retry_purge(db: Session, purge: ProjectPurge) -> ProjectPurge:
+    """Vuelve a poner en cola un purgado fallido (continúa desde las HUs que quedan)"""
+    purge.status = JobStatus.QUEUED
+    purge.error = None
+    purge.finished_at = None
+    db.commit()
+    db.refresh(purge)
+    return purge
+
+def resume_pending_purges(engine: Engine) -> Optional[threading.Thread]:
+    """Retoma en un hilo los purgados interrumpidos (proceso reiniciado a mitad del borrado) o fallidos"""
+    purge_ids = pending_purge_ids(engine)
+    if not purge_ids:
+        return None
+    print(f"🗑️ Retomando {len(purge_ids)} purgados de proyectos pendientes")
+
+    def resume():
+        for purge_id in purge_ids:
+            run_project_purge(engine, purge_id)
+
+    thread = threading.Thread(target=resume, name="project-purge-resume", daemon=True)
+    thread.start()
+    return thread
+
+def purge_to_dict(purge: ProjectPurge) -> dict:
+    status_value = purge.status.value if hasattr(purge.status, 'value') else str(purge.status)
+    if purge.total_hus:
+        progress = min(100.0, round(100 * purge.deleted_hus / purge.total_hus, 1))
+    else:
+        progress = 100.0 if status_value == JobStatus.COMPLETED.value else 0.0
+    return {
+        "purge_id": purge.id,
+        "project_id": purge.project_id,
+        "project_name": purge.project_name,
+        "status": status_value,
+        "total_hus": purge.total_hus,
+        "deleted_hus": purge.deleted_hus,
+        "progress": progress,
+        "batches": purge.batches,
+        "error": purge.error,
+        "created_at": purge.created_at.isoformat() if purge.created_at else None,
+        "started_at": purge.started_at.isoformat() if purge.started_at else None,
+        "updated_at": purge.updated_at.isoformat() if purge.updated_at else None,
+        "finished_at": purge.finished_at.isoformat() if purge.finished_at else None
+    }
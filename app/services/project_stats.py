@@ -0,0 +1,145 @@
+"""
+Estadísticas de HUs por proyecto (project_hu_stats).
+
+Los contadores se actualizan de forma incremental al hacer flush de las HUs (models._update_project_stats).
+La reconciliación los recalcula desde hus y corrige las diferencias (escrituras que no pasan por el ORM,
+como los DELETE masivos o SQL manual): la ejecuta un hilo cada PROJECT_STATS_RECONCILE_SECONDS y
+scripts/reconcile_project_stats.py. El mismo hilo borra los refinement_contents sin referencias
+(services/refinement_gc.py).
+"""
+import os
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+from sqlalchemy import select
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+
+from ..database.models import (
+    HU,
+    HU_STATS_COLUMNS,
+    HUStatus,
+    Project,
+    ProjectHUStat,
+    hu_stats_row_entries,
+    apply_project_stats_deltas,
+)
+from ..utils.hu_stats import TEST_CATEGORIES
+from .refinement_gc import sweep_unreferenced_contents
+
+load_dotenv()
+
+# Segundos entre reconciliaciones en segundo plano (0 = desactivada)
+PROJECT_STATS_RECONCILE_SECONDS = float(os.getenv("PROJECT_STATS_RECONCILE_SECONDS", "3600"))
+
+def compute_project_stats(connection: Connection, project_id: str) -> Counter:
+    """Contadores de un proyecto calculados desde hus"""
+    table = HU.__table__
+    entries = Counter()
+    rows = connection.execution_options(yield_per=1000).execute(
+        select(*[table.c[column] for column in HU_STATS_COLUMNS]).where(table.c.project_id == project_id)
+    )
+    for row in rows:
+        entries.update(hu_stats_row_entries(row._mapping))
+    return entries
+
+def reconcile_project_stats(connection: Connection, project_id: str) -> Counter:
+    """
+    Recalcula las estadísticas de un proyecto y corrige las guardadas. Retorna las diferencias
+    aplicadas (vacío si estaban al día). Debe ejecutarse dentro de una transacción.
+    """
+    stats = ProjectHUStat.__table__
+    # Toma el lock de la fila del proyecto antes de leer hus: las actualizaciones incrementales
+    # concurrentes esperan o ya están confirmadas y se ven en el cálculo
+    apply_project_stats_deltas(connection, {project_id: Counter()})
+    computed = compute_project_stats(connection, project_id)
+    stored = Counter({
+        (row.dimension, row.key): row.count
+        for row in connection.execute(
+            select(stats.c.dimension, stats.c.key, stats.c.count).where(stats.c.project_id == project_id)
+        )
+    })
+    drift = Counter({key: computed[key] - stored[key] for key in set(computed) | set(stored)
+                     if computed[key] != stored[key]})
+    if drift:
+        apply_project_stats_deltas(connection, {project_id: drift})
+    connection.execute(stats.delete().where(stats.c.project_id == project_id, stats.c.count == 0))
+    return drift
+
+def reconcile_all_projects(engine: Engine, project_ids: Optional[List[str]] = None) -> Dict[str, Counter]:
+    """Reconcilia cada proyecto en su propia transacción. Retorna las diferencias por proyecto"""
+    if project_ids is None:
+        with engine.connect() as connection:
+            # Los proyectos eliminados los borra el purgador (services/project_purge.py), estadísticas incluidas
+            projects = Project.__table__
+            project_ids = [row.id for row in connection.execute(select(projects.c.id).where(projects.c.deleted_at.is_(None)))]
+    drifts = {}
+    for project_id in project_ids:
+        with engine.begin() as connection:
+            drift = reconcile_project_stats(connection, project_id)
+        if drift:
+            drifts[project_id] = drift
+            print(f"⚠️ Estadísticas del proyecto {project_id} corregidas: {len(drift)} contadores desfasados")
+    return drifts
+
+def _reconcile_loop(engine: Engine, interval: float, stop: threading.Event):
+    while not stop.wait(interval):
+        try:
+            started = time.perf_counter()
+            drifts = reconcile_all_projects(engine)
+            removed = sweep_unreferenced_contents(engine)
+            print(f"📊 Reconciliación de estadísticas: {len(drifts)} proyectos corregidos, "
+                  f"{removed} contenidos de refinamiento sin referencias borrados "
+                  f"en {time.perf_counter() - started:.1f}s")
+        except Exception as e:
+            print(f"❌ Error reconciliando estadísticas de proyectos: {str(e)}")
+
+_reconciler_stop: Optional[threading.Event] = None
+
+def start_stats_reconciler(engine: Engine):
+    """Lanza la reconciliación periódica en un hilo (una vez por proceso)"""
+    global _reconciler_stop
+    if PROJECT_STATS_RECONCILE_SECONDS <= 0 or _reconciler_stop is not None:
+        return
+    _reconciler_stop = threading.Event()
+    threading.Thread(target=_reconcile_loop, args=(engine, PROJECT_STATS_RECONCILE_SECONDS, _reconciler_stop),
+                     name="project-stats-reconciler", daemon=True).start()
+
+def stop_stats_reconciler():
+    global _reconciler_stop
+    if _reconciler_stop is not None:
+        _reconciler_stop.set()
+        _reconciler_stop = None
+
+def load_project_stats(db: Session, project_id: str) -> dict:
+    """Estadísticas guardadas de un proyecto, agrupadas por dimensión"""
+    rows = db.query(ProjectHUStat).filter(ProjectHUStat.project_id == project_id).all()
+    counts = {(row.dimension, row.key): row.count for row in rows}
+
+    def ranked(dimension: str, label: str) -> list:
+        items = [(key or None, count) for (row_dimension, key), count in counts.items()
+                 if row_dimension == dimension and count]
+        return [{label: key, "count": count} for key, count in sorted(items, key=lambda item: (-item[1], item[0] or ""))]
+
+    updated = [row.updated_at for row in rows if row.updated_at]
+    return {
+        "project_id": project_id,
+        "total_hus": counts.get(("hus", "total"), 0),
+        "by_status": {status.value: counts.get(("status", status.value), 0) for status in HUStatus},
+        "by_feature": ranked("feature", "feature"),
+        "by_module": ranked("module", "module"),
+        "tests": {
+            "generated": counts.get(("tests", "generated"), 0),
+            "imported": counts.get(("tests", "imported"), 0),
+            "import_failed": counts.get(("tests", "import_failed"), 0),
+            "hus_with_tests": counts.get(("tests", "hus_with_tests"), 0),
+            "hus_imported": counts.get(("tests", "hus_imported"), 0),
+            "by_criticality": {
+                **{category: 0 for category in TEST_CATEGORIES},
+                **{key: count for (dimension, key), count in counts.items() if dimension == "criticality" and count},
+            },
+        },
+        "updated_at": max(updated) if updated else None,
+    }
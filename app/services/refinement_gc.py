@@ -0,0 +1,50 @@
+"""
+Limpieza de refinement_contents: borra los contenidos que ya no referencia ninguna HU (refinamientos
+reescritos por un rechazo, HUs purgadas). El historial de cada HU está en hu_revisions, que guarda sus
+propios textos, así que estos contenidos no se vuelven a leer.
+
+El purgado de proyectos borra los contenidos de cada lote de HUs; la reconciliación periódica
+(services/project_stats.py) barre el resto.
+"""
+import os
+from typing import Iterable, Optional
+from sqlalchemy import and_, exists, select
+from sqlalchemy.engine import Connection, Engine
+from dotenv import load_dotenv
+
+from ..database.models import HU, RefinementContent
+
+load_dotenv()
+
+REFINEMENT_GC_BATCH_SIZE = max(1, int(os.getenv("REFINEMENT_GC_BATCH_SIZE", "500")))
+
+def _unreferenced():
+    contents, hus = RefinementContent.__table__, HU.__table__
+    return and_(~exists().where(hus.c.refined_hash == contents.c.hash),
+                ~exists().where(hus.c.markdown_hash == contents.c.hash))
+
+def delete_unreferenced_contents(connection: Connection, hashes: Optional[Iterable[str]] = None) -> int:
+    """
+    Borra los contenidos sin HUs que los referencien: de `hashes`, o un lote de REFINEMENT_GC_BATCH_SIZE
+    de toda la tabla si no se indican. Retorna los contenidos borrados
+    """
+    contents = RefinementContent.__table__
+    if hashes is None:
+        hashes = connection.execute(
+            select(contents.c.hash).where(_unreferenced()).limit(REFINEMENT_GC_BATCH_SIZE)
+        ).scalars().all()
+    hashes = [value for value in set(hashes) if value]
+    if not hashes:
+        return 0
+    # Se vuelve a comprobar al borrar: otra transacción pudo reutilizar el contenido
+    return connection.execute(contents.delete().where(contents.c.hash.in_(hashes), _unreferenced())).rowcount
+
+def sweep_unreferenced_contents(engine: Engine) -> int:
+    """Borra todos los contenidos sin referencias, un lote por transacción. Retorna los borrados"""
+    deleted = 0
+    while True:
+        with engine.begin() as connection:
+            batch = delete_unreferenced_contents(connection)
+        deleted += batch
+        if batch < REFINEMENT_GC_BATCH_SIZE:
+            return deleted
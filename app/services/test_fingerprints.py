@@ -0,0 +1,34 @@
+from typing import Iterable, Set
+from sqlalchemy.orm import Session
+
+from ..database.models import ImportedTestFingerprint
+
+def normalize_azure_id(azure_id) -> str:
+    """'HU-129' y '129' identifican la misma HU"""
+    azure_id = str(azure_id or "").strip()
+    return azure_id[3:] if azure_id.upper().startswith("HU-") else azure_id
+
+def load_imported_fingerprints(db: Session, client_id: str, azure_id: str, xray_path: str) -> Set[str]:
+    """Huellas de los tests ya importados con éxito para una HU y ruta de XRay"""
+    rows = db.query(ImportedTestFingerprint.fingerprint).filter(
+        ImportedTestFingerprint.client_id == (client_id or ""),
+        ImportedTestFingerprint.azure_id == normalize_azure_id(azure_id),
+        ImportedTestFingerprint.xray_path == xray_path
+    ).all()
+    return {row[0] for row in rows}
+
+def record_imported_fingerprints(db: Session, client_id: str, azure_id: str, xray_path: str,
+                                 fingerprints: Iterable[str], known: Set[str] = None) -> int:
+    """Guarda las huellas nuevas de tests importados con éxito. Retorna cuántas se agregaron"""
+    known = known if known is not None else load_imported_fingerprints(db, client_id, azure_id, xray_path)
+    new_fingerprints = set(fingerprints) - known
+    for fingerprint in new_fingerprints:
+        db.add(ImportedTestFingerprint(
+            client_id=client_id or "",
+            azure_id=normalize_azure_id(azure_id),
+            xray_path=xray_path,
+            fingerprint=fingerprint
+        ))
+    if new_fingerprints:
+        db.commit()
+    return len(new_fingerprints)
@@ -0,0 +1,134 @@
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from sqlalchemy import or_, and_
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+
+from ..database.models import TestGenerationJob, JobStatus
+
+load_dotenv()
+
+# Los jobs se ejecutan en BackgroundTasks: si el proceso se reinicia quedan en queued / running para
+# siempre. Pasado este tiempo desde que empezaron (o se encolaron) se dan por interrumpidos
+TEST_GENERATION_JOB_STALE_SECONDS = float(os.getenv("TEST_GENERATION_JOB_STALE_SECONDS", "1800"))
+INTERRUPTED_JOB_ERROR = "Job interrumpido: el servidor se reinició antes de que terminara. Vuelve a lanzarlo."
+
+class StageRecorder:
+    """
+    Registra la duración de cada etapa del pipeline de generación de tests.
+    Con un job asociado, cada cambio de etapa se persiste para que GET /generate-tests/{job_id}
+    muestre el progreso; sin job solo acumula los tiempos en memoria.
+    """
+
+    def __init__(self, db: Optional[Session] = None, job: Optional[TestGenerationJob] = None):
+        self.db = db
+        self.job = job
+        self.stages = []
+        self._current = None
+        self._started = None
+
+    def begin(self, stage: str):
+        """Cierra la etapa en curso (si la hay) e inicia una nueva"""
+        self.end()
+        self._current = stage
+        self._started = time.monotonic()
+        print(f"⏱️ Etapa '{stage}' iniciada")
+        self._persist()
+
+    def end(self, status: str = "ok"):
+        """Cierra la etapa en curso"""
+        if self._current is None:
+            return
+        seconds = round(time.monotonic() - self._started, 2)
+        self.stages.append({"stage": self._current, "status": status, "seconds": seconds})
+        print(f"⏱️ Etapa '{self._current}' terminada en {seconds}s ({status})")
+        self._current = None
+        self._persist()
+
+    def add(self, stage: str, seconds: float, status: str = "ok"):
+        """Registra una sub-etapa medida por otro componente (ej: importación por categoría)"""
+        self.stages.append({"stage": stage, "status": status, "seconds": round(seconds or 0, 2)})
+        self._persist()
+
+    def timings(self) -> dict:
+        return {
+            "stages": list(self.stages),
+            "total_seconds": round(sum(s["seconds"] for s in self.stages if ":" not in s["stage"]), 2)
+        }
+
+    def _persist(self):
+        if not self.job or not self.db:
+            return
+        self.job.current_stage = self._current
+        self.job.stages = list(self.stages)  # Nueva lista para que SQLAlchemy detecte el cambio
+        self.db.commit()
+
+def create_job(db: Session, user_id: str, azure_id: str, xray_path: str,
+               force_regenerate: bool = False) -> TestGenerationJob:
+    job = TestGenerationJob(user_id=user_id, azure_id=azure_id, xray_path=xray_path,
+                            force_regenerate=bool(force_regenerate), status=JobStatus.QUEUED, stages=[])
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+def mark_running(db: Session, job: TestGenerationJob):
+    job.status = JobStatus.RUNNING
+    job.started_at = datetime.now(timezone.utc)
+    db.commit()
+
+def mark_finished(db: Session, job: TestGenerationJob, result: Optional[dict] = None, error: Optional[str] = None):
+    job.status = JobStatus.FAILED if error else JobStatus.COMPLETED
+    job.result = result
+    job.error = error
+    job.current_stage = None
+    job.finished_at = datetime.now(timezone.utc)
+    db.commit()
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # SQLite devuelve fechas sin zona horaria (guardadas en UTC)
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+def is_stale(job: TestGenerationJob) -> bool:
+    """True si el job sigue en queued / running más allá de TEST_GENERATION_JOB_STALE_SECONDS"""
+    if job.status not in (JobStatus.QUEUED, JobStatus.RUNNING):
+        return False
+    last_activity = _as_utc(job.started_at or job.created_at)
+    if last_activity is None:
+        return False
+    return datetime.now(timezone.utc) - last_activity > timedelta(seconds=TEST_GENERATION_JOB_STALE_SECONDS)
+
+def fail_stale_jobs(db: Session) -> int:
+    """Marca como fallidos los jobs interrumpidos (al arrancar). Retorna cuántos se marcaron"""
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=TEST_GENERATION_JOB_STALE_SECONDS)
+    jobs = db.query(TestGenerationJob).filter(
+        TestGenerationJob.status.in_([JobStatus.QUEUED, JobStatus.RUNNING]),
+        or_(TestGenerationJob.started_at < cutoff,
+            and_(TestGenerationJob.started_at.is_(None), TestGenerationJob.created_at < cutoff))
+    ).all()
+    for job in jobs:
+        mark_finished(db, job, error=INTERRUPTED_JOB_ERROR)
+    return len(jobs)
+
+def job_to_dict(job: TestGenerationJob) -> dict:
+    status_value = job.status.value if hasattr(job.status, 'value') else str(job.status)
+    stages = job.stages or []
+    return {
+        "job_id": job.id,
+        "status": status_value,
+        "azure_id": job.azure_id,
+        "xray_path": job.xray_path,
+        "force_regenerate": bool(job.force_regenerate),
+        "current_stage": job.current_stage,
+        "stages": stages,
+        "total_seconds": round(sum(s.get("seconds", 0) for s in stages if ":" not in s.get("stage", "")), 2),
+        "result": job.result,
+        "error": job.error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None
+    }
@@ -0,0 +1,86 @@
+import time
+import uuid
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+class ImportTicket:
+    """Turno de un lote de importación en la cola de un tenant"""
+
+    def __init__(self, tenant: str, label: str = ""):
+        self.id = uuid.uuid4().hex[:12]
+        self.tenant = tenant
+        self.label = label
+        self.enqueued_at = time.monotonic()
+        self.started_at: Optional[float] = None
+        self.initial_position = 0  # 0 = se ejecuta de inmediato
+
+    @property
+    def wait_seconds(self) -> float:
+        end = self.started_at if self.started_at is not None else time.monotonic()
+        return round(end - self.enqueued_at, 2)
+
+class XRayImportScheduler:
+    """
+    Serializa las importaciones a XRay por tenant (client_id): XRay rechaza jobs concurrentes
+    del mismo tenant, así que los lotes de distintos usuarios y peticiones esperan su turno en
+    una cola FIFO en lugar de competir con reintentos.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._queues: Dict[str, deque] = {}
+        self._stats: Dict[str, dict] = {}
+
+    def position(self, ticket: ImportTicket) -> int:
+        """Posición actual del turno en su cola (0 = en ejecución, -1 = ya terminó)"""
+        with self._condition:
+            queue = self._queues.get(ticket.tenant)
+            if not queue or ticket not in queue:
+                return -1
+            return queue.index(ticket)
+
+    @contextmanager
+    def slot(self, tenant: str, label: str = ""):
+        """Espera el turno del tenant y lo mantiene mientras dura el bloque"""
+        ticket = ImportTicket(tenant, label)
+        with self._condition:
+            queue = self._queues.setdefault(tenant, deque())
+            queue.append(ticket)
+            ticket.initial_position = len(queue) - 1
+            if ticket.initial_position:
+                print(f"🕒 {label}: en cola de XRay, posición {ticket.initial_position} (tenant {tenant[:8]}...)")
+            while queue[0] is not ticket:
+                self._condition.wait()
+            ticket.started_at = time.monotonic()
+
+        try:
+            yield ticket
+        finally:
+            with self._condition:
+                queue.popleft()
+                if not queue:
+                    del self._queues[tenant]
+                stats = self._stats.setdefault(tenant, {"jobs": 0, "total_wait_seconds": 0.0})
+                stats["jobs"] += 1
+                stats["total_wait_seconds"] = round(stats["total_wait_seconds"] + ticket.wait_seconds, 2)
+                self._condition.notify_all()
+
+    def status(self, tenant: str) -> dict:
+        """Estado de la cola de un tenant"""
+        with self._condition:
+            queue = list(self._queues.get(tenant) or [])
+            stats = dict(self._stats.get(tenant) or {"jobs": 0, "total_wait_seconds": 0.0})
+        return {
+            "running": {"ticket_id": queue[0].id, "label": queue[0].label} if queue else None,
+            "queued": [
+                {"ticket_id": ticket.id, "label": ticket.label, "position": index, "wait_seconds": ticket.wait_seconds}
+                for index, ticket in enumerate(queue[1:], start=1)
+            ],
+            "completed_jobs": stats["jobs"],
+            "total_wait_seconds": stats["total_wait_seconds"]
+        }
+
+# Planificador compartido por todo el proceso
+xray_import_scheduler = XRayImportScheduler()
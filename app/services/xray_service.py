@@ -1,19 +1,188 @@
 import os
+import json
+import time
+import base64
+import hashlib
+import threading
 import requests
-from typing import List, Dict
+from typing import List, Dict, Optional
 from dotenv import load_dotenv
+from .xray_import_scheduler import xray_import_scheduler
+from ..utils.test_fingerprint import fingerprint_test
 
 load_dotenv()
 
+# Caché de tokens de XRay: (client_id, hash de credenciales) -> (token, expiración epoch)
+# Se refresca XRAY_TOKEN_REFRESH_MARGIN segundos antes de que expire el JWT
+XRAY_TOKEN_REFRESH_MARGIN = int(os.getenv("XRAY_TOKEN_REFRESH_MARGIN", "300"))
+# Vigencia asumida cuando el token no es un JWT con "exp"
+XRAY_TOKEN_DEFAULT_TTL = int(os.getenv("XRAY_TOKEN_DEFAULT_TTL", "3600"))
+_token_cache: Dict[tuple, tuple] = {}
+_token_cache_lock = threading.Lock()
+# Un lock por tenant para que los refrescos concurrentes se hagan una sola vez
+_token_refresh_locks: Dict[tuple, threading.Lock] = {}
+
+# Polling de jobs de importación: intervalo inicial, factor de crecimiento, máximo y timeout total
+XRAY_POLL_INITIAL_INTERVAL = float(os.getenv("XRAY_POLL_INITIAL_INTERVAL", "1"))
+XRAY_POLL_BACKOFF = float(os.getenv("XRAY_POLL_BACKOFF", "1.5"))
+XRAY_POLL_MAX_INTERVAL = float(os.getenv("XRAY_POLL_MAX_INTERVAL", "10"))
+XRAY_JOB_TIMEOUT = float(os.getenv("XRAY_JOB_TIMEOUT", "300"))
+XRAY_JOB_FINAL_STATUSES = ("successful", "partially_successful", "failed", "unsuccessful")
+# Consultas de estado fallidas seguidas tras las que se deja de esperar el job
+XRAY_POLL_MAX_ERRORS = max(1, int(os.getenv("XRAY_POLL_MAX_ERRORS", "5")))
+
+# Modo de importación: "consolidated" (un job con todas las categorías) o "by_category" (un job por categoría)
+XRAY_IMPORT_MODE = os.getenv("XRAY_IMPORT_MODE", "consolidated")
+# Límites por job en modo consolidado; solo se divide el lote si se superan
+XRAY_IMPORT_MAX_BYTES = int(os.getenv("XRAY_IMPORT_MAX_BYTES", "1000000"))
+XRAY_IMPORT_MAX_TESTS = int(os.getenv("XRAY_IMPORT_MAX_TESTS", "1000"))
+
+# Serializar las importaciones por tenant dentro del proceso (ver xray_import_scheduler)
+XRAY_IMPORT_SCHEDULER = os.getenv("XRAY_IMPORT_SCHEDULER", "true").lower() == "true"
+
+TEST_CATEGORIES = ['criticos', 'importantes', 'opcionales']
+CATEGORY_LABELS = {'criticos': '🔴 Críticos', 'importantes': '🟡 Importantes', 'opcionales': '🟢 Opcionales'}
+
+def chunk_tests_by_size(tests: List[dict], max_bytes: int = None, max_tests: int = None) -> List[List[dict]]:
+    """
+    Divide los tests en lotes cuyo JSON no supere max_bytes ni max_tests.
+    Un test que por sí solo supera el límite va en su propio lote.
+    """
+    max_bytes = XRAY_IMPORT_MAX_BYTES if max_bytes is None else max_bytes
+    max_tests = XRAY_IMPORT_MAX_TESTS if max_tests is None else max_tests
+    
+    chunks = []
+    current = []
+    current_size = 2  # Corchetes del array JSON
+    for test in tests:
+        # Mismo serializado que usa requests con json=
+        test_size = len(json.dumps(test).encode()) + (2 if current else 0)  # ", " entre elementos
+        if current and (current_size + test_size > max_bytes or len(current) >= max_tests):
+            chunks.append(current)
+            current = []
+            current_size = 2
+            test_size -= 2
+        current.append(test)
+        current_size += test_size
+    if current:
+        chunks.append(current)
+    return chunks
+
+def filter_imported_tests(classified_tests: dict, skip_fingerprints: Optional[set] = None) -> tuple:
+    """
+    Quita los tests cuya huella ya fue importada.
+    Retorna (tests por categoría a enviar, huellas de esos tests por categoría, omitidos por categoría).
+    """
+    skip_fingerprints = skip_fingerprints or set()
+    filtered, fingerprints, skipped = {}, {}, {}
+    for category in TEST_CATEGORIES:
+        filtered[category], fingerprints[category], skipped[category] = [], [], 0
+        seen = set()
+        for test in classified_tests.get(category) or []:
+            fingerprint = fingerprint_test(test)
+            # También se omiten duplicados dentro de la misma generación
+            if fingerprint in skip_fingerprints or fingerprint in seen:
+                skipped[category] += 1
+                continue
+            seen.add(fingerprint)
+            filtered[category].append(test)
+            fingerprints[category].append(fingerprint)
+    return filtered, fingerprints, skipped
+
+def failed_job_elements(errors: list) -> Optional[List[int]]:
+    """
+    Posiciones (elementNumber, desde 0) de los tests rechazados en un job parcialmente exitoso.
+    None si algún error no indica su posición: no se sabe qué tests se importaron
+    """
+    failed = set()
+    for error in errors:
+        element = error.get("elementNumber") if isinstance(error, dict) else None
+        if not isinstance(element, int):
+            return None
+        failed.add(element)
+    return sorted(failed)
+
+def imported_positions(job_result: dict, test_count: int) -> List[int]:
+    """Posiciones de los tests de un lote que XRay importó (ninguna si el job falló o no se sabe)"""
+    if not job_result.get("success"):
+        return []
+    if "failed_elements" not in job_result:
+        return list(range(test_count))
+    failed = job_result["failed_elements"]
+    if failed is None:
+        return []
+    failed = set(failed)
+    return [position for position in range(test_count) if position not in failed]
+
+def _skipped_result(skipped: int) -> dict:
+    return {"success": True, "message": f"{skipped} tests ya importados, omitidos", "count": 0, "skipped": skipped}
+
+def _token_cache_key(client_id: str, client_secret: str) -> tuple:
+    credential_hash = hashlib.sha256(f"{client_id}:{client_secret}".encode()).hexdigest()
+    return (client_id or "", credential_hash)
+
+def _token_refresh_lock(key: tuple) -> threading.Lock:
+    with _token_cache_lock:
+        lock = _token_refresh_locks.get(key)
+        if lock is None:
+            lock = _token_refresh_locks[key] = threading.Lock()
+        return lock
+
+def decode_jwt_expiry(token: str) -> Optional[float]:
+    """Lee el claim "exp" de un JWT sin verificar la firma. Retorna None si no es un JWT"""
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        claims = json.loads(base64.urlsafe_b64decode(payload))
+        return float(claims["exp"])
+    except (IndexError, ValueError, KeyError, TypeError):
+        return None
+
+def get_cached_token(client_id: str, client_secret: str) -> Optional[str]:
+    """Token cacheado si todavía no entra en el margen de refresco"""
+    with _token_cache_lock:
+        entry = _token_cache.get(_token_cache_key(client_id, client_secret))
+    if entry and time.time() < entry[1] - XRAY_TOKEN_REFRESH_MARGIN:
+        return entry[0]
+    return None
+
+def invalidate_xray_token(client_id: str, client_secret: str) -> bool:
+    """Descarta el token cacheado de un tenant (ej: tras un 401). Retorna True si existía"""
+    with _token_cache_lock:
+        return _token_cache.pop(_token_cache_key(client_id, client_secret), None) is not None
+
 class XRayService:
     def __init__(self):
         self.client_id = os.getenv("CLIENT_ID")
         self.client_secret = os.getenv("CLIENT_SECRET")
         self.auth_url = os.getenv("AUTH_URL")
         self.import_url = os.getenv("XRAY_IMPORT_URL")
+        self.import_mode = XRAY_IMPORT_MODE
+        self.use_scheduler = XRAY_IMPORT_SCHEDULER
+        
+    def get_auth_token(self, force_refresh: bool = False):
+        """Obtener token de autenticación de XRay (cacheado por tenant hasta poco antes de expirar)"""
+        if not force_refresh:
+            token = get_cached_token(self.client_id, self.client_secret)
+            if token:
+                return token
         
-    def get_auth_token(self):
-        """Obtener token de autenticación de XRay"""
+        key = _token_cache_key(self.client_id, self.client_secret)
+        with _token_refresh_lock(key):
+            # Otro hilo pudo refrescar el token mientras esperábamos el lock
+            if not force_refresh:
+                token = get_cached_token(self.client_id, self.client_secret)
+                if token:
+                    return token
+            
+            token = self._request_auth_token()
+            expires_at = decode_jwt_expiry(token) or time.time() + XRAY_TOKEN_DEFAULT_TTL
+            with _token_cache_lock:
+                _token_cache[key] = (token, expires_at)
+            return token
+    
+    def _request_auth_token(self):
+        """Solicita un token nuevo a AUTH_URL"""
         try:
             response = requests.post(
                 self.auth_url,
@@ -53,6 +222,11 @@ class XRayService:
         print(f"📤 Enviando {len(tests_data)} tests a XRay...")
         try:
             response = requests.post(self.import_url, json=tests_data, headers=headers, timeout=30)
+            if response.status_code == 401:
+                # Token cacheado revocado o expirado antes de tiempo: refrescar una vez
+                print(f"🔑 Token de XRay rechazado, refrescando...")
+                headers["Authorization"] = f"Bearer {self.get_auth_token(force_refresh=True)}"
+                response = requests.post(self.import_url, json=tests_data, headers=headers, timeout=30)
             response.raise_for_status()
             
             print(f"✅ Tests enviados exitosamente a XRay")
@@ -70,8 +244,262 @@ class XRayService:
             print(f"❌ Error de conexión al enviar a XRay: {exc}")
             raise Exception(f"Error de conexión al enviar a XRay: {exc}")
 
-    def send_tests_to_xray_by_category(self, classified_tests: dict) -> dict:
-        """Enviar tests clasificados a XRay por categorías de forma SECUENCIAL"""
+    def get_import_status_url(self, job_id: str) -> str:
+        """URL de estado de un job de importación (XRAY_IMPORT_STATUS_URL admite {job_id})"""
+        template = os.getenv("XRAY_IMPORT_STATUS_URL")
+        if template:
+            return template.format(job_id=job_id)
+        return f"{self.import_url.rstrip('/')}/{job_id}/status"
+    
+    def get_import_job_status(self, job_id: str, headers: dict) -> dict:
+        """Consulta el estado de un job de importación de XRay"""
+        response = requests.get(self.get_import_status_url(job_id), headers=headers, timeout=30)
+        if response.status_code == 401:
+            headers["Authorization"] = f"Bearer {self.get_auth_token(force_refresh=True)}"
+            response = requests.get(self.get_import_status_url(job_id), headers=headers, timeout=30)
+        response.raise_for_status()
+        return response.json() if response.text else {}
+    
+    def wait_for_import_job(self, job_id: str, headers: dict, timeout: float = None) -> dict:
+        """
+        Espera a que termine un job de importación consultando su estado con backoff adaptativo.
+        Retorna el último estado recibido con el status en minúsculas; status "timeout" si no terminó
+        a tiempo y "poll_error" tras XRAY_POLL_MAX_ERRORS consultas fallidas seguidas.
+        """
+        timeout = XRAY_JOB_TIMEOUT if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        interval = XRAY_POLL_INITIAL_INTERVAL
+        errors = 0
+        
+        while True:
+            try:
+                job = self.get_import_job_status(job_id, headers)
+                errors = 0
+            except (requests.RequestException, ValueError) as exc:
+                errors += 1
+                print(f"   ⚠️ Error consultando el job {job_id} ({errors}/{XRAY_POLL_MAX_ERRORS}): {exc}")
+                if errors >= XRAY_POLL_MAX_ERRORS:
+                    return {"status": "poll_error", "error": str(exc)}
+                job = {"status": "unknown"}
+            
+            status = (job.get("status") or "unknown").lower()
+            if status in XRAY_JOB_FINAL_STATUSES:
+                return {**job, "status": status}
+            
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return {**job, "status": "timeout"}
+            
+            time.sleep(min(interval, remaining))
+            interval = min(interval * XRAY_POLL_BACKOFF, XRAY_POLL_MAX_INTERVAL)
+    
+    def import_tests(self, tests_data: List[dict], headers: dict, label: str = "Tests") -> dict:
+        """
+        Importa un lote de tests y espera a que su job termine.
+        Con el planificador activo espera su turno en la cola del tenant (client_id) y el resultado
+        incluye la posición inicial en la cola y el tiempo de espera.
+        """
+        if not self.use_scheduler:
+            return self._import_tests_now(tests_data, headers, label)
+        
+        with xray_import_scheduler.slot(self.client_id or "", label) as ticket:
+            result = self._import_tests_now(tests_data, headers, label)
+        result["queue_position"] = ticket.initial_position
+        result["queue_wait_seconds"] = ticket.wait_seconds
+        return result
+    
+    def _import_tests_now(self, tests_data: List[dict], headers: dict, label: str = "Tests") -> dict:
+        """
+        Importa un lote de tests y espera a que su job termine.
+        Si el tenant ya tiene un job en curso reintenta con backoff adaptativo hasta XRAY_JOB_TIMEOUT.
+        """
+        test_count = len(tests_data)
+        deadline = time.monotonic() + XRAY_JOB_TIMEOUT
+        busy_interval = XRAY_POLL_INITIAL_INTERVAL
+        max_attempts = 3
+        attempt = 0
+        error_final = ""
+        
+        while attempt < max_attempts:
+            attempt += 1
+            try:
+                print(f"   🔄 Intento {attempt}/{max_attempts} para {label}...")
+                response = requests.post(self.import_url, json=tests_data, headers=headers, timeout=45)
+                
+                if response.status_code == 401 and attempt < max_attempts:
+                    # Token cacheado revocado o expirado antes de tiempo: refrescar y reintentar
+                    print(f"🔑 {label}: Token de XRay rechazado, refrescando...")
+                    headers["Authorization"] = f"Bearer {self.get_auth_token(force_refresh=True)}"
+                    continue
+                
+                if response.status_code == 200:
+                    response_data = response.json() if response.text else {}
+                    job_id = response_data.get('jobId') if isinstance(response_data, dict) else None
+                    print(f"📄 Job ID ({label}): {job_id or 'N/A'}")
+                    
+                    if not job_id:
+                        return {"success": True, "message": f"{test_count} tests enviados exitosamente",
+                                "count": test_count, "job_id": None, "job_status": None}
+                    
+                    job = self.wait_for_import_job(job_id, headers, max(deadline - time.monotonic(), 0))
+                    job_status = (job.get("status") or "").lower()
+                    result = job.get("result") or {}
+                    errors = result.get("errors") or []
+                    
+                    if job_status in ("successful", "partially_successful"):
+                        print(f"✅ {label}: job {job_id} terminado ({job_status})")
+                        message = f"{test_count} tests enviados exitosamente"
+                        if errors:
+                            message += f" ({len(errors)} con errores)"
+                        job_result = {"success": True, "message": message, "count": test_count,
+                                      "job_id": job_id, "job_status": job_status,
+                                      "issues": [issue.get("key") for issue in result.get("issues") or [] if isinstance(issue, dict)]}
+                        if job_status == "partially_successful":
+                            # Los tests rechazados no cuentan como importados (ver imported_positions)
+                            job_result["failed_elements"] = failed_job_elements(errors)
+                        return job_result
+                    
+                    print(f"❌ {label}: job {job_id} terminó con estado {job_status}")
+                    return {"success": False, "message": f"Job {job_id} terminó con estado {job_status}: {errors}",
+                            "count": test_count, "job_id": job_id, "job_status": job_status}
+                
+                if response.status_code == 400:
+                    error_data = response.json() if response.text else {}
+                    error_msg = error_data.get('error', response.text) if isinstance(error_data, dict) else response.text
+                    
+                    if "job to import tests is already in progress" in error_msg.lower():
+                        # Job de otra importación en curso: no cuenta como intento, esperar con backoff
+                        remaining = deadline - time.monotonic()
+                        if remaining > 0:
+                            wait_time = min(busy_interval, remaining)
+                            print(f"⏳ {label}: Job en progreso en el tenant. Reintentando en {wait_time:.1f}s...")
+                            time.sleep(wait_time)
+                            busy_interval = min(busy_interval * XRAY_POLL_BACKOFF, XRAY_POLL_MAX_INTERVAL)
+                            attempt -= 1
+                            continue
+                        error_final = f"Job en progreso persistente: {error_msg}"
+                        break
+                    
+                    # Otro error 400: no reintentar
+                    print(f"❌ {label}: Error 400 - {error_msg}")
+                    error_final = f"Error 400: {error_msg}"
+                    break
+                
+                # Otros códigos de error HTTP
+                error_text = response.text if hasattr(response, "text") else ""
+                error_final = f"Error HTTP {response.status_code}: {error_text}"
+                if attempt < max_attempts:
+                    print(f"❌ {label}: {error_final}. Reintentando...")
+                    time.sleep(5 + attempt * 3)  # 8s, 11s
+            
+            except requests.RequestException as exc:
+                error_final = f"Error de conexión: {exc}"
+                if attempt < max_attempts:
+                    print(f"❌ {label}: {error_final}. Reintentando...")
+                    time.sleep(5 + attempt * 3)
+            
+            except Exception as exc:
+                error_final = f"Error inesperado: {exc}"
+                break
+        
+        print(f"❌ {label}: Falló después de {attempt} intentos - {error_final}")
+        return {"success": False, "message": error_final, "count": test_count}
+    
+    def send_classified_tests(self, classified_tests: dict, skip_fingerprints: Optional[set] = None) -> dict:
+        """
+        Envía los tests clasificados según XRAY_IMPORT_MODE.
+        Los tests cuya huella está en skip_fingerprints no se reenvían; el resultado incluye
+        imported_fingerprints con las huellas de los tests importados con éxito.
+        """
+        if self.import_mode == "by_category":
+            return self.send_tests_to_xray_by_category(classified_tests, skip_fingerprints)
+        return self.send_tests_to_xray_consolidated(classified_tests, skip_fingerprints)
+    
+    def send_tests_to_xray_consolidated(self, classified_tests: dict, skip_fingerprints: Optional[set] = None) -> dict:
+        """
+        Envía todas las categorías en un solo job de importación.
+        Cada test conserva su xray_test_repository_folder, así que XRay lo ubica en la carpeta de su categoría.
+        El lote solo se divide (por tamaño) si supera XRAY_IMPORT_MAX_BYTES / XRAY_IMPORT_MAX_TESTS.
+        """
+        token = self.get_auth_token()
+        headers = {
+            "Authorization": f"Bearer {token}",
+            "Content-Type": "application/json",
+        }
+        
+        results = {category: {"success": False, "message": "", "count": 0} for category in TEST_CATEGORIES}
+        results["summary"] = {"total_success": 0, "total_failed": 0, "total_tests": 0, "total_skipped": 0}
+        results["mode"] = "consolidated"
+        results["jobs"] = []
+        results["imported_fingerprints"] = []
+        
+        classified_tests, fingerprints, skipped = filter_imported_tests(classified_tests, skip_fingerprints)
+        
+        # Aplanar conservando la categoría y la huella de cada test (solo localmente, no se envía a XRay)
+        all_tests = []
+        test_categories = []
+        test_fingerprints = []
+        for category in TEST_CATEGORIES:
+            all_tests.extend(classified_tests[category])
+            test_categories.extend([category] * len(classified_tests[category]))
+            test_fingerprints.extend(fingerprints[category])
+            results[category]["count"] = len(classified_tests[category])
+            if skipped[category]:
+                results[category]["skipped"] = skipped[category]
+                results["summary"]["total_skipped"] += skipped[category]
+                if not classified_tests[category]:
+                    results[category] = _skipped_result(skipped[category])
+        
+        if results["summary"]["total_skipped"]:
+            print(f"⏭️ {results['summary']['total_skipped']} tests ya importados anteriormente, no se reenvían")
+        
+        if not all_tests:
+            print(f"⚠️ No hay tests nuevos para enviar a XRay")
+            return results
+        
+        chunks = chunk_tests_by_size(all_tests)
+        print(f"📤 Enviando {len(all_tests)} tests a XRay en {len(chunks)} job(s)...")
+        
+        category_failed = {category: False for category in TEST_CATEGORIES}
+        category_messages = {category: [] for category in TEST_CATEGORIES}
+        offset = 0
+        for chunk_index, chunk in enumerate(chunks, start=1):
+            label = f"📦 Lote {chunk_index}/{len(chunks)}"
+            chunk_categories = test_categories[offset:offset + len(chunk)]
+            chunk_fingerprints = test_fingerprints[offset:offset + len(chunk)]
+            offset += len(chunk)
+            
+            started = time.monotonic()
+            job_result = self.import_tests(chunk, headers, label)
+            job_result["elapsed_seconds"] = round(time.monotonic() - started, 2)
+            job_result["categories"] = {category: chunk_categories.count(category) for category in set(chunk_categories)}
+            results["jobs"].append(job_result)
+            
+            imported = imported_positions(job_result, len(chunk))
+            results["summary"]["total_success"] += len(imported)
+            results["summary"]["total_failed"] += len(chunk) - len(imported)
+            results["imported_fingerprints"].extend(chunk_fingerprints[position] for position in imported)
+            imported_set = set(imported)
+            for position, category in enumerate(chunk_categories):
+                if position not in imported_set:
+                    category_failed[category] = True
+            for category in set(chunk_categories):
+                category_messages[category].append(job_result["message"])
+        
+        results["summary"]["total_tests"] = len(all_tests)
+        for category in TEST_CATEGORIES:
+            if results[category]["count"]:
+                results[category]["success"] = not category_failed[category]
+                results[category]["message"] = "; ".join(dict.fromkeys(category_messages[category]))
+        
+        self._print_summary(results)
+        return results
+    
+    def send_tests_to_xray_by_category(self, classified_tests: dict, skip_fingerprints: Optional[set] = None) -> dict:
+        """
+        Enviar tests clasificados a XRay por categorías de forma SECUENCIAL.
+        Cada categoría se envía en cuanto termina el job de la anterior.
+        """
         token = self.get_auth_token()
         headers = {
             "Authorization": f"Bearer {token}",
@@ -82,117 +510,50 @@ class XRayService:
             "criticos": {"success": False, "message": "", "count": 0},
             "importantes": {"success": False, "message": "", "count": 0},
             "opcionales": {"success": False, "message": "", "count": 0},
-            "summary": {"total_success": 0, "total_failed": 0, "total_tests": 0}
+            "summary": {"total_success": 0, "total_failed": 0, "total_tests": 0, "total_skipped": 0}
         }
         
-        categories = ['criticos', 'importantes', 'opcionales']
-        category_labels = {'criticos': '🔴 Críticos', 'importantes': '🟡 Importantes', 'opcionales': '🟢 Opcionales'}
+        results["mode"] = "by_category"
+        results["imported_fingerprints"] = []
         
-        for category_index, category in enumerate(categories):
-            if category not in classified_tests or not classified_tests[category]:
-                print(f"⚠️ Categoría {category} vacía, omitiendo...")
+        classified_tests, fingerprints, skipped = filter_imported_tests(classified_tests, skip_fingerprints)
+        
+        for category in TEST_CATEGORIES:
+            results["summary"]["total_skipped"] += skipped[category]
+            if not classified_tests[category]:
+                if skipped[category]:
+                    print(f"⏭️ Categoría {category}: {skipped[category]} tests ya importados, omitiendo...")
+                    results[category] = _skipped_result(skipped[category])
+                else:
+                    print(f"⚠️ Categoría {category} vacía, omitiendo...")
                 continue
                 
             tests_data = classified_tests[category]
             test_count = len(tests_data)
-            category_label = category_labels[category]
+            category_label = CATEGORY_LABELS[category]
             
             print(f"📤 Enviando {test_count} tests de categoría {category_label} a XRay...")
+            started = time.monotonic()
+            results[category] = self.import_tests(tests_data, headers, category_label)
+            results[category]["elapsed_seconds"] = round(time.monotonic() - started, 2)
+            if skipped[category]:
+                results[category]["skipped"] = skipped[category]
             
-            # ✅ ESPERAR ENTRE ENVÍOS para evitar jobs concurrentes
-            if category_index > 0:  # No esperar en el primer envío
-                wait_time = 10 + (category_index * 5)  # 10s, 15s progresivo
-                print(f"   ⏳ Esperando {wait_time}s para evitar jobs concurrentes...")
-                import time
-                time.sleep(wait_time)
-            
-            # ✅ REINTENTOS ESPECÍFICOS PARA XRAY
-            max_attempts = 3
-            success = False
-            
-            for attempt in range(1, max_attempts + 1):
-                try:
-                    print(f"   🔄 Intento {attempt}/{max_attempts} para {category_label}...")
-                    
-                    response = requests.post(self.import_url, json=tests_data, headers=headers, timeout=45)
-                    
-                    if response.status_code == 200:
-                        print(f"✅ {category_label}: {test_count} tests enviados exitosamente")
-                        if response.text:
-                            response_data = response.json() if response.text else {}
-                            job_id = response_data.get('jobId', 'N/A')
-                            print(f"📄 Job ID ({category}): {job_id}")
-                        
-                        results[category] = {
-                            "success": True,
-                            "message": f"{test_count} tests enviados exitosamente",
-                            "count": test_count
-                        }
-                        results["summary"]["total_success"] += test_count
-                        success = True
-                        break
-                        
-                    elif response.status_code == 400:
-                        error_data = response.json() if response.text else {}
-                        error_msg = error_data.get('error', response.text)
-                        
-                        if "job to import tests is already in progress" in error_msg.lower():
-                            # Job en progreso - esperar más tiempo
-                            if attempt < max_attempts:
-                                wait_time = 15 + (attempt * 10)  # 25s, 35s, 45s
-                                print(f"❌ {category_label}: Job en progreso. Esperando {wait_time}s más...")
-                                import time
-                                time.sleep(wait_time)
-                                continue
-                            else:
-                                print(f"❌ {category_label}: Job persistente después de {max_attempts} intentos")
-                                error_final = f"Job en progreso persistente: {error_msg}"
-                        else:
-                            # Otro error 400
-                            print(f"❌ {category_label}: Error 400 - {error_msg}")
-                            error_final = f"Error 400: {error_msg}"
-                            break  # No reintentar otros errores 400
-                    
-                    else:
-                        # Otros códigos de error HTTP
-                        error_text = response.text if hasattr(response, "text") else ""
-                        error_msg = f"Error HTTP {response.status_code}: {error_text}"
-                        
-                        if attempt < max_attempts:
-                            print(f"❌ {category_label}: {error_msg}. Reintentando...")
-                            import time
-                            time.sleep(5 + attempt * 3)  # 8s, 11s, 14s
-                            continue
-                        else:
-                            error_final = error_msg
-                
-                except requests.RequestException as exc:
-                    error_msg = f"Error de conexión: {exc}"
-                    
-                    if attempt < max_attempts:
-                        print(f"❌ {category_label}: {error_msg}. Reintentando...")
-                        import time
-                        time.sleep(5 + attempt * 3)
-                        continue
-                    else:
-                        error_final = error_msg
-                
-                except Exception as exc:
-                    error_final = f"Error inesperado: {exc}"
-                    break
-            
-            # Si no tuvo éxito después de todos los intentos
-            if not success:
-                print(f"❌ {category_label}: Falló después de {max_attempts} intentos - {error_final}")
-                results[category] = {
-                    "success": False,
-                    "message": error_final,
-                    "count": test_count
-                }
-                results["summary"]["total_failed"] += test_count
+            imported = imported_positions(results[category], test_count)
+            results["summary"]["total_success"] += len(imported)
+            results["summary"]["total_failed"] += test_count - len(imported)
+            results["imported_fingerprints"].extend(fingerprints[category][position] for position in imported)
+            if len(imported) < test_count:
+                results[category]["success"] = False
+            else:
+                print(f"✅ {category_label}: {test_count} tests enviados exitosamente")
             
             results["summary"]["total_tests"] += test_count
         
+        self._print_summary(results)
+        return results
+    
+    def _print_summary(self, results: dict):
         # Resumen final
         total_success = results["summary"]["total_success"]
         total_failed = results["summary"]["total_failed"]
@@ -201,16 +562,18 @@ class XRayService:
         print(f"\n📊 RESUMEN FINAL DE ENVÍO A XRAY:")
         print(f"   ✅ Exitosos: {total_success}/{total_tests}")
         print(f"   ❌ Fallidos: {total_failed}/{total_tests}")
+        if results["summary"].get("total_skipped"):
+            print(f"   ⏭️ Omitidos (ya importados): {results['summary']['total_skipped']}")
         print(f"   🔴 Críticos: {results['criticos']['count']} ({'✅' if results['criticos']['success'] else '❌'})")
         print(f"   🟡 Importantes: {results['importantes']['count']} ({'✅' if results['importantes']['success'] else '❌'})")
         print(f"   🟢 Opcionales: {results['opcionales']['count']} ({'✅' if results['opcionales']['success'] else '❌'})")
         
         # ✅ INFORMACIÓN ADICIONAL DE ÉXITO
-        if total_success == total_tests:
+        if total_tests == 0:
+            print(f"✅ No había tests nuevos que enviar a XRay")
+        elif total_success == total_tests:
             print(f"🎉 ¡PERFECTO! Todos los tests fueron enviados exitosamente a XRay")
         elif total_success > 0:
             print(f"⚠️ Envío parcial: {total_success}/{total_tests} tests enviados")
         else:
             print(f"❌ No se pudo enviar ningún test a XRay")
-        
-        return results
\ No newline at end of file
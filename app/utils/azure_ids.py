@@ -0,0 +1,17 @@
+"""
+Identificadores de work items de Azure DevOps: las HUs llegan como "129", "HU-129" o "hu-129";
+azure_number guarda el número para buscarlas con un solo índice.
+"""
+from typing import Optional
+
+MAX_AZURE_NUMBER = 2**31 - 1  # Columna INTEGER
+
+def parse_azure_number(azure_id) -> Optional[int]:
+    """Número del work item ('HU-129' -> 129), o None si el identificador no es numérico"""
+    value = str(azure_id if azure_id is not None else "").strip()
+    if value.upper().startswith("HU-"):
+        value = value[3:].strip()
+    if not (value.isascii() and value.isdigit()):
+        return None
+    number = int(value)
+    return number if number <= MAX_AZURE_NUMBER else None
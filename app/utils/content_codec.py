@@ -0,0 +1,47 @@
+"""
+Codificación de los textos de refinamiento guardados en refinement_contents: hash del contenido
+(sha256 del texto en UTF-8) y compresión zlib. El códec se guarda con cada fila para poder cambiarlo
+sin reescribir las existentes.
+
+Las revisiones de HU (hu_revisions) usan además deltas: el texto se comprime con zlib usando como
+diccionario el texto base (la revisión anterior), así que solo ocupan lo que cambió.
+"""
+import hashlib
+import zlib
+from typing import Tuple
+
+DEFAULT_CODEC = "zlib"
+ZLIB_LEVEL = 9  # Los textos se escriben una vez y se leen muchas: se prioriza el tamaño
+ZDICT_MAX_BYTES = 32768  # Ventana de zlib: solo el final del texto base sirve como diccionario
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def encode_content(text: str, codec: str = DEFAULT_CODEC) -> Tuple[str, bytes]:
+    raw = text.encode("utf-8")
+    if codec == "zlib":
+        return codec, zlib.compress(raw, ZLIB_LEVEL)
+    if codec == "plain":
+        return codec, raw
+    raise ValueError(f"Códec de contenido desconocido: {codec}")
+
+def decode_content(codec: str, body: bytes) -> str:
+    if body is None:
+        return None
+    if codec == "zlib":
+        return zlib.decompress(body).decode("utf-8")
+    if codec == "plain":
+        return bytes(body).decode("utf-8")
+    raise ValueError(f"Códec de contenido desconocido: {codec}")
+
+def _zdict(base: str) -> bytes:
+    return base.encode("utf-8")[-ZDICT_MAX_BYTES:]
+
+def encode_delta(text: str, base: str) -> bytes:
+    """Texto comprimido con zlib usando el texto base como diccionario"""
+    compressor = zlib.compressobj(ZLIB_LEVEL, zdict=_zdict(base))
+    return compressor.compress(text.encode("utf-8")) + compressor.flush()
+
+def decode_delta(body: bytes, base: str) -> str:
+    decompressor = zlib.decompressobj(zdict=_zdict(base))
+    return (decompressor.decompress(bytes(body)) + decompressor.flush()).decode("utf-8")
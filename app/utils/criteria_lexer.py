@@ -0,0 +1,291 @@
+"""
+Lexer de una sola pasada para el contenido refinado (descripción + criterios de aceptación).
+
+Cada línea se normaliza y se pasa a minúsculas UNA sola vez y se clasifica con
+expresiones regulares de alternancia precompiladas. Los renderizadores de
+descripción y de criterios de AzureService comparten el resultado en lugar de
+volver a recorrer las listas de palabras clave en cada pasada.
+"""
+import re
+from bisect import bisect_right
+from typing import Iterable, List, Tuple
+
+def _alternation(keywords: Iterable[str]) -> "re.Pattern":
+    """
+    Compila las palabras clave (en minúsculas) como una alternancia factorizada
+    por prefijos (trie), de modo que el motor no reintenta cada palabra completa.
+    """
+    trie = {}
+    for keyword in {keyword.lower() for keyword in keywords}:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node: dict) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        pattern = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if '' in node:
+            # La palabra puede terminar aquí: el resto es opcional
+            return pattern + '?' if len(branches) > 1 else '(?:' + pattern + ')?'
+        return pattern
+
+    return re.compile(build(trie))
+
+# Palabras clave que abren una sección en el renderizado básico
+SECTION_KEYWORDS = [
+    'intención macro', 'flujo funcional', 'interacción',
+    'validación', 'casos de borde', 'casos límite'
+]
+
+# Palabras clave que abren una sección en el renderizado completo (bilingüe)
+SECTION_KEYWORDS_COMPLETE = [
+    'intención macro', 'flujo funcional', 'interacción',
+    'validación', 'casos de borde', 'casos límite', 'componentes ui',
+    'datos y reglas', 'manejo de errores',
+    'business value scenario', 'complete functional flow', 'ui interaction',
+    'data validation', 'edge cases', 'error handling', 'components ui',
+    'data and rules', 'technical considerations'
+]
+
+# Marcadores de inicio de la sección de criterios (bilingüe)
+CRITERIA_MARKERS = [
+    'CRITERIOS DE ACEPTACIÓN DETALLADOS', 'CRITERIOS DE ACEPTACIÓN',
+    '## CRITERIOS DE ACEPTACIÓN', '### CRITERIOS DE ACEPTACIÓN',
+    '1. Intención Macro', '2. Flujo Funcional', '### 1. Intención Macro',
+    '### 2. Flujo Funcional', '### 3. Interacción', '### 4. Validación', '### 5. Casos',
+    'ACCEPTANCE CRITERIA (use Gherkin syntax)', 'ACCEPTANCE CRITERIA',
+    '## ACCEPTANCE CRITERIA', '### ACCEPTANCE CRITERIA',
+    '1. Business Value Scenario', '2. Complete Functional Flow',
+    '### 1. Business Value Scenario', '### 2. Complete Functional Flow',
+    '### 3. UI Interaction', '### 4. Data Validation', '### 5. Edge Cases'
+]
+
+# Inicio de criterios por contenido cuando no hay marcadores explícitos
+CRITERIA_FALLBACK_KEYWORDS = [
+    'intención macro', 'flujo funcional',
+    'acceptance criteria', 'business value scenario', 'complete functional flow'
+]
+
+# Secciones que cierran los criterios de aceptación
+CRITERIA_END_MARKERS = [
+    'CONSIDERACIONES TÉCNICAS', 'CRITERIOS DE DONE',
+    'TECHNICAL CONSIDERATIONS', 'DONE CRITERIA'
+]
+
+# Subsecciones que NO cierran los criterios aunque sean encabezados
+CRITERIA_SUBSECTION_KEYWORDS = [
+    'intención macro', 'flujo funcional', 'interacción', 'validación', 'casos',
+    'business value scenario', 'complete functional flow', 'ui interaction',
+    'data validation', 'edge cases'
+]
+
+# Indicadores del punto de división entre descripción y criterios
+SPLIT_STRONG_INDICATORS = [
+    'criterios de aceptación', 'criterios detallados', 'escenario:', 'dado que',
+    'cuando el', 'entonces el', '1. intención macro', '### 1.', 'flujo funcional'
+]
+SPLIT_WEAK_INDICATORS = ['validación', 'verificación', 'error', 'casos', 'prueba']
+
+_SECTION_RE = _alternation(SECTION_KEYWORDS)
+_SECTION_COMPLETE_RE = _alternation(SECTION_KEYWORDS_COMPLETE)
+_CRITERIA_MARKER_RE = _alternation(CRITERIA_MARKERS)
+_CRITERIA_FALLBACK_RE = _alternation(CRITERIA_FALLBACK_KEYWORDS)
+_CRITERIA_END_RE = _alternation(CRITERIA_END_MARKERS)
+_CRITERIA_SUBSECTION_RE = _alternation(CRITERIA_SUBSECTION_KEYWORDS)
+_SPLIT_STRONG_RE = _alternation(SPLIT_STRONG_INDICATORS)
+_SPLIT_WEAK_RE = _alternation(SPLIT_WEAK_INDICATORS)
+_SCENARIO_RE = re.compile('scenario')  # también cubre "escenario"
+_SCENARIO_VARIANT_RE = re.compile('principal|alternativo|edge')
+_CRITERIOS_RE = re.compile('criterios')
+_ACEPTACION_RE = re.compile('aceptación')
+_NUMBERED_TITLE_RE = re.compile(r'^\d+\.\s+[A-Z]')
+_TITLE_PREFIX_RE = re.compile(r'^(?:#+\s*)?(?:\d+\.\s*)?')
+
+class CriteriaLine:
+    """Línea ya clasificada por el lexer (texto sin espacios laterales + banderas)"""
+    __slots__ = (
+        'text', 'is_section_title', 'has_section_keyword', 'has_section_keyword_complete',
+        'is_scenario_start', 'is_scenario_variant', 'body'
+    )
+
+    def __init__(self, text: str, has_section_keyword: bool, has_section_keyword_complete: bool,
+                 has_scenario: bool, is_scenario_variant: bool):
+        self.text = text
+        first = text[:1]
+        if first == '#' or first.isdigit():
+            self.is_section_title = text.startswith('##') or _NUMBERED_TITLE_RE.match(text) is not None
+            self.body = _TITLE_PREFIX_RE.sub('', text, count=1)
+        else:
+            self.is_section_title = False
+            self.body = text
+        self.has_section_keyword = has_section_keyword
+        self.has_section_keyword_complete = has_section_keyword_complete
+        self.is_scenario_start = has_scenario and not self.is_section_title and ':' in text
+        self.is_scenario_variant = is_scenario_variant
+
+    def __bool__(self) -> bool:
+        return bool(self.text)
+
+    def __str__(self) -> str:
+        return self.text
+
+    def __repr__(self) -> str:
+        return f"CriteriaLine({self.text!r})"
+
+class LexedLines(list):
+    """
+    Lista de CriteriaLine que conserva el texto completo en minúsculas para
+    localizar marcadores con una sola búsqueda sobre todo el contenido.
+    """
+
+    def __init__(self, lines: List[CriteriaLine], lowered: str, line_starts: List[int]):
+        super().__init__(lines)
+        self.lowered = lowered
+        self.line_starts = line_starts
+
+    def lowered_line(self, index: int) -> str:
+        end = self.line_starts[index + 1] - 1 if index + 1 < len(self.line_starts) else len(self.lowered)
+        return self.lowered[self.line_starts[index]:end]
+
+    def line_at(self, offset: int) -> int:
+        return bisect_right(self.line_starts, offset) - 1
+
+    def hit_lines(self, pattern: "re.Pattern", start_line: int = 0) -> List[int]:
+        """Índices (ordenados, sin repetir) de las líneas con alguna coincidencia del patrón"""
+        hits = []
+        offset = self.line_starts[start_line] if start_line < len(self.line_starts) else len(self.lowered)
+        for match in pattern.finditer(self.lowered, offset):
+            index = self.line_at(match.start())
+            if not hits or hits[-1] != index:
+                hits.append(index)
+        return hits
+
+    def first_hit(self, pattern: "re.Pattern") -> int:
+        match = pattern.search(self.lowered)
+        return self.line_at(match.start()) if match else -1
+
+def lex_lines(lines: Iterable) -> LexedLines:
+    """
+    Clasifica todas las líneas en una sola pasada: se pasan a minúsculas juntas y
+    cada conjunto de palabras clave se busca una vez sobre el texto completo.
+    Si las líneas ya están clasificadas se reutilizan tal cual.
+    """
+    if isinstance(lines, LexedLines):
+        return lines
+    lines = list(lines)
+    classified = bool(lines) and all(isinstance(line, CriteriaLine) for line in lines)
+    texts = [line.text for line in lines] if classified else [str(line).strip() for line in lines]
+
+    # Minúsculas por línea para que los offsets coincidan aunque lower() cambie longitudes
+    lowered_texts = [text.lower() for text in texts]
+    line_starts = []
+    offset = 0
+    for text in lowered_texts:
+        line_starts.append(offset)
+        offset += len(text) + 1
+    lowered = '\n'.join(lowered_texts)
+
+    if classified:
+        return LexedLines(lines, lowered, line_starts)
+
+    index = LexedLines([], lowered, line_starts)
+
+    # Una búsqueda sobre el texto completo por cada conjunto; los subconjuntos
+    # (palabras clave básicas, variantes de escenario) solo se evalúan en las líneas candidatas
+    complete_hits = set(index.hit_lines(_SECTION_COMPLETE_RE))
+    basic_hits = {i for i in complete_hits if _SECTION_RE.search(lowered_texts[i])}
+    scenario_hits = set(index.hit_lines(_SCENARIO_RE))
+    variant_hits = {
+        i for i in scenario_hits
+        if 'escenario' in lowered_texts[i] and _SCENARIO_VARIANT_RE.search(lowered_texts[i])
+    }
+
+    index.extend(
+        CriteriaLine(
+            text,
+            i in basic_hits,
+            i in complete_hits,
+            i in scenario_hits,
+            i in variant_hits
+        )
+        for i, text in enumerate(texts)
+    )
+    return index
+
+def group_sections(lines: Iterable, complete: bool = False) -> List[List[CriteriaLine]]:
+    """
+    Agrupa las líneas (no vacías) en secciones. Con complete=True usa el
+    conjunto bilingüe completo de palabras clave de sección.
+    """
+    sections = []
+    current_section = []
+
+    for line in lex_lines(lines):
+        if not line.text:
+            continue
+
+        is_new_section = line.is_section_title or (
+            line.has_section_keyword_complete if complete else line.has_section_keyword
+        )
+
+        if is_new_section and current_section:
+            sections.append(current_section)
+            current_section = []
+
+        current_section.append(line)
+
+    if current_section:
+        sections.append(current_section)
+
+    return sections
+
+def find_criteria_bounds(lines: LexedLines) -> Tuple[int, int]:
+    """
+    Localiza la sección de criterios de aceptación. Retorna (inicio, fin) con fin
+    exclusivo, o (-1, -1) si no se encontró ningún marcador.
+    """
+    start_index = lines.first_hit(_CRITERIA_MARKER_RE)
+
+    if start_index == -1:
+        # Sin marcadores explícitos: buscar por contenido
+        candidates = set(lines.hit_lines(_CRITERIA_FALLBACK_RE))
+        criterios = set(lines.hit_lines(_CRITERIOS_RE))
+        if criterios:
+            candidates |= criterios & set(lines.hit_lines(_ACEPTACION_RE))
+        if not candidates:
+            return -1, -1
+        start_index = min(candidates)
+
+    # Fin: encabezado principal o marcador de cierre que no sea una subsección de criterios
+    end_markers = set(lines.hit_lines(_CRITERIA_END_RE, start_index + 1))
+    for i in range(start_index + 1, len(lines)):
+        text = lines[i].text
+        if ((text.startswith('## ') or text.startswith('### ') or i in end_markers)
+                and not _CRITERIA_SUBSECTION_RE.search(lines.lowered_line(i))):
+            return start_index, i
+
+    return start_index, len(lines)
+
+def find_split_point(lines: LexedLines) -> Tuple[int, str, str]:
+    """
+    Punto de división entre descripción y criterios.
+    Retorna (índice, tipo de indicador, indicador) o (-1, "", "") si no hay indicadores.
+    """
+    strong_index = lines.first_hit(_SPLIT_STRONG_RE)
+
+    weak_index = -1
+    weak_from = len(lines) // 3 + 1
+    for i in lines.hit_lines(_SPLIT_WEAK_RE, weak_from):
+        if len(lines[i].text) > 10:
+            weak_index = i
+            break
+
+    if strong_index != -1 and (weak_index == -1 or strong_index <= weak_index):
+        return strong_index, "fuerte", _SPLIT_STRONG_RE.search(lines.lowered_line(strong_index)).group(0)
+    if weak_index != -1:
+        return weak_index, "débil", _SPLIT_WEAK_RE.search(lines.lowered_line(weak_index)).group(0)
+
+    return -1, "", ""
@@ -56,13 +56,32 @@ FEATURE_MAPPING = {
     }
 }
 
+# Índice inverso número de HU -> feature, construido una sola vez
+HU_FEATURE_INDEX = {
+    hu_number: {
+        'feature': feature_info['name'],
+        'module': feature_info['module'],
+        'feature_id': feature_id
+    }
+    for feature_id, feature_info in FEATURE_MAPPING.items()
+    for hu_number in feature_info['hus']
+}
+
 def get_feature_info(azure_id_num: int) -> dict:
     """Busca la información de feature y módulo basado en el azure_id"""
-    for feature_id, feature_info in FEATURE_MAPPING.items():
-        if azure_id_num in feature_info['hus']:
-            return {
-                'feature': feature_info['name'],
-                'module': feature_info['module'],
-                'feature_id': feature_id
-            }
-    return {'feature': None, 'module': None, 'feature_id': None}
\ No newline at end of file
+    info = HU_FEATURE_INDEX.get(azure_id_num)
+    if info:
+        return dict(info)
+    return {'feature': None, 'module': None, 'feature_id': None}
+
+def default_catalog_features() -> list:
+    """Mapeo estático en el formato del catálogo de features por proyecto"""
+    return [
+        {
+            'feature_id': feature_id,
+            'name': feature_info['name'],
+            'module': feature_info['module'],
+            'hus': list(feature_info['hus'])
+        }
+        for feature_id, feature_info in FEATURE_MAPPING.items()
+    ]
@@ -0,0 +1,36 @@
+"""
+Aporte de una HU a las estadísticas de su proyecto (tabla project_hu_stats): contadores por
+(dimensión, clave). Lo usan tanto la actualización incremental al hacer flush como la reconciliación,
+para que ambas cuenten exactamente igual.
+"""
+from collections import Counter
+from typing import Optional
+
+TEST_CATEGORIES = ("criticos", "importantes", "opcionales")
+
+def hu_stats_entries(status: Optional[str], feature: Optional[str], module: Optional[str],
+                     tests_generated: Optional[dict]) -> Counter:
+    """Contadores {(dimensión, clave): n} que aporta una HU"""
+    entries = Counter()
+    entries[("hus", "total")] += 1
+    entries[("status", status or "pending")] += 1
+    entries[("feature", feature or "")] += 1
+    entries[("module", module or "")] += 1
+
+    classified = tests_generated.get("classified_tests") if isinstance(tests_generated, dict) else None
+    if not classified:
+        return entries
+    entries[("tests", "hus_with_tests")] += 1
+    for category, tests in classified.items():
+        count = len(tests or [])
+        entries[("tests", "generated")] += count
+        entries[("criticality", category)] += count
+
+    last_import = tests_generated.get("last_import")
+    if isinstance(last_import, dict):
+        # Los omitidos ya estaban importados de un envío anterior
+        entries[("tests", "imported")] += last_import.get("tests_sent", 0) + last_import.get("tests_skipped", 0)
+        entries[("tests", "import_failed")] += last_import.get("tests_failed", 0)
+        if last_import.get("success"):
+            entries[("tests", "hus_imported")] += 1
+    return entries
@@ -0,0 +1,120 @@
+"""
+Detección rápida de idioma (español / inglés) por frecuencia de stop-words.
+
+Se usa en DeepSeekService y AzureService para decidir si una traducción con IA
+(_translate_to_english, hasta 8k tokens) es realmente necesaria.
+"""
+import re
+from collections import namedtuple
+from typing import Iterable, Optional
+
+LanguageGuess = namedtuple("LanguageGuess", ["language", "confidence", "spanish_hits", "english_hits"])
+
+# Palabras funcionales exclusivas de cada idioma (se excluyen las ambiguas: a, no, me, he, son...)
+SPANISH_STOP_WORDS = frozenset([
+    'de', 'la', 'que', 'el', 'en', 'y', 'los', 'se', 'del', 'las', 'un', 'por', 'con',
+    'una', 'su', 'para', 'es', 'al', 'lo', 'como', 'más', 'pero', 'sus', 'le', 'ya', 'o',
+    'este', 'sí', 'porque', 'esta', 'entre', 'cuando', 'muy', 'sin', 'sobre', 'también',
+    'hasta', 'hay', 'donde', 'quien', 'desde', 'todo', 'nos', 'durante', 'todos', 'uno',
+    'les', 'ni', 'contra', 'otros', 'ese', 'eso', 'ante', 'ellos', 'e', 'esto', 'mí',
+    'antes', 'algunos', 'qué', 'unos', 'yo', 'otro', 'otras', 'otra', 'él', 'tanto',
+    'esa', 'estos', 'mucho', 'quienes', 'nada', 'muchos', 'cual', 'poco', 'ella', 'estar',
+    'estas', 'algunas', 'algo', 'nosotros', 'debe', 'deben', 'puede', 'pueden', 'está',
+    'están', 'será', 'dado', 'entonces', 'usuario', 'sistema'
+])
+
+ENGLISH_STOP_WORDS = frozenset([
+    'the', 'and', 'to', 'of', 'is', 'in', 'that', 'it', 'for', 'on', 'with', 'as', 'be',
+    'by', 'this', 'are', 'from', 'at', 'an', 'or', 'has', 'have', 'will', 'should', 'must',
+    'can', 'not', 'if', 'into', 'their', 'its', 'which', 'all', 'was', 'were', 'been',
+    'only', 'than', 'there', 'they', 'these', 'those', 'each', 'when', 'then', 'given',
+    'user', 'system', 'page', 'after', 'before', 'without', 'between', 'does', 'do',
+    'any', 'your', 'you', 'our', 'we', 'but', 'so', 'such', 'also', 'would', 'could'
+])
+
+# Palabras clave Gherkin: en escenarios mezclados no indican el idioma del contenido
+GHERKIN_KEYWORDS = frozenset([
+    'escenario', 'dado', 'cuando', 'entonces', 'y', 'scenario', 'given', 'when', 'then', 'and',
+    'principal', 'alternativo', 'edge', 'modoverificación', 'verificationmode'
+])
+
+# Caracteres que solo aparecen en español
+_SPANISH_CHARS_RE = re.compile('[ñ¿¡áéíóú]')
+_WORD_RE = re.compile(r"[a-záéíóúüñ]+")
+
+DEFAULT_SAMPLE_SIZE = 2000
+# Número de coincidencias a partir del cual la evidencia se considera completa (en textos cortos se
+# exige una coincidencia cada WORDS_PER_EVIDENCE palabras: un título no puede llegar a 12)
+MIN_EVIDENCE = 12
+WORDS_PER_EVIDENCE = 4
+# Confianza mínima para disparar (u omitir) una traducción
+TRANSLATION_CONFIDENCE_THRESHOLD = 0.5
+
+def _sample(text: str, sample_size: int) -> str:
+    """Toma inicio, mitad y final del texto para no analizar documentos completos"""
+    if len(text) <= sample_size:
+        return text
+    window = sample_size // 3
+    middle = len(text) // 2
+    return ' '.join((text[:window], text[middle - window // 2:middle + window // 2], text[-window:]))
+
+def detect_language(text: str, sample_size: int = DEFAULT_SAMPLE_SIZE,
+                    ignore: Optional[Iterable[str]] = None) -> LanguageGuess:
+    """
+    Detecta si el texto está en español ('es') o inglés ('en').
+    Retorna LanguageGuess(language, confidence, spanish_hits, english_hits);
+    language es None cuando no hay evidencia. confidence va de 0 a 1.
+    """
+    if not text:
+        return LanguageGuess(None, 0.0, 0, 0)
+
+    sample = _sample(text, sample_size).lower()
+    ignored = frozenset(ignore) if ignore else frozenset()
+
+    words = _WORD_RE.findall(sample)
+    spanish_hits = 0
+    english_hits = 0
+    for word in words:
+        if word in ignored:
+            continue
+        if word in SPANISH_STOP_WORDS:
+            spanish_hits += 1
+        elif word in ENGLISH_STOP_WORDS:
+            english_hits += 1
+
+    # Las tildes y la ñ cuentan como evidencia adicional de español
+    spanish_hits += min(len(_SPANISH_CHARS_RE.findall(sample)), MIN_EVIDENCE) // 3
+
+    total = spanish_hits + english_hits
+    if total == 0 or spanish_hits == english_hits:
+        return LanguageGuess(None, 0.0, spanish_hits, english_hits)
+
+    language = 'es' if spanish_hits > english_hits else 'en'
+    margin = abs(spanish_hits - english_hits) / total
+    needed = max(1, min(MIN_EVIDENCE, len(words) // WORDS_PER_EVIDENCE))
+    evidence = min(1.0, total / needed)
+    return LanguageGuess(language, round(margin * evidence, 3), spanish_hits, english_hits)
+
+def needs_translation_to_english(text: str) -> bool:
+    """
+    True solo si el texto está en español con confianza suficiente. Sin evidencia para decidir
+    (nombres propios, términos técnicos) se deja como está en vez de pagar una traducción
+    """
+    if not text or not text.strip():
+        return False
+    return is_confidently_spanish(text)
+
+def detect_refinement_language(text: str, default: str = 'es') -> str:
+    """
+    Idioma de refinamiento ('es' / 'en') de una HU que se importa sin que el usuario lo elija: el detectado
+    si la confianza alcanza TRANSLATION_CONFIDENCE_THRESHOLD, si no el mismo valor por defecto que al crearla
+    """
+    guess = detect_language(text)
+    if guess.language and guess.confidence >= TRANSLATION_CONFIDENCE_THRESHOLD:
+        return guess.language
+    return default
+
+def is_confidently_spanish(text: str) -> bool:
+    """True si el texto está en español con confianza suficiente para traducirlo"""
+    guess = detect_language(text)
+    return guess.language == 'es' and guess.confidence >= TRANSLATION_CONFIDENCE_THRESHOLD
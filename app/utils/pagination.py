@@ -0,0 +1,97 @@
+"""
+Paginación por cursor (keyset) sobre (created_at, id), del más reciente al más antiguo.
+
+El cursor es opaco para el cliente: codifica la última fila de la página (y su relevancia en las
+búsquedas) para que la página siguiente empiece justo después, sin OFFSET ni contar filas.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+from sqlalchemy import String, and_, or_, type_coerce
+from sqlalchemy.orm import Query
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+class InvalidCursorError(ValueError):
+    pass
+
+def normalize_limit(limit: Optional[int]) -> int:
+    if limit is None:
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(int(limit), MAX_PAGE_SIZE))
+
+def _encode_created_at(value: Any) -> list:
+    # SQLite guarda created_at como texto (con o sin microsegundos según quién insertó la fila):
+    # se conserva el valor crudo para comparar exactamente igual que ordena la base de datos
+    if isinstance(value, datetime):
+        return ["d", value.isoformat()]
+    return ["s", value]
+
+def encode_cursor(created_at: Any, row_id: str, rank: Optional[float] = None) -> str:
+    payload = {"c": _encode_created_at(created_at), "i": row_id}
+    if rank is not None:
+        payload["r"] = rank
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> dict:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        kind, value = payload["c"]
+        if kind == "d":
+            payload["c"] = ("d", datetime.fromisoformat(value))
+        elif kind == "s" and value is not None:
+            payload["c"] = ("s", str(value))
+        else:
+            raise ValueError(kind)
+        payload["i"] = str(payload["i"])
+        return payload
+    except Exception:
+        raise InvalidCursorError("Cursor de paginación inválido")
+
+def paginate(query: Query, model, limit: Optional[int] = None, cursor: Optional[str] = None,
+             rank=None) -> Tuple[List[Any], Optional[str]]:
+    """
+    Retorna (filas de la página, next_cursor). next_cursor es None en la última página.
+    `rank` es una expresión de relevancia (menor = más relevante) para las búsquedas: ordena primero
+    por ella y el cursor la incluye.
+    """
+    limit = normalize_limit(limit)
+    raw_created_at = type_coerce(model.created_at, String).label("cursor_created_at")
+    query = query.add_columns(raw_created_at)
+    if rank is not None:
+        query = query.add_columns(rank.label("cursor_rank"))
+
+    if cursor:
+        position = decode_cursor(cursor)
+        kind, created_at = position["c"]
+        created_column = model.created_at if kind == "d" else type_coerce(model.created_at, String)
+        after = or_(
+            created_column < created_at,
+            and_(created_column == created_at, model.id < position["i"])
+        )
+        if rank is not None:
+            if "r" not in position:
+                raise InvalidCursorError("El cursor no corresponde a esta búsqueda")
+            after = or_(rank > position["r"], and_(rank == position["r"], after))
+        query = query.filter(after)
+
+    order = [model.created_at.desc(), model.id.desc()]
+    if rank is not None:
+        order.insert(0, rank.asc())
+    rows = query.order_by(None).order_by(*order).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.cursor_created_at, last[0].id,
+                                    last.cursor_rank if rank is not None else None)
+    return [row[0] for row in rows], next_cursor
+
+def count_total(query: Query) -> int:
+    """Total de filas de la query sin paginar (consulta aparte, solo cuando el cliente lo pide)"""
+    return query.order_by(None).count()
@@ -0,0 +1,29 @@
+"""
+Huella (fingerprint) de un test de XRay: resumen, pasos y carpeta normalizados.
+Dos tests con la misma huella son el mismo test aunque cambien mayúsculas, espacios o puntuación final.
+"""
+import re
+import json
+import hashlib
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+def _normalize(value) -> str:
+    text = _WHITESPACE_RE.sub(" ", str(value or "")).strip().lower()
+    return text.rstrip(".;:")
+
+def _normalize_folder(folder) -> str:
+    return "/".join(part.strip().lower() for part in str(folder or "").split("/") if part.strip())
+
+def fingerprint_test(test: dict) -> str:
+    """sha256 del resumen, los pasos (acción, datos, resultado) y la carpeta de XRay normalizados"""
+    fields = test.get("fields") or {}
+    steps = [
+        [_normalize(step.get("action")), _normalize(step.get("data")), _normalize(step.get("result"))]
+        for step in test.get("steps") or [] if isinstance(step, dict)
+    ]
+    canonical = json.dumps(
+        [_normalize(fields.get("summary")), steps, _normalize_folder(test.get("xray_test_repository_folder"))],
+        ensure_ascii=False, separators=(",", ":")
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
@@ -0,0 +1,178 @@
+"""
+Benchmark del lexer de criterios (app/utils/criteria_lexer.py) frente a la
+implementación anterior basada en any(keyword in line.lower() ...).
+
+Uso:
+    python scripts/bench_criteria_lexer.py [--chars 50000] [--repeat 20]
+"""
+import argparse
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.criteria_lexer import lex_lines, group_sections, find_criteria_bounds
+
+SAMPLE_BLOCK = """## EVALUACIÓN AUTOMÁTICA DE CRITICIDAD
+**Impacto Negocio**: 4/5 - Funcionalidad importante para el negocio
+**PUNTUACIÓN TOTAL**: 16/25
+
+## HISTORIA DE USUARIO REFINADA
+**Como** administrador, **quiero** duplicar lotes, **para** ahorrar tiempo.
+
+## CRITERIOS DE ACEPTACIÓN DETALLADOS
+
+### 1. Intención Macro (Propuesta de Valor)
+**Escenario Principal**: Duplicación exitosa de un lote
+**Dado** que el administrador completa el formulario
+**Cuando** presiona el botón "Guardar"
+**Entonces** el sistema debe mostrar un mensaje de éxito
+**Y** debe agregarse una nueva tarjeta de producto
+**ModoVerificación**: Automático
+
+### 2. Flujo Funcional Completo
+**Escenario Alternativo**: Duplicación con modificación de otros campos
+**Dado** que el administrador modifica campos adicionales
+**Cuando** guarda el formulario
+**Entonces** el nuevo lote debe reflejar los cambios
+
+### 3. Interacción con Componentes de Interfaz
+**Escenario Edge**: Lote con multimedia compleja
+**Dado** que el lote original contiene múltiples imágenes
+**Cuando** se duplica el lote
+**Entonces** todas las imágenes deben copiarse
+
+### 4. Validación de Datos y Reglas de Negocio
+**Scenario**: Referencia duplicada
+**Given** an existing reference
+**When** the admin saves
+**Then** a validation error is displayed
+
+### 5. Casos Límite y Manejo de Errores
+**Escenario**: Error de red al guardar
+**Dado** que la red falla
+**Cuando** se guarda
+**Entonces** se muestra un mensaje de reintento
+"""
+
+SECTION_KEYWORDS = ['intención macro', 'flujo funcional', 'interacción', 'validación', 'casos de borde', 'casos límite']
+ALL_KEYWORDS = SECTION_KEYWORDS + ['componentes ui', 'datos y reglas', 'manejo de errores',
+                                   'business value scenario', 'complete functional flow', 'ui interaction',
+                                   'data validation', 'edge cases', 'error handling', 'components ui',
+                                   'data and rules', 'technical considerations']
+MARKERS = ['CRITERIOS DE ACEPTACIÓN DETALLADOS', 'CRITERIOS DE ACEPTACIÓN', '## CRITERIOS DE ACEPTACIÓN',
+           '### CRITERIOS DE ACEPTACIÓN', '1. Intención Macro', '2. Flujo Funcional', '### 1. Intención Macro',
+           '### 2. Flujo Funcional', '### 3. Interacción', '### 4. Validación', '### 5. Casos',
+           'ACCEPTANCE CRITERIA (use Gherkin syntax)', 'ACCEPTANCE CRITERIA', '## ACCEPTANCE CRITERIA',
+           '### ACCEPTANCE CRITERIA', '1. Business Value Scenario', '2. Complete Functional Flow',
+           '### 1. Business Value Scenario', '### 2. Complete Functional Flow', '### 3. UI Interaction',
+           '### 4. Data Validation', '### 5. Edge Cases']
+
+def legacy_group(lines, keywords):
+    sections, current = [], []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        is_new = (line.startswith('###') or line.startswith('##') or re.match(r'^\d+\.\s+[A-Z]', line) or
+                  any(keyword in line.lower() for keyword in keywords))
+        if is_new and current:
+            sections.append(current)
+            current = []
+        current.append(line)
+    if current:
+        sections.append(current)
+    return sections
+
+def legacy_extract(content):
+    lines = content.split('\n')
+    start_index = -1
+    for i, line in enumerate(lines):
+        line_lower = line.lower().strip()
+        for marker in MARKERS:
+            if marker.lower() in line_lower:
+                start_index = i
+                break
+        if start_index != -1:
+            break
+    if start_index == -1:
+        return []
+    end_keywords = ['intención macro', 'flujo funcional', 'interacción', 'validación', 'casos',
+                    'business value scenario', 'complete functional flow', 'ui interaction', 'data validation', 'edge cases']
+    result = []
+    for i in range(start_index, len(lines)):
+        line = lines[i].strip()
+        if (i > start_index and (line.startswith('## ') or line.startswith('### ') or
+                                 'CONSIDERACIONES TÉCNICAS' in line.upper() or 'CRITERIOS DE DONE' in line.upper() or
+                                 'TECHNICAL CONSIDERATIONS' in line.upper() or 'DONE CRITERIA' in line.upper())):
+            if not any(keyword in line.lower() for keyword in end_keywords):
+                break
+        result.append(line)
+    return result
+
+def legacy_scenarios(sections):
+    count = 0
+    for section in sections:
+        for line in section:
+            line = line.strip()
+            is_title = line.startswith('###') or line.startswith('##') or re.match(r'^\d+\.\s+[A-Z]', line)
+            line = re.sub(r'^#+\s*', '', line)
+            line = re.sub(r'^\d+\.\s*', '', line)
+            if not is_title and ('escenario' in line.lower() or 'scenario' in line.lower()) and ':' in line:
+                count += 1
+    return count
+
+def legacy_pipeline(content):
+    criteria = legacy_extract(content)
+    sections = legacy_group(criteria, ALL_KEYWORDS)
+    basic = legacy_group(content.split('\n'), SECTION_KEYWORDS)
+    return criteria, sections, basic, legacy_scenarios(sections)
+
+def lexer_pipeline(content):
+    lines = lex_lines(content.split('\n'))
+    start, end = find_criteria_bounds(lines)
+    criteria = lines[start:end] if start != -1 else []
+    sections = group_sections(criteria, complete=True)
+    basic = group_sections(lines)
+    scenarios = sum(1 for section in sections for line in section if line.is_scenario_start)
+    return criteria, sections, basic, scenarios
+
+def as_texts(result):
+    criteria, sections, basic, scenarios = result
+    return ([str(line) for line in criteria],
+            [[str(line) for line in section] for section in sections],
+            [[str(line) for line in section] for section in basic],
+            scenarios)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chars", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    # Un solo bloque de criterios seguido de escenarios repetidos hasta el tamaño pedido
+    criteria_start = SAMPLE_BLOCK.index("### 1.")
+    body = SAMPLE_BLOCK[criteria_start:]
+    content = SAMPLE_BLOCK
+    while len(content) < args.chars:
+        content += body
+    content = content[:args.chars]
+
+    legacy_result = as_texts(legacy_pipeline(content))
+    lexer_result = as_texts(lexer_pipeline(content))
+    assert legacy_result == lexer_result, "El lexer no produce las mismas secciones que la implementación anterior"
+
+    legacy_time = min(timeit.repeat(lambda: legacy_pipeline(content), number=1, repeat=args.repeat))
+    lexer_time = min(timeit.repeat(lambda: lexer_pipeline(content), number=1, repeat=args.repeat))
+
+    print(f"📏 Entrada: {len(content)} caracteres, {content.count(chr(10)) + 1} líneas")
+    criteria, sections, basic, scenarios = lexer_result
+    print(f"   Criterios: {len(criteria)} líneas, {len(sections)} secciones ({len(basic)} básicas), {scenarios} escenarios")
+    print(f"🐢 Implementación anterior: {legacy_time * 1000:.2f} ms")
+    print(f"⚡ Lexer de una pasada:     {lexer_time * 1000:.2f} ms")
+    print(f"🚀 Speedup: {legacy_time / lexer_time:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Memoria y tiempo de exportar las HUs de un proyecto: cargar todas las HUs con sus textos y serializarlas
+en una sola respuesta (lo que hacen hoy los reportes recorriendo GET /hus) frente a la exportación en
+streaming de services/hu_export.py. Mide el pico de memoria con tracemalloc para dos tamaños de proyecto:
+la exportación en streaming debe quedarse constante.
+
+Uso:
+    python scripts/bench_hu_export.py [--sizes 2000 10000] [--db /tmp/bench_export.db]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2000, 10000])
+    parser.add_argument("--db", default="/tmp/bench_export.db")
+    return parser.parse_args()
+
+ARGS = parse_args()
+for suffix in ("", "-wal", "-shm"):
+    if os.path.exists(ARGS.db + suffix):
+        os.remove(ARGS.db + suffix)
+os.environ["DATABASE_URL"] = f"sqlite:///{ARGS.db}"
+os.environ["PROJECT_STATS_RECONCILE_SECONDS"] = "0"
+
+from sqlalchemy import insert  # noqa: E402
+from app.database.connection import SessionLocal, engine  # noqa: E402
+from app.database.models import User, Project, HU, RefinementContent  # noqa: E402
+from app.api.routes import hu_list_query  # noqa: E402
+from app.services.hu_export import export_project_hus  # noqa: E402
+
+def seed(db, size: int) -> str:
+    """Proyecto con size HUs, cada una con su propio texto refinado (~4 KB)"""
+    user_id, project_id = str(uuid.uuid4()), str(uuid.uuid4())
+    db.execute(insert(User), [{"id": user_id, "username": f"export{size}", "email": f"export{size}@example.com",
+                               "hashed_password": "x", "is_active": True}])
+    db.execute(insert(Project), [{"id": project_id, "name": f"Export {size}", "user_id": user_id, "is_active": True,
+                                  "azure_devops_token": "t", "azure_org": "o", "azure_project": "p",
+                                  "client_id": "c", "client_secret": "s"}])
+    base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    for start in range(0, size, 1000):
+        contents, hus = [], []
+        for n in range(start, min(start + 1000, size)):
+            text = "\n".join(f"Escenario {i} de la HU {size}-{n}: Dado que el usuario ingresa, entonces ve el resultado {i * n}."
+                             for i in range(45))
+            content = RefinementContent.from_text(text)
+            contents.append({"hash": content.hash, "codec": content.codec, "body": content.body,
+                             "length": content.length, "stored_size": content.stored_size})
+            hus.append({"id": str(uuid.uuid4()), "azure_id": f"{size}-{n}", "name": f"Historia {n}",
+                        "description": "Descripción de ejemplo", "refined_hash": content.hash,
+                        "markdown_hash": content.hash, "project_id": project_id, "language": "es",
+                        "created_at": base + timedelta(seconds=n)})
+        db.execute(insert(RefinementContent), contents)
+        db.execute(insert(HU), hus)
+    db.commit()
+    return project_id
+
+def materialized(project_id: str) -> int:
+    db = SessionLocal()
+    try:
+        query, to_dict = hu_list_query(db, "full")
+        body = json.dumps([to_dict(hu) for hu in query.filter(HU.project_id == project_id).all()]).encode("utf-8")
+        return len(body)
+    finally:
+        db.close()
+
+def streamed(project_id: str) -> int:
+    return sum(len(chunk) for chunk in export_project_hus(engine, project_id, "ndjson", "full"))
+
+def measure(call, project_id: str):
+    tracemalloc.start()
+    started = time.perf_counter()
+    size = call(project_id)
+    seconds = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, seconds, peak
+
+def main():
+    db = SessionLocal()
+    projects = {size: seed(db, size) for size in ARGS.sizes}
+    db.close()
+    print(f"{'HUs':>8} {'modo':<14} {'bytes':>12} {'segundos':>9} {'pico memoria':>14}")
+    for size, project_id in projects.items():
+        for label, call in (("materializado", materialized), ("streaming", streamed)):
+            body, seconds, peak = measure(call, project_id)
+            print(f"{size:>8} {label:<14} {body:>12} {seconds:>9.2f} {peak / 1024 / 1024:>11.1f} MB")
+
+if __name__ == "__main__":
+    main()
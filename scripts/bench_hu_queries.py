@@ -0,0 +1,145 @@
+"""
+Benchmark de get_hus_endpoint, get_project_hus_endpoint y la búsqueda por número de work item
+(find_project_hu) sobre una base SQLite sembrada con 100k HUs, antes y después de las migraciones
+de índices (app/database/migrations.py).
+
+Uso:
+    python scripts/bench_hu_queries.py [--hus 100000] [--projects 100] [--repeat 5] [--db /tmp/bench_hus.db]
+"""
+import argparse
+import builtins
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hus", type=int, default=100000)
+    parser.add_argument("--projects", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--db", default="/tmp/bench_hus.db")
+    parser.add_argument("--reseed", action="store_true", help="Borra la base y la vuelve a sembrar")
+    return parser.parse_args()
+
+ARGS = parse_args()
+if ARGS.reseed and os.path.exists(ARGS.db):
+    os.remove(ARGS.db)
+os.environ["DATABASE_URL"] = f"sqlite:///{ARGS.db}"
+os.environ["AUTO_MIGRATE"] = "false"
+
+from sqlalchemy import insert, text
+from app.database.connection import SessionLocal, engine
+from app.database.models import User, Project, HU, HUStatus, RefinementContent
+from app.database.migrations import MIGRATIONS, run_migrations, get_applied_versions
+from app.api.routes import get_hus_endpoint, get_project_hus_endpoint, find_project_hu, debug_find_hu_endpoint
+
+USERS = 20
+
+def seed(db):
+    if db.query(HU).count() >= ARGS.hus:
+        return
+    print(f"🌱 Sembrando {ARGS.hus} HUs en {ARGS.projects} proyectos...")
+    random.seed(7)
+    users = [{"id": str(uuid.uuid4()), "username": f"bench{i}", "email": f"bench{i}@example.com",
+              "hashed_password": "x", "is_active": True} for i in range(USERS)]
+    db.execute(insert(User), users)
+
+    projects = []
+    for i in range(ARGS.projects):
+        user = users[i % USERS]
+        projects.append({"id": str(uuid.uuid4()), "name": f"Proyecto {i}", "user_id": user["id"],
+                         "is_active": i < USERS, "azure_devops_token": "t", "azure_org": "org",
+                         "azure_project": f"P{i}", "client_id": "c", "client_secret": "s"})
+    db.execute(insert(Project), projects)
+
+    refined = RefinementContent.from_text("Contenido refinado " * 20)
+    markdown = RefinementContent.from_text("## Contenido\n" * 10)
+    db.add_all([refined, markdown])
+    db.flush()
+
+    base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    statuses = list(HUStatus)
+    batch = []
+    for n in range(ARGS.hus):
+        batch.append({
+            "id": str(uuid.uuid4()), "azure_id": str(10000 + n), "name": f"Historia de usuario {n}",
+            "description": "Descripción de ejemplo", "status": random.choice(statuses),
+            "refined_hash": refined.hash, "markdown_hash": markdown.hash,
+            "feature": f"Feature {n % 40}", "module": f"Módulo {n % 8}", "language": "es",
+            "project_id": random.choice(projects)["id"],
+            "created_at": base + timedelta(minutes=n)
+        })
+        if len(batch) == 5000:
+            db.execute(insert(HU), batch)
+            batch = []
+    if batch:
+        db.execute(insert(HU), batch)
+    db.commit()
+
+def drop_hot_path_indexes():
+    """Vuelve al esquema previo a las migraciones de índices (azure_number lo rellena la migración 5)"""
+    from app.database.migrations import HOT_PATH_INDEXES
+    with engine.begin() as conn:
+        for name, _, _ in HOT_PATH_INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+        conn.execute(text("DROP INDEX IF EXISTS ux_hus_project_azure_number"))
+        conn.execute(text("UPDATE hus SET azure_number = NULL"))
+        get_applied_versions(conn)
+        conn.execute(text("DELETE FROM schema_migrations"))
+
+def measure(db, label):
+    user = db.query(User).filter(User.username == "bench0").first()
+    project = db.query(Project).filter(Project.user_id == user.id, Project.is_active == True).first()
+    azure_id = db.query(HU.azure_id).filter(HU.project_id == project.id).order_by(HU.created_at.desc()).limit(1).scalar()
+    cases = {
+        "get_hus_endpoint": lambda: get_hus_endpoint(db, None, None, None, None, None, user),
+        "get_hus_endpoint (status)": lambda: get_hus_endpoint(db, "accepted", None, None, None, None, user),
+        "get_project_hus_endpoint": lambda: get_project_hus_endpoint(project.id, user, db),
+        "find_project_hu": lambda: find_project_hu(db, project.id, f"HU-{azure_id}"),
+        "debug_find_hu_endpoint": lambda: debug_find_hu_endpoint(azure_id, user, db),
+    }
+    results = {}
+    real_print = builtins.print
+    builtins.print = lambda *a, **k: None
+    try:
+        for name, call in cases.items():
+            timings = []
+            for _ in range(ARGS.repeat):
+                db.expire_all()
+                started = time.perf_counter()
+                call()
+                timings.append(time.perf_counter() - started)
+            results[name] = min(timings) * 1000
+    finally:
+        builtins.print = real_print
+    print(f"📊 {label}")
+    for name, ms in results.items():
+        print(f"   {name:<28} {ms:8.1f} ms")
+    return results
+
+def main():
+    db = SessionLocal()
+    seed(db)
+    total = db.query(HU).count()
+    print(f"📏 {total} HUs, {ARGS.projects} proyectos")
+
+    drop_hot_path_indexes()
+    before = measure(db, "Sin índices compuestos")
+
+    run_migrations(engine)
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+    after = measure(db, f"Con migraciones aplicadas (hasta la versión {MIGRATIONS[-1].version})")
+
+    print("🚀 Mejora:")
+    for name in before:
+        print(f"   {name:<28} {before[name] / after[name]:6.1f}x")
+    db.close()
+
+if __name__ == "__main__":
+    main()
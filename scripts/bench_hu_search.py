@@ -0,0 +1,159 @@
+"""
+Benchmark de la búsqueda de HUs (app/services/hu_search.py): filtros ILIKE '%término%' frente al índice
+FTS5 sobre una base SQLite sembrada con HUs de texto variado.
+
+Uso:
+    python scripts/bench_hu_search.py [--hus 100000] [--projects 5] [--repeat 5] [--db /tmp/bench_hu_search.db]
+"""
+import argparse
+import builtins
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hus", type=int, default=100000)
+    parser.add_argument("--projects", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--db", default="/tmp/bench_hu_search.db")
+    parser.add_argument("--reseed", action="store_true", help="Borra la base y la vuelve a sembrar")
+    return parser.parse_args()
+
+ARGS = parse_args()
+if ARGS.reseed and os.path.exists(ARGS.db):
+    os.remove(ARGS.db)
+os.environ["DATABASE_URL"] = f"sqlite:///{ARGS.db}"
+
+from sqlalchemy import insert
+from app.database.connection import SessionLocal
+from app.database.models import User, Project, HU, HUStatus, RefinementContent
+from app.services import hu_search
+from app.api.routes import get_hus_endpoint
+
+VERBS = ["registrar", "consultar", "aprobar", "rechazar", "exportar", "editar", "eliminar", "programar", "notificar", "validar"]
+OBJECTS = ["factura", "pedido", "usuario", "reporte", "pago", "inventario", "cliente", "contrato", "reserva", "mensaje"]
+CONTEXTS = ["desde el portal", "en la app móvil", "por lotes", "con doble factor", "en tiempo real", "para auditoría"]
+FEATURES = ["Facturación", "Pedidos", "Autenticación", "Reportes", "Pagos", "Inventario", "Clientes", "Notificaciones"]
+MODULES = ["Backoffice", "Portal", "Mobile", "Integraciones"]
+
+def seed(db):
+    if db.query(HU).count() >= ARGS.hus:
+        return
+    print(f"🌱 Sembrando {ARGS.hus} HUs en {ARGS.projects} proyectos...")
+    random.seed(11)
+    user = {"id": str(uuid.uuid4()), "username": "bench_search", "email": "bench_search@example.com",
+            "hashed_password": "x", "is_active": True}
+    db.execute(insert(User), [user])
+    projects = [{"id": str(uuid.uuid4()), "name": f"Proyecto {i}", "user_id": user["id"], "is_active": i == 0,
+                 "azure_devops_token": "t", "azure_org": "org", "azure_project": f"P{i}",
+                 "client_id": "c", "client_secret": "s"} for i in range(ARGS.projects)]
+    db.execute(insert(Project), projects)
+
+    markdown = RefinementContent.from_text("## Contenido\n")
+    db.add(markdown)
+    db.flush()
+
+    base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    statuses = list(HUStatus)
+    batch, contents = [], {}
+    for n in range(ARGS.hus):
+        verb, obj, context = random.choice(VERBS), random.choice(OBJECTS), random.choice(CONTEXTS)
+        refined = " ".join(
+            f"Como {random.choice(['analista', 'cliente', 'administrador', 'auditor'])} quiero {random.choice(VERBS)} "
+            f"el {random.choice(OBJECTS)} {random.choice(CONTEXTS)}." for _ in range(12)
+        )
+        batch.append({
+            "id": str(uuid.uuid4()), "azure_id": str(100000 + n), "name": f"{verb.capitalize()} {obj} {context}",
+            "description": "Descripción de ejemplo", "status": random.choice(statuses),
+            "refined_hash": contents.setdefault(refined, RefinementContent.from_text(refined)).hash,
+            "markdown_hash": markdown.hash,
+            "feature": random.choice(FEATURES), "module": random.choice(MODULES), "language": "es",
+            "project_id": random.choice(projects)["id"], "created_at": base + timedelta(minutes=n)
+        })
+        if len(batch) == 5000:
+            _flush_batch(db, batch, contents)
+            batch, contents = [], {}
+    if batch:
+        _flush_batch(db, batch, contents)
+    db.commit()
+
+def _flush_batch(db, batch, contents):
+    # Los triggers de búsqueda leen el texto refinado de refinement_contents: se insertan primero
+    if contents:
+        db.add_all(contents.values())
+        db.flush()
+    db.execute(insert(HU), batch)
+
+CASES = {
+    "name=contrato": dict(name="contrato"),
+    "name=aprobar pedido": dict(name="aprobar pedido"),
+    "feature=Factur + module=Portal": dict(feature="Factur", module="Portal"),
+    "azure_id=1042": dict(azure_id="1042"),
+    "q=auditor exportar reserva": dict(q="auditor exportar reserva"),
+    "q=notif contrat": dict(q="notif contrat"),
+}
+
+def search_ids(db, project_id, params):
+    """Solo la consulta de búsqueda (sin serializar las HUs)"""
+    query = db.query(HU.id).filter(HU.project_id == project_id)
+    filters = {column: params.get(column) for column in ("name", "azure_id", "feature", "module")}
+    query, rank = hu_search.apply_search(db, query, filters, params.get("q"))
+    return query.order_by(*([rank] if rank is not None else []), HU.created_at.desc()).all()
+
+def endpoint(db, user, params):
+    return get_hus_endpoint(db, None, params.get("name"), params.get("azure_id"), params.get("feature"),
+                            params.get("module"), user, params.get("q"))["data"]
+
+def best_of(call):
+    timings = []
+    for _ in range(ARGS.repeat):
+        started = time.perf_counter()
+        rows = call()
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000, len(rows)
+
+def measure(db, user, project_id, backend):
+    hu_search._backend_cache[str(db.get_bind().url)] = backend
+    results = {}
+    real_print = builtins.print
+    builtins.print = lambda *a, **k: None
+    try:
+        for label, params in CASES.items():
+            db.expire_all()
+            query_ms, count = best_of(lambda: search_ids(db, project_id, params))
+            endpoint_ms, _ = best_of(lambda: endpoint(db, user, params))
+            results[label] = (query_ms, endpoint_ms, count)
+    finally:
+        builtins.print = real_print
+    print(f"📊 Backend '{backend}' (consulta / endpoint completo)")
+    for label, (query_ms, endpoint_ms, count) in results.items():
+        print(f"   {label:<32} {query_ms:8.1f} ms / {endpoint_ms:8.1f} ms  ({count} HUs)")
+    return results
+
+def main():
+    db = SessionLocal()
+    seed(db)
+    if hu_search.detect_backend(db) != "fts5":
+        print("❌ La base no tiene hus_fts (¿SQLite sin FTS5 o AUTO_MIGRATE=false?)")
+        return
+    print(f"📏 {db.query(HU).count()} HUs")
+    user = db.query(User).filter(User.username == "bench_search").first()
+    project = db.query(Project).filter(Project.user_id == user.id, Project.is_active == True).first()
+
+    like = measure(db, user, project.id, "like")
+    fts = measure(db, user, project.id, "fts5")
+
+    print("🚀 Mejora (like / fts5, consulta / endpoint completo):")
+    for label in CASES:
+        print(f"   {label:<32} {like[label][0] / fts[label][0]:6.1f}x / {like[label][1] / fts[label][1]:6.1f}x")
+    hu_search.reset_backend_cache()
+    db.close()
+
+if __name__ == "__main__":
+    main()
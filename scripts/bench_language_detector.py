@@ -0,0 +1,143 @@
+"""
+Benchmark del detector de idioma (app/utils/language_detector.py) frente al código anterior (afe17fd):
+- Idioma de los escenarios: conteo de palabras por substring de AzureService._format_single_scenario.
+- Traducciones de los campos de entrada en DeepSeekService.refine_hu (language="en"): antes se traducían
+  siempre los cinco campos; ahora solo los que el detector identifica como español.
+
+Uso:
+    python scripts/bench_language_detector.py [--repeat 200]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.language_detector import detect_language, needs_translation_to_english, GHERKIN_KEYWORDS
+
+# Muestras etiquetadas: (idioma esperado, texto)
+SAMPLES = [
+    ('es', "Dado que el usuario está autenticado en el sistema\nCuando presiona el botón guardar\nEntonces debe mostrarse un mensaje de éxito"),
+    ('es', "Dado que el administrador completa el formulario con datos válidos\nCuando se guarda el lote\nEntonces el sistema crea una nueva tarjeta"),
+    ('es', "## EVALUACIÓN AUTOMÁTICA DE CRITICIDAD\n**Impacto Negocio**: 4/5 - Funcionalidad importante para la operación diaria de los usuarios"),
+    ('es', "Como comprador quiero filtrar productos por categoría para encontrar más rápido lo que necesito"),
+    ('es', "Given que la red falla durante la carga\nWhen se intenta guardar\nThen se muestra un mensaje de reintento al usuario"),
+    ('en', "Given the user is logged in\nWhen the user clicks the save button\nThen a success message should be displayed"),
+    ('en', "Given an existing reference in the catalog\nWhen the admin saves the form\nThen a validation error is displayed to the user"),
+    ('en', "## AUTOMATIC CRITICALITY ASSESSMENT\n**Business Impact**: 4/5 - Important functionality for the daily operation of the store"),
+    ('en', "As a buyer I want to filter products by category so that I can find what I need faster"),
+    ('en', "Dado the network fails while loading\nCuando the user tries to save\nEntonces a retry message is shown on the page"),
+]
+
+# Listas de AzureService._format_single_scenario antes del detector (commit afe17fd), sin cambios
+LEGACY_ENGLISH_CONTENT_WORDS = [
+    'user', 'admin', 'projects', 'page', 'system', 'widgets', 'dashboard', 'company', 'visibility', 'approval',
+    'margin', 'portfolio', 'health', 'status', 'filter', 'sort', 'table', 'card', 'view', 'data', 'export',
+    'timeline', 'permission', 'access', 'control', 'validation', 'error', 'performance', 'real-time', 'update',
+    'refresh', 'session', 'preference', 'toggle', 'persistence', 'pagination', 'scroll', 'responsive', 'mobile',
+    'desktop', 'tablet', 'role', 'opens', 'sees', 'displays', 'aggregates', 'restricted', 'tied', 'visible',
+    'widget', 'badge', 'count', 'buttons', 'enabled', 'disappears', 'decrements', 'sorts', 'filters', 'needs',
+    'attention', 'consistent', 'aligns', 'optimizing', 'opportunities', 'orders', 'descending', 'updates',
+    'accordingly', 'applied', 'layout', 'loads', 'sections', 'render', 'order', 'default', 'sorting',
+    'recently', 'used', 'session', 'first', 'time', 'toggles', 'saves', 'preference', 'persists', 'maintains',
+    'chips', 'clear', 'removes', 'restores', 'dataset', 'size', 'selector', 'items', 'showing', 'controls',
+    'reflect', 'actions', 'details', 'edit', 'timeline', 'triggers', 'navigation', 'interaction', 'display',
+    'truncated', 'description', 'logo', 'label', 'color', 'progress', 'estimated', 'favorite', 'star', 'menu',
+    'button', 'grid', 'columns', 'header', 'sticky', 'sortable', 'toggling', 'horizontal', 'alphabetically',
+    'ascending', 'reverses', 'numerical', 'percentage', 'timestamp', 'stars', 'appears', 'favorites', 'link',
+    'un-starring', 'removes', 'real', 'planning', 'start', 'dates', 'within', 'days', 'lists', 'sorted',
+    'nearest', 'qualify', 'shows', 'color', 'coding', 'values', 'equals', 'count', 'distribution', 'pie',
+    'aligns', 'reflects', 'completed', 'cancelled', 'ratio', 'utilization', 'active', 'consistent', 'scope',
+    'requesting', 'returned', 'queries', 'attempts', 'denied', 'becomes', 'higher', 'approved', 'rejected',
+    'removed', 'types', 'search', 'bar', 'executes', 'contains', 'case-insensitive', 'tokenized', 'highlighted',
+    'terms', 'matched', 'optional', 'correct', 'calculated', 'duration', 'range', 'numeric', 'between',
+    'matches', 'visual', 'empty', 'exists', 'illustration', 'create', 'hidden', 'cannot', 'overly',
+    'restrictive', 'returns', 'results', 'display', 'suggestions', 'adjust', 'large', 'dataset', 'exists',
+    'applied', 'server-side', 'indexed', 'acceptable', 'sla', 'skeleton', 'loaders', 'progressive', 'jank',
+    'approves', 'another', 'viewing', 'count', 'list', 'updates', 'reload', 'network', 'occurs', 'triggers',
+    'toast', 'failed', 'retry', 'duplicate', 'download', 'initiated', 'rate', 'limiting', 'prevents', 'rapid',
+    'calls', 'without', 'edit', 'permissions', 'disabled', 'attempting', 'navigate', 'directly', 'returns',
+    'reduces', 'fewer', 'resets', 'accurately', 'sets', 'earlier', 'validation', 'appears', 'corrected',
+    'minimum', 'exceed', 'maximum', 'values', 'corrected', 'applying', 'narrow', 'viewport', 'horizontally',
+    'fixed', 'remaining', 'smoothly', 'overlap'
+]
+
+LEGACY_SPANISH_CONTENT_WORDS = [
+    'usuario', 'administrador', 'proyectos', 'página', 'sistema', 'widgets', 'panel', 'empresa', 'visibilidad',
+    'aprobación', 'margen', 'portafolio', 'salud', 'estado', 'filtro', 'ordenar', 'tabla', 'tarjeta', 'vista',
+    'datos', 'exportar', 'línea', 'permiso', 'acceso', 'control', 'validación', 'error', 'rendimiento',
+    'tiempo', 'actualizar', 'refrescar', 'sesión', 'preferencia', 'alternar', 'persistencia', 'paginación',
+    'desplazamiento', 'responsivo', 'móvil', 'escritorio', 'tableta'
+]
+
+def legacy_detect(text):
+    """Detección de AzureService._format_single_scenario en afe17fd: conteo de palabras por substring"""
+    content_text = ' '.join(text.split('\n')).lower()
+    english_content_count = sum(1 for word in LEGACY_ENGLISH_CONTENT_WORDS if word in content_text)
+    spanish_content_count = sum(1 for word in LEGACY_SPANISH_CONTENT_WORDS if word in content_text)
+    return 'en' if english_content_count > spanish_content_count else 'es'
+
+# Campos de entrada de refine_hu: (idioma esperado, título, descripción, criterios, feature, módulo)
+HU_FIELDS = [
+    ('es', "Filtro de productos por categoría",
+     "Como comprador quiero filtrar productos por categoría para encontrar más rápido lo que necesito",
+     "Dado que el usuario está en el catálogo\nCuando selecciona una categoría\nEntonces solo ve los productos de esa categoría",
+     "Catálogo de productos", "Tienda"),
+    ('es', "Gestión de pagos pendientes",
+     "El administrador necesita revisar los pagos que están pendientes de aprobación",
+     "Dado que existen pagos pendientes\nCuando el administrador abre el panel\nEntonces ve la lista ordenada por fecha",
+     "Pagos", "Backoffice"),
+    ('en', "Product filter by category",
+     "As a buyer I want to filter products by category so that I can find what I need faster",
+     "Given the user is on the catalog\nWhen the user selects a category\nThen only the products of that category are shown",
+     "Product catalog", "Store"),
+    ('en', "Pending payments review",
+     "The admin needs to review the payments that are waiting for approval",
+     "Given there are pending payments\nWhen the admin opens the dashboard\nThen the list is sorted by date",
+     "Payments", "Backoffice"),
+]
+
+def translation_calls():
+    """(llamadas antes, llamadas ahora, campos en español sin traducir ahora)"""
+    before = sum(len(fields) for _, *fields in HU_FIELDS)
+    now, missed = 0, 0
+    for expected, *fields in HU_FIELDS:
+        for field in fields:
+            translate = needs_translation_to_english(field)
+            now += translate
+            # Un campo español sin evidencia (nombre propio, término técnico) se envía tal cual
+            if expected == 'es' and not translate and detect_language(field).language == 'es':
+                missed += 1
+    return before, now, missed
+
+def detector_detect(text):
+    guess = detect_language(text, ignore=GHERKIN_KEYWORDS)
+    return 'en' if guess.language == 'en' else 'es'
+
+def accuracy(detect):
+    return sum(1 for expected, text in SAMPLES if detect(text) == expected) / len(SAMPLES)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    legacy_time = min(timeit.repeat(lambda: [legacy_detect(text) for _, text in SAMPLES], number=args.repeat, repeat=5))
+    detector_time = min(timeit.repeat(lambda: [detector_detect(text) for _, text in SAMPLES], number=args.repeat, repeat=5))
+
+    print(f"📏 Muestras: {len(SAMPLES)} ({args.repeat} repeticiones)")
+    print(f"🐢 Conteo por substring (afe17fd): precisión {accuracy(legacy_detect):.0%}, {legacy_time * 1000:.2f} ms")
+    print(f"⚡ Detector por stop-words:        precisión {accuracy(detector_detect):.0%}, {detector_time * 1000:.2f} ms")
+
+    for expected, text in SAMPLES:
+        guess = detect_language(text, ignore=GHERKIN_KEYWORDS)
+        marker = "✅" if (guess.language or 'es') == expected else "❌"
+        print(f"   {marker} esperado={expected} detectado={guess.language} confianza={guess.confidence}")
+
+    before, now, missed = translation_calls()
+    print(f"🌐 Traducciones de campos de entrada en refine_hu: {before} antes, {now} ahora "
+          f"({missed} campos en español sin traducir)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Memoria y duración de la transacción de escritura al eliminar un proyecto grande: borrado con el ORM en una
+sola transacción (cargar las HUs con sus textos y sus revisiones, db.delete de cada una) frente al purgado
+por lotes con DELETE masivos de services/project_purge.py. Mide el pico de memoria con tracemalloc y la
+transacción más larga, que es el tiempo que se bloquea a los demás escritores (en SQLite, a todos).
+
+Uso:
+    python scripts/bench_project_purge.py [--hus 5000] [--batch 500] [--db /tmp/bench_purge.db]
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hus", type=int, default=5000)
+    parser.add_argument("--batch", type=int, default=500)
+    parser.add_argument("--db", default="/tmp/bench_purge.db")
+    return parser.parse_args()
+
+ARGS = parse_args()
+for suffix in ("", "-wal", "-shm"):
+    if os.path.exists(ARGS.db + suffix):
+        os.remove(ARGS.db + suffix)
+os.environ["DATABASE_URL"] = f"sqlite:///{ARGS.db}"
+os.environ["PROJECT_STATS_RECONCILE_SECONDS"] = "0"
+os.environ["PROJECT_PURGE_BATCH_SIZE"] = str(ARGS.batch)
+os.environ["PROJECT_PURGE_PAUSE_SECONDS"] = "0"
+
+from sqlalchemy import insert  # noqa: E402
+from sqlalchemy.orm import selectinload  # noqa: E402
+from app.database.connection import SessionLocal, engine  # noqa: E402
+from app.database.models import User, Project, HU, HURevision, RefinementContent  # noqa: E402
+from app.utils.content_codec import content_hash, encode_content, encode_delta  # noqa: E402
+from app.api.routes import hu_full_options  # noqa: E402
+from app.services import project_purge  # noqa: E402
+
+def seed(db, label: str) -> str:
+    """Proyecto con ARGS.hus HUs, cada una con su texto refinado (~4 KB) y una revisión"""
+    user_id, project_id = str(uuid.uuid4()), str(uuid.uuid4())
+    db.execute(insert(User), [{"id": user_id, "username": f"purge-{label}", "email": f"purge-{label}@example.com",
+                               "hashed_password": "x", "is_active": True}])
+    db.execute(insert(Project), [{"id": project_id, "name": f"Purgado {label}", "user_id": user_id,
+                                  "azure_devops_token": "t", "azure_org": "o", "azure_project": "p",
+                                  "client_id": "c", "client_secret": "s"}])
+    for start in range(0, ARGS.hus, 1000):
+        contents, hus, revisions = [], [], []
+        for n in range(start, min(start + 1000, ARGS.hus)):
+            text = "\n".join(f"Escenario {i} de la HU {label}-{n}: Dado que el usuario ingresa, entonces ve el resultado {i * n}."
+                             for i in range(45))
+            content = RefinementContent.from_text(text)
+            contents.append({"hash": content.hash, "codec": content.codec, "body": content.body,
+                             "length": content.length, "stored_size": content.stored_size})
+            hu_id = str(uuid.uuid4())
+            hus.append({"id": hu_id, "azure_id": f"{label}-{n}", "name": f"Historia {n}",
+                        "description": "Descripción de ejemplo " * 50, "refined_hash": content.hash,
+                        "markdown_hash": content.hash, "project_id": project_id, "language": "es"})
+            codec, body = encode_content(text)
+            revisions.append({"id": str(uuid.uuid4()), "hu_id": hu_id, "revision": 1, "trigger": "create",
+                              "codec": codec, "refined_body": body, "markdown_body": encode_delta(text, text),
+                              "refined_hash": content_hash(text), "markdown_hash": content_hash(text),
+                              "length": 2 * len(text), "stored_size": 2 * len(body)})
+        db.execute(insert(RefinementContent), contents)
+        db.execute(insert(HU), hus)
+        db.execute(insert(HURevision), revisions)
+    db.commit()
+    return project_id
+
+def orm_delete(project_id: str) -> float:
+    """Borrado en una transacción cargando las HUs: retorna la duración de la transacción"""
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        hus = db.query(HU).options(*hu_full_options(), selectinload(HU.revisions)).filter(HU.project_id == project_id).all()
+        for hu in hus:
+            db.delete(hu)
+        db.delete(db.get(Project, project_id))
+        db.commit()
+        return time.perf_counter() - started
+    finally:
+        db.close()
+
+def batched_purge(project_id: str) -> float:
+    """Purgado por lotes: retorna la transacción de escritura más larga"""
+    db = SessionLocal()
+    purge = project_purge.create_purge(db, db.get(Project, project_id))
+    db.close()
+    longest = 0.0
+    delete_batch = project_purge._delete_hu_batch
+
+    def timed_batch(*args):
+        nonlocal longest
+        started = time.perf_counter()
+        try:
+            return delete_batch(*args)
+        finally:
+            longest = max(longest, time.perf_counter() - started)
+
+    project_purge._delete_hu_batch = timed_batch
+    try:
+        project_purge.run_project_purge(engine, purge.id)
+    finally:
+        project_purge._delete_hu_batch = delete_batch
+    return longest
+
+def measure(call, project_id: str):
+    tracemalloc.start()
+    started = time.perf_counter()
+    transaction = call(project_id)
+    seconds = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, transaction, peak
+
+def main():
+    db = SessionLocal()
+    projects = {"orm": seed(db, "orm"), "lotes": seed(db, "lotes")}
+    db.close()
+    results = [("ORM, una transacción", measure(orm_delete, projects["orm"])),
+               (f"lotes de {ARGS.batch}", measure(batched_purge, projects["lotes"]))]
+    print(f"\n{ARGS.hus} HUs por proyecto")
+    print(f"{'modo':<22} {'segundos':>9} {'transacción más larga':>22} {'pico memoria':>14}")
+    for label, (seconds, transaction, peak) in results:
+        print(f"{label:<22} {seconds:>9.2f} {transaction:>20.2f} s {peak / 1024 / 1024:>11.1f} MB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Mide el tamaño de la base SQLite y el costo de recorrer hus antes y después de la migración 3
+(textos de refinamiento en refinement_contents, deduplicados y comprimidos).
+
+Siembra HUs con el esquema anterior (texto plano y Markdown iguales en las columnas de hus, con el
+índice FTS de la migración 2), aplica la migración y compara.
+
+Uso:
+    python scripts/bench_refinement_storage.py [--hus 5000] [--chars 15000] [--db /tmp/bench_refinements.db]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hus", type=int, default=5000)
+    parser.add_argument("--chars", type=int, default=15000, help="Largo aproximado de cada refinamiento")
+    parser.add_argument("--db", default="/tmp/bench_refinements.db")
+    return parser.parse_args()
+
+ARGS = parse_args()
+if os.path.exists(ARGS.db):
+    os.remove(ARGS.db)
+os.environ["DATABASE_URL"] = f"sqlite:///{ARGS.db}"
+
+from sqlalchemy import text
+from app.database.connection import engine
+from app.database import models  # noqa: F401  (crea las tablas y aplica las migraciones)
+from app.database.migrations import run_migrations, _create_sqlite_hu_fts
+
+SENTENCES = [
+    "Como {role} quiero {verb} el {obj} para {goal}.",
+    "Dado que el {obj} está {state}, cuando el {role} intenta {verb}, entonces el sistema muestra un mensaje claro.",
+    "Criterio de aceptación: el {obj} se puede {verb} {context}.",
+    "Escenario: {verb} un {obj} {state} {context}.",
+]
+WORDS = {
+    "role": ["analista", "cliente", "administrador", "auditor", "operador"],
+    "verb": ["registrar", "consultar", "aprobar", "rechazar", "exportar", "editar", "eliminar", "validar"],
+    "obj": ["factura", "pedido", "usuario", "reporte", "pago", "inventario", "contrato", "reserva"],
+    "goal": ["cumplir la normativa", "reducir errores", "agilizar el proceso", "tener trazabilidad"],
+    "state": ["pendiente", "aprobado", "vencido", "bloqueado", "en revisión"],
+    "context": ["desde el portal", "en la app móvil", "por lotes", "con doble factor", "en tiempo real"],
+}
+
+def refinement_text(rng: random.Random) -> str:
+    parts, size = [], 0
+    while size < ARGS.chars:
+        sentence = rng.choice(SENTENCES).format(**{key: rng.choice(values) for key, values in WORDS.items()})
+        parts.append(sentence)
+        size += len(sentence) + 1
+    return " ".join(parts)
+
+def seed_legacy():
+    """Estado previo a la migración 3: texto en hus.refined_response / markdown_response"""
+    rng = random.Random(5)
+    with engine.begin() as conn:
+        for trigger in ("hus_fts_ai", "hus_fts_ad", "hus_fts_au"):
+            conn.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+        conn.execute(text("DROP TABLE IF EXISTS hus_fts"))
+        _create_sqlite_hu_fts(conn)
+        conn.execute(text("DELETE FROM schema_migrations WHERE version >= 3"))
+        project_id = str(uuid.uuid4())
+        conn.execute(text(
+            "INSERT INTO projects (id, name, user_id, is_active, azure_devops_token, azure_org, azure_project, "
+            "client_id, client_secret) VALUES (:id, 'Bench', 'u', 1, 't', 'o', 'p', 'c', 's')"
+        ), {"id": project_id})
+        rows = []
+        for n in range(ARGS.hus):
+            # Algunas HUs se refinan igual (re-refinamientos sin cambios, HUs duplicadas)
+            body = refinement_text(rng) if n % 10 else refinement_text(random.Random(n // 100))
+            rows.append({"id": str(uuid.uuid4()), "azure_id": str(50000 + n), "name": f"HU {n}",
+                         "status": rng.choice(["PENDING", "ACCEPTED", "REJECTED"]), "body": body, "project_id": project_id})
+        conn.execute(text(
+            "INSERT INTO hus (id, azure_id, name, status, refined_response, markdown_response, language, project_id) "
+            "VALUES (:id, :azure_id, :name, :status, :body, :body, 'es', :project_id)"
+        ), rows)
+
+def vacuum_size() -> int:
+    with engine.connect() as conn:
+        conn.exec_driver_sql("VACUUM")
+    return os.path.getsize(ARGS.db)
+
+def scan_ms() -> float:
+    timings = []
+    for _ in range(5):
+        with engine.connect() as conn:
+            started = time.perf_counter()
+            conn.execute(text("SELECT count(*) FROM hus WHERE status = 'ACCEPTED' AND name LIKE '%9%'")).scalar()
+            timings.append(time.perf_counter() - started)
+    return min(timings) * 1000
+
+def main():
+    print(f"🌱 Sembrando {ARGS.hus} HUs con ~{ARGS.chars} caracteres de refinamiento (esquema anterior)...")
+    seed_legacy()
+    before_size, before_scan = vacuum_size(), scan_ms()
+
+    started = time.perf_counter()
+    run_migrations(engine)
+    migration_seconds = time.perf_counter() - started
+    after_size, after_scan = vacuum_size(), scan_ms()
+
+    with engine.connect() as conn:
+        distinct, stored = conn.execute(text("SELECT count(*), sum(stored_size) FROM refinement_contents")).first()
+    print(f"📦 {distinct} contenidos distintos, {stored / 1024 / 1024:.1f} MB comprimidos (migración: {migration_seconds:.1f}s)")
+    print(f"📊 Tamaño de la base:  {before_size / 1024 / 1024:8.1f} MB -> {after_size / 1024 / 1024:8.1f} MB "
+          f"({100 * (1 - after_size / before_size):.0f}% menos)")
+    print(f"📊 Recorrido de hus:   {before_scan:8.1f} ms -> {after_scan:8.1f} ms ({before_scan / after_scan:.1f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Escrituras concurrentes de refinamientos (como las de refine_hu_in_background y los jobs de generación)
+mientras otros hilos listan HUs, sobre SQLite con los pragmas de create_app_engine frente a la
+configuración por defecto de SQLite (journal en modo DELETE, synchronous=FULL).
+
+Cada configuración corre en un proceso aparte (los pragmas se leen del entorno al importar la app).
+
+Uso:
+    python scripts/bench_sqlite_concurrency.py [--writers 8] [--readers 8] [--seconds 10] [--hus 2000]
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CONFIGS = {
+    "por defecto": {"SQLITE_JOURNAL_MODE": "DELETE", "SQLITE_SYNCHRONOUS": "FULL", "SQLITE_BUSY_TIMEOUT_MS": "",
+                    "SQLITE_MMAP_SIZE": "0", "SQLITE_CACHE_SIZE": "-2000"},
+    "optimizada": {},
+}
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--writers", type=int, default=8, help="Hilos que guardan refinamientos")
+    parser.add_argument("--readers", type=int, default=8, help="Hilos que listan HUs")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--hus", type=int, default=2000)
+    parser.add_argument("--run", default="", help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+# ==================== CARGA (proceso hijo) ====================
+
+def run(args):
+    sys.path.insert(0, ROOT)
+    from sqlalchemy.exc import OperationalError
+    from app.database.connection import SessionLocal, get_pool_stats
+    from app.database.models import HU, Project
+    from app.api.routes import hu_list_query
+    from app.utils.pagination import paginate
+
+    db = SessionLocal()
+    project = Project(name="Concurrencia", user_id="u", is_active=True, azure_devops_token="t", azure_org="o",
+                      azure_project="p", client_id="c", client_secret="s")
+    db.add(project)
+    db.flush()
+    for n in range(args.hus):
+        db.add(HU(azure_id=str(70000 + n), name=f"HU {n}", refined_response=f"Texto {n}",
+                  markdown_response=f"Texto {n}", project_id=project.id))
+    db.commit()
+    project_id = project.id
+    hu_ids = [hu_id for (hu_id,) in db.query(HU.id).all()]
+    db.close()
+
+    deadline = time.perf_counter() + args.seconds
+    lock = threading.Lock()
+    writes, write_errors, write_latencies, read_latencies, read_errors = [0], [0], [], [], [0]
+
+    def writer(seed):
+        rng = random.Random(seed)
+        while time.perf_counter() < deadline:
+            session = SessionLocal()
+            started = time.perf_counter()
+            try:
+                hu = session.query(HU).filter(HU.id == rng.choice(hu_ids)).first()
+                body = f"Refinamiento {uuid.uuid4()} " + " ".join(rng.choice(["dado", "cuando", "entonces", "criterio"])
+                                                                  for _ in range(2000))
+                hu.refined_response = body
+                hu.markdown_response = body
+                session.commit()
+                with lock:
+                    writes[0] += 1
+                    write_latencies.append(time.perf_counter() - started)
+            except OperationalError as e:
+                session.rollback()
+                with lock:
+                    write_errors[0] += 1
+                if "locked" not in str(e):
+                    raise
+            finally:
+                session.close()
+
+    def reader():
+        while time.perf_counter() < deadline:
+            session = SessionLocal()
+            started = time.perf_counter()
+            try:
+                query, to_dict = hu_list_query(session, "summary")
+                items, _ = paginate(query.filter(HU.project_id == project_id), HU, 50, None)
+                [to_dict(hu) for hu in items]
+                with lock:
+                    read_latencies.append(time.perf_counter() - started)
+            except OperationalError:
+                with lock:
+                    read_errors[0] += 1
+            finally:
+                session.close()
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(args.writers)]
+    threads += [threading.Thread(target=reader) for _ in range(args.readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    def p95(values):
+        return sorted(values)[int(len(values) * 0.95)] * 1000 if values else 0.0
+
+    print(json.dumps({
+        "writes": writes[0],
+        "write_errors": write_errors[0],
+        "write_p95_ms": p95(write_latencies),
+        "reads": len(read_latencies),
+        "read_errors": read_errors[0],
+        "read_p50_ms": statistics.median(read_latencies) * 1000 if read_latencies else 0.0,
+        "read_p95_ms": p95(read_latencies),
+        "pool": get_pool_stats()["sync"],
+    }))
+
+# ==================== COMPARACIÓN ====================
+
+def main():
+    args = parse_args()
+    if args.run:
+        run(args)
+        return
+
+    print(f"🚀 {args.writers} escritores + {args.readers} lectores durante {args.seconds:.0f}s sobre {args.hus} HUs")
+    for label, overrides in CONFIGS.items():
+        workdir = tempfile.mkdtemp(prefix="bench_sqlite_")
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'bench.db')}", DB_ASYNC="false")
+        env.update(overrides)
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--run", label, "--writers", str(args.writers),
+             "--readers", str(args.readers), "--seconds", str(args.seconds), "--hus", str(args.hus)],
+            env=env, cwd=ROOT, capture_output=True, text=True
+        )
+        if output.returncode != 0:
+            print(f"❌ {label}: {output.stderr[-500:]}")
+            continue
+        result = json.loads(output.stdout.strip().splitlines()[-1])
+        print(f"📊 {label:12} escrituras {result['writes']:6} ({result['write_errors']} 'database is locked', "
+              f"p95 {result['write_p95_ms']:.0f} ms) | lecturas {result['reads']:6} "
+              f"(p50 {result['read_p50_ms']:.1f} ms, p95 {result['read_p95_ms']:.1f} ms, errores {result['read_errors']}) "
+              f"| pool: pico {result['pool']['peak_checked_out']}/{result['pool']['capacity']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Prueba de throughput de importaciones concurrentes a XRay en un mismo tenant, con y sin
+el planificador por tenant (app/services/xray_import_scheduler.py), contra el servidor
+XRay local de scripts/fake_xray_server.py.
+
+Uso:
+    python scripts/bench_xray_scheduler.py [--requests 6] [--job-seconds 1]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_xray_server import start_server, sample_classified_tests
+import app.services.xray_service as xray_module
+from app.services.xray_service import XRayService
+
+def run_concurrent(requests_count: int, job_seconds: float, use_scheduler: bool) -> dict:
+    server, state, base_url = start_server(job_seconds=job_seconds)
+    latencies = []
+    results = []
+    lock = threading.Lock()
+
+    def one_request():
+        service = XRayService()
+        service.client_id = "tenant-compartido"
+        service.client_secret = "secreto"
+        service.auth_url = f"{base_url}/api/v2/authenticate"
+        service.import_url = f"{base_url}/api/v2/import/test/bulk"
+        service.import_mode = "consolidated"
+        service.use_scheduler = use_scheduler
+        started = time.monotonic()
+        result = service.send_classified_tests(sample_classified_tests(2))
+        with lock:
+            latencies.append(time.monotonic() - started)
+            results.append(result)
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=one_request) for _ in range(requests_count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.monotonic() - started
+    server.shutdown()
+
+    succeeded = sum(1 for result in results if result["summary"]["total_success"] == result["summary"]["total_tests"])
+    return {
+        "wall": wall,
+        "mean_latency": sum(latencies) / len(latencies),
+        "max_latency": max(latencies),
+        "succeeded": succeeded,
+        "imports": state.import_requests,
+        "rejected": state.rejected_imports,
+        "jobs_per_minute": requests_count / wall * 60
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=6, help="Peticiones concurrentes en el mismo tenant")
+    parser.add_argument("--job-seconds", type=float, default=1.0)
+    args = parser.parse_args()
+
+    # Polling rápido para que la prueba dure segundos
+    xray_module.XRAY_POLL_INITIAL_INTERVAL = 0.2
+    xray_module.XRAY_POLL_MAX_INTERVAL = 2
+
+    import builtins
+    real_print = builtins.print
+    builtins.print = lambda *a, **k: None
+    try:
+        without = run_concurrent(args.requests, args.job_seconds, use_scheduler=False)
+        with_scheduler = run_concurrent(args.requests, args.job_seconds, use_scheduler=True)
+    finally:
+        builtins.print = real_print
+
+    print(f"📏 {args.requests} peticiones concurrentes, jobs de {args.job_seconds}s en el mismo tenant")
+    for name, stats in (("Sin planificador", without), ("Con planificador", with_scheduler)):
+        print(f"   {name}: {stats['wall']:.2f}s total, latencia media {stats['mean_latency']:.2f}s "
+              f"(máx {stats['max_latency']:.2f}s), {stats['jobs_per_minute']:.1f} envíos/min, "
+              f"{stats['succeeded']}/{args.requests} completos, {stats['imports']} imports, "
+              f"{stats['rejected']} rechazados por job en curso")
+
+    assert with_scheduler["succeeded"] == args.requests, "Con planificador todas las peticiones deben completarse"
+    assert with_scheduler["rejected"] == 0, "Con planificador XRay no debe rechazar imports por job en curso"
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,18 @@
+"""
+Comprueba el presupuesto de consultas de los endpoints de lectura: ejecuta los tests de
+tests/test_query_budgets.py (QUERY_BUDGETS y el fixture query_budget de tests/conftest.py) sobre una
+base SQLite temporal sembrada, y termina con el código de salida de pytest (1 si algún endpoint ejecuta
+más consultas de las declaradas; se listan las consultas).
+
+Uso:
+    python scripts/check_query_budgets.py [argumentos de pytest]
+"""
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if __name__ == "__main__":
+    sys.exit(pytest.main(["-q", os.path.join(ROOT, "tests", "test_query_budgets.py"), *sys.argv[1:]]))
@@ -0,0 +1,216 @@
+"""
+Servidor local que imita la API de importación de XRay Cloud para pruebas.
+
+Endpoints:
+    POST /api/v2/authenticate                      -> JWT (sin firma) con "exp"
+    POST /api/v2/import/test/bulk                  -> {"jobId": ...}; 400 si el tenant ya tiene un job en curso
+    GET  /api/v2/import/test/bulk/{job_id}/status  -> pending / working / successful
+
+Uso:
+    python scripts/fake_xray_server.py --port 8089 --job-seconds 2
+    AUTH_URL=http://localhost:8089/api/v2/authenticate \\
+    XRAY_IMPORT_URL=http://localhost:8089/api/v2/import/test/bulk uvicorn app.main:app
+
+    python scripts/fake_xray_server.py --self-test [--mode by_category]   # envía tests con XRayService y mide el tiempo
+"""
+import argparse
+import base64
+import json
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+JOB_IN_PROGRESS_ERROR = "A job to import tests is already in progress for this tenant"
+
+class FakeXRayState:
+    """Jobs y tokens emitidos; un solo job activo por tenant como en XRay Cloud"""
+
+    def __init__(self, job_seconds: float = 2.0, token_ttl: int = 3600):
+        self.job_seconds = job_seconds
+        self.token_ttl = token_ttl
+        self.lock = threading.Lock()
+        self.jobs = {}  # job_id -> dict
+        self.active_job = {}  # client_id -> job_id
+        self.auth_requests = 0
+        self.import_requests = 0
+        self.rejected_imports = 0
+        self.status_requests = 0
+        self.issue_counter = 1000
+
+    def issue_token(self, client_id: str) -> str:
+        with self.lock:
+            self.auth_requests += 1
+        header = base64.urlsafe_b64encode(b'{"alg":"none","typ":"JWT"}').decode().rstrip("=")
+        claims = json.dumps({"sub": client_id, "exp": int(time.time()) + self.token_ttl}).encode()
+        return f"{header}.{base64.urlsafe_b64encode(claims).decode().rstrip('=')}.fake"
+
+    def _job_status(self, job: dict) -> str:
+        elapsed = time.monotonic() - job["started"]
+        if elapsed >= self.job_seconds:
+            return "successful"
+        return "working" if elapsed >= self.job_seconds / 4 else "pending"
+
+    def _refresh_active(self, client_id: str):
+        job_id = self.active_job.get(client_id)
+        if job_id and self._job_status(self.jobs[job_id]) == "successful":
+            del self.active_job[client_id]
+
+    def start_job(self, client_id: str, tests: list):
+        with self.lock:
+            self.import_requests += 1
+            self._refresh_active(client_id)
+            if client_id in self.active_job:
+                self.rejected_imports += 1
+                return None
+            job_id = uuid.uuid4().hex
+            issues = []
+            for _ in tests:
+                self.issue_counter += 1
+                issues.append({"id": str(self.issue_counter), "key": f"QA-{self.issue_counter}"})
+            self.jobs[job_id] = {"client_id": client_id, "started": time.monotonic(), "issues": issues}
+            self.active_job[client_id] = job_id
+            return job_id
+
+    def job_status(self, job_id: str):
+        with self.lock:
+            self.status_requests += 1
+            job = self.jobs.get(job_id)
+            if not job:
+                return None
+            status = self._job_status(job)
+            body = {"status": status, "progress": [f"Job {status}"]}
+            if status == "successful":
+                body["result"] = {"errors": [], "issues": job["issues"], "warnings": []}
+            return body
+
+def make_handler(state: FakeXRayState):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, code: int, body):
+            data = json.dumps(body).encode()
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _read_json(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            return json.loads(self.rfile.read(length) or b"null")
+
+        def _client_id(self):
+            auth = self.headers.get("Authorization", "")
+            if not auth.startswith("Bearer "):
+                return None
+            try:
+                payload = auth[7:].split(".")[1]
+                payload += "=" * (-len(payload) % 4)
+                claims = json.loads(base64.urlsafe_b64decode(payload))
+            except (IndexError, ValueError):
+                return None
+            return claims["sub"] if claims.get("exp", 0) > time.time() else None
+
+        def do_POST(self):
+            if self.path == "/api/v2/authenticate":
+                body = self._read_json() or {}
+                if not body.get("client_id") or not body.get("client_secret"):
+                    return self._send(401, {"error": "Authentication failed"})
+                return self._send(200, state.issue_token(body["client_id"]))
+
+            if self.path == "/api/v2/import/test/bulk":
+                client_id = self._client_id()
+                if not client_id:
+                    return self._send(401, {"error": "Authentication failed"})
+                tests = self._read_json()
+                if not isinstance(tests, list) or not tests:
+                    return self._send(400, {"error": "Invalid test list"})
+                job_id = state.start_job(client_id, tests)
+                if not job_id:
+                    return self._send(400, {"error": JOB_IN_PROGRESS_ERROR})
+                return self._send(200, {"jobId": job_id})
+
+            self._send(404, {"error": "Not found"})
+
+        def do_GET(self):
+            match = re.match(r"^/api/v2/import/test/bulk/([0-9a-f]+)/status$", self.path)
+            if not match:
+                return self._send(404, {"error": "Not found"})
+            if not self._client_id():
+                return self._send(401, {"error": "Authentication failed"})
+            body = state.job_status(match.group(1))
+            if body is None:
+                return self._send(404, {"error": "Job not found"})
+            self._send(200, body)
+
+    return Handler
+
+def start_server(port: int = 0, job_seconds: float = 2.0):
+    """Arranca el servidor en un hilo. Retorna (server, state, base_url)"""
+    state = FakeXRayState(job_seconds=job_seconds)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state, f"http://127.0.0.1:{server.server_address[1]}"
+
+def sample_classified_tests(per_category: int = 3) -> dict:
+    def test(category: str, index: int) -> dict:
+        return {
+            "testtype": "Manual",
+            "fields": {"summary": f"[{category}] Test {index}", "project": {"key": "QA"}},
+            "steps": [{"action": "Abrir la página", "data": "", "result": "La página carga"}],
+            "xray_test_repository_folder": f"/Demo/{category}"
+        }
+    return {category: [test(category, i) for i in range(per_category)]
+            for category in ("criticos", "importantes", "opcionales")}
+
+def self_test(job_seconds: float, mode: str):
+    server, state, base_url = start_server(job_seconds=job_seconds)
+    from app.services.xray_service import XRayService
+
+    service = XRayService()
+    service.client_id = "fake-client"
+    service.client_secret = "fake-secret"
+    service.auth_url = f"{base_url}/api/v2/authenticate"
+    service.import_url = f"{base_url}/api/v2/import/test/bulk"
+    service.import_mode = mode
+
+    started = time.monotonic()
+    results = service.send_classified_tests(sample_classified_tests())
+    elapsed = time.monotonic() - started
+    server.shutdown()
+
+    print(f"\n⏱️ Envío ({mode}): {elapsed:.2f}s (jobs de {job_seconds}s)")
+    print(f"   Autenticaciones: {state.auth_requests}, imports: {state.import_requests}, "
+          f"rechazados por job en curso: {state.rejected_imports}, consultas de estado: {state.status_requests}")
+    assert results["summary"]["total_success"] == results["summary"]["total_tests"], results
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor XRay local para pruebas")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--job-seconds", type=float, default=2.0, help="Duración simulada de cada job")
+    parser.add_argument("--self-test", action="store_true")
+    parser.add_argument("--mode", choices=["consolidated", "by_category"], default="consolidated",
+                        help="Modo de importación usado por --self-test")
+    args = parser.parse_args()
+
+    if args.self_test:
+        self_test(args.job_seconds, args.mode)
+        return
+
+    server, _, base_url = start_server(args.port, args.job_seconds)
+    print(f"🧪 XRay local escuchando en {base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Prueba de carga: latencia de los endpoints de lectura (GET /hus, GET /projects) mientras hay
+peticiones lentas en curso (POST /hus, con Azure DevOps y DeepSeek simulados con demoras).
+
+Levanta el servidor con uvicorn en un proceso aparte (con las llamadas externas reemplazadas por
+esperas) y lanza la carga con httpx. Para comparar con otra versión del código, --app-dir apunta a
+otro checkout (ej: un `git worktree` del commit anterior).
+
+Uso:
+    python scripts/load_test_async_db.py [--slow 8] [--slow-seconds 2] [--reads 300] [--concurrency 20]
+    python scripts/load_test_async_db.py --app-dir /tmp/qa-backend-sync
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--app-dir", default=ROOT, help="Checkout del backend a probar")
+    parser.add_argument("--slow", type=int, default=8, help="POST /hus lentos en paralelo")
+    parser.add_argument("--slow-seconds", type=float, default=2.0, help="Demora simulada de Azure + DeepSeek")
+    parser.add_argument("--reads", type=int, default=300, help="Lecturas a lanzar mientras corren los lentos")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--hus", type=int, default=200)
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, default=0, help=argparse.SUPPRESS)
+    parser.add_argument("--state", default="", help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+# ==================== SERVIDOR (proceso hijo) ====================
+
+def serve(args):
+    sys.path.insert(0, args.app_dir)
+    import uvicorn
+    from app.main import app
+    from app.database.connection import SessionLocal
+    from app.database.models import User, Project, HU
+    from app.auth.jwt import create_access_token
+    from app.services.azure_service import AzureService
+    from app.services.deepseek_service import DeepSeekService
+
+    delay = args.slow_seconds / 2
+
+    def fake_fetch_hu(self, azure_id, *a, **k):
+        time.sleep(delay)
+        return {"title": f"Historia {azure_id} de prueba de carga", "description": "Descripción",
+                "acceptanceCriteria": "Criterio", "feature": "Carga", "module": "Pruebas"}
+
+    def fake_refine_hu(self, title, *a, **k):
+        time.sleep(delay)
+        return "Contenido refinado", "Contenido refinado"
+
+    AzureService.fetch_hu = fake_fetch_hu
+    DeepSeekService.refine_hu = fake_refine_hu
+
+    db = SessionLocal()
+    user = User(username="load", email="load@example.com", hashed_password="x", is_active=True)
+    db.add(user)
+    db.flush()
+    project = Project(name="Carga", user_id=user.id, is_active=True, azure_devops_token="t", azure_org="o",
+                      azure_project="p", client_id="c", client_secret="s")
+    db.add(project)
+    db.flush()
+    for n in range(args.hus):
+        db.add(HU(azure_id=str(10000 + n), name=f"HU {n}", refined_response="Texto", markdown_response="Texto",
+                  project_id=project.id))
+    db.commit()
+    with open(args.state, "w") as f:
+        json.dump({"token": create_access_token({"sub": "load"})}, f)
+    db.close()
+
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+# ==================== CLIENTE ====================
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+async def run_load(args, base_url, headers):
+    import httpx
+    limits = httpx.Limits(max_connections=args.concurrency + args.slow)
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, timeout=120, limits=limits) as client:
+        # Calentamiento
+        await client.get("/hus")
+
+        async def slow(n):
+            started = time.perf_counter()
+            response = await client.post("/hus", json={"azure_id": str(90000 + n)})
+            if response.status_code != 200:
+                print(f"   ❌ POST /hus {response.status_code}: {response.text[:200]}")
+            return response.status_code, time.perf_counter() - started
+
+        read_latencies, errors = [], 0
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def read(n):
+            nonlocal errors
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.get("/hus" if n % 2 else "/projects")
+                read_latencies.append(time.perf_counter() - started)
+                errors += response.status_code != 200
+
+        started = time.perf_counter()
+        slow_tasks = [asyncio.create_task(slow(n)) for n in range(args.slow)]
+        await asyncio.sleep(0.05)  # Las lecturas llegan con los lentos ya en curso
+        await asyncio.gather(*[read(n) for n in range(args.reads)])
+        reads_done = time.perf_counter() - started
+        slow_results = await asyncio.gather(*slow_tasks)
+        total = time.perf_counter() - started
+
+    return {
+        "reads_seconds": reads_done,
+        "reads_per_second": args.reads / reads_done,
+        "read_p50_ms": statistics.median(read_latencies) * 1000,
+        "read_p95_ms": percentile(read_latencies, 95) * 1000,
+        "read_max_ms": max(read_latencies) * 1000,
+        "read_errors": errors,
+        "slow_ok": sum(1 for status, _ in slow_results if status == 200),
+        "slow_max_seconds": max(seconds for _, seconds in slow_results),
+        "total_seconds": total,
+    }
+
+def main():
+    args = parse_args()
+    if args.serve:
+        serve(args)
+        return
+
+    workdir = tempfile.mkdtemp(prefix="load_async_db_")
+    state = os.path.join(workdir, "state.json")
+    port = free_port()
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'load.db')}", PYTHONUNBUFFERED="1")
+    server = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--serve", "--app-dir", args.app_dir, "--port", str(port),
+         "--state", state, "--hus", str(args.hus), "--slow-seconds", str(args.slow_seconds)],
+        env=env, cwd=args.app_dir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        deadline = time.time() + 60
+        while True:
+            try:
+                with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                    if os.path.exists(state):
+                        break
+            except OSError:
+                pass
+            if time.time() > deadline or server.poll() is not None:
+                raise RuntimeError("El servidor no arrancó")
+            time.sleep(0.2)
+        with open(state) as f:
+            token = json.load(f)["token"]
+
+        print(f"🚀 {args.app_dir}: {args.slow} POST /hus lentos ({args.slow_seconds}s) + {args.reads} lecturas "
+              f"(concurrencia {args.concurrency})")
+        result = asyncio.run(run_load(args, base_url, {"Authorization": f"Bearer {token}"}))
+        print(f"📊 Lecturas: {result['reads_per_second']:.0f} req/s, p50 {result['read_p50_ms']:.0f} ms, "
+              f"p95 {result['read_p95_ms']:.0f} ms, máx {result['read_max_ms']:.0f} ms, errores {result['read_errors']}")
+        print(f"📊 Lentos: {result['slow_ok']}/{args.slow} OK, el último terminó a los {result['slow_max_seconds']:.1f}s "
+              f"(total {result['total_seconds']:.1f}s)")
+    finally:
+        server.terminate()
+        server.wait()
+
+if __name__ == "__main__":
+    main()
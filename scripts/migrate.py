@@ -0,0 +1,36 @@
+"""
+Aplica o lista las migraciones de esquema (app/database/migrations.py).
+
+Uso:
+    python scripts/migrate.py status
+    python scripts/migrate.py upgrade
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# La migración la controla este script, no la importación de los modelos
+os.environ["AUTO_MIGRATE"] = "false"
+
+from app.database.connection import engine
+from app.database import models  # noqa: F401  (crea las tablas nuevas)
+from app.database.migrations import MIGRATIONS, pending_migrations, run_migrations
+
+def main():
+    parser = argparse.ArgumentParser(description="Migraciones de esquema")
+    parser.add_argument("command", choices=["status", "upgrade"])
+    args = parser.parse_args()
+
+    if args.command == "status":
+        pending = {m.version for m in pending_migrations(engine)}
+        for m in MIGRATIONS:
+            print(f"   {'⏳ pendiente' if m.version in pending else '✅ aplicada '}  {m.version:>4}  {m.description}")
+        return
+
+    applied = run_migrations(engine)
+    print(f"✅ {len(applied)} migraciones aplicadas" if applied else "✅ Esquema al día")
+
+if __name__ == "__main__":
+    main()
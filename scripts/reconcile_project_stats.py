@@ -0,0 +1,36 @@
+"""
+Recalcula las estadísticas por proyecto (project_hu_stats) desde hus y corrige las diferencias, y borra
+los refinement_contents que ya no referencia ninguna HU.
+La API lo hace cada PROJECT_STATS_RECONCILE_SECONDS; este script sirve para ejecutarlo desde cron
+o después de modificar HUs con SQL directo.
+
+Uso:
+    python scripts/reconcile_project_stats.py [--project <project_id> ...]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database.connection import engine
+from app.services.project_stats import reconcile_all_projects
+from app.services.refinement_gc import sweep_unreferenced_contents
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconciliación de estadísticas por proyecto")
+    parser.add_argument("--project", action="append", help="Proyecto a reconciliar (por defecto, todos)")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    drifts = reconcile_all_projects(engine, args.project)
+    for project_id, drift in drifts.items():
+        for (dimension, key), delta in sorted(drift.items()):
+            print(f"   {project_id}  {dimension}:{key or '(vacío)'}  {delta:+d}")
+    removed = sweep_unreferenced_contents(engine)
+    print(f"✅ Reconciliación terminada en {time.perf_counter() - started:.1f}s: "
+          f"{len(drifts)} proyectos con contadores desfasados, {removed} contenidos de refinamiento sin referencias borrados")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Entorno local con primaria y réplica de lectura en dos archivos SQLite. La "replicación" copia la
+primaria sobre la réplica cada --lag segundos con la API de backup de sqlite3, así que la réplica va
+siempre algo atrasada, como una réplica real.
+
+Por defecto ejecuta una prueba del enrutamiento con TestClient (lecturas en la réplica, lectura de la
+propia escritura en la primaria, fin de la ventana de DB_REPLICA_STICKY_SECONDS). Con --serve levanta
+uvicorn con la replicación en segundo plano.
+
+Uso:
+    python scripts/replica_local.py [--dir /tmp/qa-replica]
+    python scripts/replica_local.py --serve [--lag 2] [--port 8000]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dir", default="/tmp/qa-replica", help="Carpeta de primary.db y replica.db")
+    parser.add_argument("--lag", type=float, default=2.0, help="Segundos entre copias a la réplica")
+    parser.add_argument("--sticky", type=float, default=1.0, help="DB_REPLICA_STICKY_SECONDS para la prueba")
+    parser.add_argument("--serve", action="store_true")
+    parser.add_argument("--port", type=int, default=8000)
+    return parser.parse_args()
+
+ARGS = parse_args()
+os.makedirs(ARGS.dir, exist_ok=True)
+PRIMARY = os.path.join(ARGS.dir, "primary.db")
+REPLICA = os.path.join(ARGS.dir, "replica.db")
+if not ARGS.serve:
+    for path in (PRIMARY, REPLICA):
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+os.environ["DATABASE_URL"] = f"sqlite:///{PRIMARY}"
+os.environ["DATABASE_REPLICA_URL"] = f"sqlite:///{REPLICA}"
+if not ARGS.serve:
+    os.environ["DB_REPLICA_STICKY_SECONDS"] = str(ARGS.sticky)
+
+def replicate():
+    """Copia la primaria completa sobre la réplica"""
+    source = sqlite3.connect(PRIMARY)
+    target = sqlite3.connect(REPLICA, timeout=30)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+def replicate_forever(lag: float):
+    while True:
+        time.sleep(lag)
+        try:
+            replicate()
+        except sqlite3.Error as e:
+            print(f"⚠️ Error replicando: {str(e)}")
+
+# La app crea el esquema y aplica las migraciones en la primaria al importarse
+from app.database import models  # noqa: E402,F401
+replicate()
+
+from app.main import app  # noqa: E402
+from app.auth.jwt import create_access_token  # noqa: E402
+from app.database.connection import SessionLocal  # noqa: E402
+from app.database.models import HU, Project, User  # noqa: E402
+
+def seed():
+    db = SessionLocal()
+    try:
+        if db.query(User).filter(User.username == "replica_a").first():
+            return
+        users = []
+        for name in ("replica_a", "replica_b"):
+            user = User(username=name, email=f"{name}@example.com", hashed_password="x", is_active=True)
+            db.add(user)
+            users.append(user)
+        db.flush()
+        for user in users:
+            project = Project(name=f"Réplica {user.username}", user_id=user.id, is_active=True, azure_devops_token="t",
+                              azure_org="o", azure_project="p", client_id="c", client_secret="s")
+            db.add(project)
+            db.flush()
+            user.active_project_id = project.id
+        db.add(HU(azure_id="4242", name="HU de réplica", refined_response="Texto", markdown_response="Texto",
+                  project_id=users[0].active_project_id))
+        db.commit()
+    finally:
+        db.close()
+
+def self_test() -> bool:
+    from fastapi.testclient import TestClient
+
+    client = TestClient(app)
+    owner = {"Authorization": "Bearer " + create_access_token({"sub": "replica_a"})}
+    other = {"Authorization": "Bearer " + create_access_token({"sub": "replica_b"})}
+    db = SessionLocal()
+    hu_id = db.query(HU.id).filter(HU.azure_id == "4242").scalar()
+    db.close()
+    results = []
+
+    def check(label, ok):
+        results.append(ok)
+        print(f"{'✅' if ok else '❌'} {label}")
+
+    response = client.get(f"/hus/{hu_id}", headers=owner)
+    check("GET sin escrituras previas se sirve desde la réplica",
+          response.headers.get("X-DB-Route") == "replica" and response.json()["status"] == "pending")
+
+    response = client.patch(f"/hus/{hu_id}/status", headers=owner, json={"status": "accepted"})
+    check("PATCH /hus/{id}/status en la primaria", response.status_code == 200)
+
+    response = client.get(f"/hus/{hu_id}", headers=owner)
+    check("El mismo cliente lee su escritura desde la primaria",
+          response.headers.get("X-DB-Route") == "primary" and response.json()["status"] == "accepted")
+
+    response = client.get(f"/hus/{hu_id}", headers=other)
+    check("Otro cliente sigue en la réplica (todavía sin replicar)",
+          response.headers.get("X-DB-Route") == "replica" and response.json()["status"] == "pending")
+
+    time.sleep(ARGS.sticky + 0.1)
+    response = client.get(f"/hus/{hu_id}", headers=owner)
+    check("Terminada la ventana el cliente vuelve a la réplica",
+          response.headers.get("X-DB-Route") == "replica" and response.json()["status"] == "pending")
+
+    replicate()
+    response = client.get(f"/hus/{hu_id}", headers=other)
+    check("Tras replicar la réplica tiene el cambio", response.json()["status"] == "accepted")
+
+    response = client.get("/projects", headers=owner)
+    check("GET /projects desde la réplica", response.status_code == 200 and response.headers.get("X-DB-Route") == "replica")
+    return all(results)
+
+def main():
+    seed()
+    replicate()
+    if ARGS.serve:
+        import uvicorn
+        threading.Thread(target=replicate_forever, args=(ARGS.lag,), daemon=True).start()
+        print(f"🗄️ Primaria {PRIMARY}, réplica {REPLICA} (copiada cada {ARGS.lag}s)")
+        print(f"🔑 Token de replica_a: {create_access_token({'sub': 'replica_a'})}")
+        uvicorn.run(app, host="127.0.0.1", port=ARGS.port)
+        return
+    sys.exit(0 if self_test() else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Simula los service hooks de Azure DevOps enviando payloads de ejemplo a /webhooks/azure.
+
+Uso:
+    python scripts/send_azure_webhook.py --project-id <id> --secret <secreto> --event created --work-item 129
+    python scripts/send_azure_webhook.py --project-id <id> --secret <secreto> --event updated --work-item 129
+
+El secreto se obtiene con GET /projects/{project_id}/webhook (campo basic_auth_password).
+"""
+import argparse
+import json
+import requests
+
+def build_payload(event: str, work_item_id: int, team_project: str, area_path: str, title: str) -> dict:
+    fields = {
+        "System.TeamProject": team_project,
+        "System.AreaPath": area_path,
+        "System.WorkItemType": "User Story",
+        "System.State": "New",
+        "System.Title": title
+    }
+
+    if event == "created":
+        return {
+            "subscriptionId": "00000000-0000-0000-0000-000000000000",
+            "eventType": "workitem.created",
+            "publisherId": "tfs",
+            "resource": {
+                "id": work_item_id,
+                "rev": 1,
+                "fields": fields
+            },
+            "resourceContainers": {"project": {"id": "00000000-0000-0000-0000-000000000001"}}
+        }
+
+    return {
+        "subscriptionId": "00000000-0000-0000-0000-000000000000",
+        "eventType": "workitem.updated",
+        "publisherId": "tfs",
+        "resource": {
+            "id": 2,
+            "workItemId": work_item_id,
+            "rev": 2,
+            "fields": {
+                "System.Rev": {"oldValue": 1, "newValue": 2},
+                "System.Title": {"oldValue": title, "newValue": f"{title} (editada)"}
+            },
+            "revision": {
+                "id": work_item_id,
+                "rev": 2,
+                "fields": {**fields, "System.Title": f"{title} (editada)"}
+            }
+        },
+        "resourceContainers": {"project": {"id": "00000000-0000-0000-0000-000000000001"}}
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Envía service hooks de ejemplo de Azure DevOps")
+    parser.add_argument("--url", default="http://localhost:3500/webhooks/azure")
+    parser.add_argument("--project-id", required=True)
+    parser.add_argument("--secret", required=True)
+    parser.add_argument("--event", choices=["created", "updated"], default="updated")
+    parser.add_argument("--work-item", type=int, default=129)
+    parser.add_argument("--team-project", default="DeUna Dropshipping")
+    parser.add_argument("--area-path", default="DeUna Dropshipping\\Gestión de Productos")
+    parser.add_argument("--title", default="HU de ejemplo enviada por service hook")
+    args = parser.parse_args()
+
+    payload = build_payload(args.event, args.work_item, args.team_project, args.area_path, args.title)
+
+    print(f"📤 Enviando workitem.{args.event} para work item {args.work_item} a {args.url}")
+    response = requests.post(
+        args.url,
+        params={"project_id": args.project_id},
+        json=payload,
+        auth=("azure-devops", args.secret),
+        timeout=30
+    )
+    print(f"📨 Respuesta: {response.status_code}")
+    try:
+        print(json.dumps(response.json(), indent=2, ensure_ascii=False))
+    except ValueError:
+        print(response.text)
+
+if __name__ == "__main__":
+    main()
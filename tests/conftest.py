@@ -0,0 +1,87 @@
+"""
+Fixtures de pytest: base SQLite temporal (se fija antes de importar la app), datos sembrados y
+query_budget, que hace fallar el test cuando un bloque ejecuta más consultas de las permitidas.
+"""
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+from typing import NamedTuple
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_DB_DIR = tempfile.TemporaryDirectory(prefix="riwi_qa_tests_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DB_DIR.name, 'tests.db')}"
+os.environ["DATABASE_REPLICA_URL"] = ""
+os.environ["PROJECT_STATS_RECONCILE_SECONDS"] = "0"
+
+from app.database import query_stats  # noqa: E402
+from app.database.connection import SessionLocal  # noqa: E402
+from app.database.models import User, Project, HU  # noqa: E402
+from app.services.feature_catalog_service import replace_catalog  # noqa: E402
+from app.services.hu_revisions import record_revision  # noqa: E402
+
+SEEDED_HUS = 30
+
+class Seeded(NamedTuple):
+    user_id: str
+    project_id: str
+    hu_id: str
+
+@pytest.fixture(scope="session")
+def seeded() -> Seeded:
+    """Usuario con dos proyectos; el activo con HUs refinadas, revisiones y catálogo de features"""
+    db = SessionLocal()
+    try:
+        user = User(username="budget", email="budget@example.com", hashed_password="x", is_active=True)
+        db.add(user)
+        db.flush()
+        projects = [Project(name=f"Presupuesto {n}", user_id=user.id, is_active=n == 0, azure_devops_token="t",
+                            azure_org="o", azure_project="p", client_id="c", client_secret="s") for n in range(2)]
+        db.add_all(projects)
+        db.flush()
+        hus = [HU(azure_id=str(5000 + n), name=f"HU {n}", description="Descripción", project_id=projects[0].id,
+                  refined_response=f"Refinamiento {n}", markdown_response=f"## Refinamiento {n}",
+                  feature=f"Feature {n % 3}", module="Módulo") for n in range(SEEDED_HUS)]
+        db.add_all(hus)
+        db.flush()
+        for revision in range(3):
+            record_revision(db, hus[0], "rejection", f"Refinamiento {revision}", f"## Refinamiento {revision}",
+                            feedback=f"Feedback {revision}")
+        replace_catalog(db, projects[0].id, [
+            {"feature_id": f"F-{n}", "name": f"Feature {n}", "module": "Módulo", "hus": [5000 + n, 5010 + n]}
+            for n in range(5)
+        ])
+        db.commit()
+        return Seeded(user.id, projects[0].id, hus[0].id)
+    finally:
+        db.close()
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+@pytest.fixture
+def user(db, seeded) -> User:
+    return db.get(User, seeded.user_id)
+
+@pytest.fixture
+def query_budget():
+    """
+    query_budget(max_queries, label) de app/database/query_stats.py como fixture: si el bloque supera el
+    presupuesto el test falla listando las consultas ejecutadas
+    """
+    @contextmanager
+    def check(max_queries: int, label: str = ""):
+        try:
+            with query_stats.query_budget(max_queries, label) as stats:
+                yield stats
+        except query_stats.QueryBudgetExceeded as e:
+            pytest.fail(str(e), pytrace=False)
+    return check
@@ -0,0 +1,41 @@
+"""
+Jobs de generación de tests: el job reconstruye la petición con sus propios datos, incluido
+force_regenerate. DeepSeek y XRay se sustituyen por dobles.
+"""
+import pytest
+
+from app.api import routes
+from app.database.models import TestGenerationJob, JobStatus
+from app.services.test_generation_jobs import create_job
+
+class FakeDeepSeek:
+    def generate_xray_tests(self, refined_response, xray_path, azure_id):
+        return {"classified_tests": {"criticos": []}, "summary": {"total_tests": 0}}
+
+class FakeXray:
+    client_id = "xray-tests"
+
+    def send_classified_tests(self, classified_tests, imported):
+        return {"summary": {"total_success": 0, "total_failed": 0, "total_tests": 0}, "imported_fingerprints": []}
+
+@pytest.fixture
+def reuse_calls(monkeypatch):
+    calls = []
+    def fake_get_reusable_tests(stored_tests, refined_response, xray_path):
+        calls.append(xray_path)
+        return None
+    monkeypatch.setattr(routes, "get_reusable_tests", fake_get_reusable_tests)
+    monkeypatch.setattr(routes, "DeepSeekService", FakeDeepSeek)
+    monkeypatch.setattr(routes, "get_xray_service_for_project", lambda project: FakeXray())
+    return calls
+
+@pytest.mark.parametrize("force_regenerate, expected_calls", [(True, []), (False, ["Jobs/Forzado"])])
+def test_job_honours_force_regenerate(force_regenerate, expected_calls, db, user, reuse_calls):
+    job = create_job(db, user.id, "5000", "Jobs/Forzado", force_regenerate)
+    routes.run_generate_tests_job(job.id)
+
+    db.expire_all()
+    job = db.get(TestGenerationJob, job.id)
+    assert job.status == JobStatus.COMPLETED, job.error
+    assert job.force_regenerate is force_regenerate
+    assert reuse_calls == expected_calls
@@ -0,0 +1,64 @@
+"""
+Presupuesto de consultas de los endpoints de lectura. Se llama a cada función de endpoint con una
+sesión real: las consultas de autenticación (get_current_active_user) no cuentan.
+"""
+import pytest
+from sqlalchemy import text
+
+from app.api import routes
+
+# Consultas máximas por endpoint (sin contar la autenticación)
+QUERY_BUDGETS = {
+    "get_user_projects_endpoint": 1,
+    "get_active_project_endpoint": 1,
+    "get_hus_endpoint": 2,
+    "get_hu_endpoint": 3,
+    "get_project_hus_endpoint": 3,
+    "get_project_stats_endpoint": 2,
+    "get_feature_catalog_endpoint": 4,
+    "get_hu_revisions_endpoint": 2,
+    "debug_find_hu_endpoint": 2,
+}
+
+ENDPOINT_CALLS = {
+    "get_user_projects_endpoint": lambda db, user, seeded: routes.get_user_projects_endpoint(user, db),
+    "get_active_project_endpoint": lambda db, user, seeded: routes.get_active_project_endpoint(user, db),
+    "get_hus_endpoint": lambda db, user, seeded: routes.get_hus_endpoint(db, None, None, None, None, None, user),
+    "get_hu_endpoint": lambda db, user, seeded: routes.get_hu_endpoint(seeded.hu_id, db),
+    "get_project_hus_endpoint": lambda db, user, seeded: routes.get_project_hus_endpoint(seeded.project_id, user, db),
+    "get_project_stats_endpoint": lambda db, user, seeded: routes.get_project_stats_endpoint(seeded.project_id, user, db),
+    "get_feature_catalog_endpoint": lambda db, user, seeded: routes.get_feature_catalog_endpoint(seeded.project_id, user, db),
+    "get_hu_revisions_endpoint": lambda db, user, seeded: routes.get_hu_revisions_endpoint(seeded.hu_id, user, db, True),
+    "debug_find_hu_endpoint": lambda db, user, seeded: routes.debug_find_hu_endpoint("HU-5000", user, db),
+}
+
+@pytest.mark.parametrize("endpoint", sorted(QUERY_BUDGETS))
+def test_endpoint_query_budget(endpoint, db, user, seeded, query_budget):
+    with query_budget(QUERY_BUDGETS[endpoint], endpoint):
+        ENDPOINT_CALLS[endpoint](db, user, seeded)
+
+def test_project_hus_next_page_skips_total(db, user, seeded, query_budget):
+    """total_count solo se cuenta en la primera página (o con include_total)"""
+    cursor = routes.get_project_hus_endpoint(seeded.project_id, user, db, limit=10)["next_cursor"]
+    with query_budget(2, "get_project_hus_endpoint (página siguiente)"):
+        page = routes.get_project_hus_endpoint(seeded.project_id, user, db, limit=10, cursor=cursor)
+    assert page["total_count"] is None and page["count"] == 10
+    page = routes.get_project_hus_endpoint(seeded.project_id, user, db, limit=10, cursor=cursor, include_total=True)
+    assert page["total_count"] == 30
+
+def test_endpoint_results(db, user, seeded):
+    projects = routes.get_user_projects_endpoint(user, db)
+    assert len(projects.projects) == 2
+    assert projects.active_project_id == seeded.project_id
+    page = routes.get_project_hus_endpoint(seeded.project_id, user, db)
+    assert page["total_count"] == 30
+    catalog = routes.get_feature_catalog_endpoint(seeded.project_id, user, db)
+    assert [feature["hus"] for feature in catalog["features"]] == [[5000 + n, 5010 + n] for n in range(5)]
+    revisions = routes.get_hu_revisions_endpoint(seeded.hu_id, user, db, True)
+    assert [revision["revision"] for revision in revisions["revisions"]] == [1, 2, 3]
+
+def test_query_budget_fails_when_exceeded(db, query_budget):
+    with pytest.raises(pytest.fail.Exception, match="2 consultas"):
+        with query_budget(1, "dos consultas"):
+            db.execute(text("SELECT 1"))
+            db.execute(text("SELECT 2"))